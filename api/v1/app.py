@@ -3,6 +3,8 @@
 This module sets up the Flask application for the AirBnB clone API.
 """
 
+from api.v1.cache import ResponseCache
+from api.v1.json_provider import SerializerJSONProvider
 from api.v1.views import app_views
 from flasgger import Swagger
 from flask import Flask, jsonify, make_response
@@ -13,12 +15,20 @@ from os import getenv
 # Initialize Flask application
 app = Flask(__name__)
 
+# Serialize JSON with orjson when installed, see api/v1/json_provider.py
+app.json = SerializerJSONProvider(app)
+
 # Enable Cross-Origin Resource Sharing (CORS) for the entire app
 CORS(app, origins="0.0.0.0")
 
 # Register the blueprint for the API views
 app.register_blueprint(app_views)
 
+# Cache the GET responses of the views, see api/v1/cache.py
+response_cache = ResponseCache.from_env()
+if response_cache is not None:
+    app.extensions["response_cache"] = response_cache
+
 # Initialize Swagger for API documentation
 Swagger(app)
 
@@ -0,0 +1,184 @@
+#!/usr/bin/python3
+"""
+Response cache of the GET views of app_views.
+
+Entries are keyed by the ETag of the request (see
+api.v1.views.conditional), which hashes the URL with the storage
+generation of every class the view reads. A write to one of those
+classes changes the ETag, so a stale entry is never served: the next
+request for the URL misses and evicts it. The cities of a State, for
+instance, are read under ("State", "City"), so adding a city invalidates
+the cached list of the state's cities.
+
+The in-process tier is an LRU bounded in entries, bytes and age. An
+optional shared tier stores the entries as files in a directory, for the
+workers of a database-backed API to serve each other's responses.
+"""
+from collections import OrderedDict
+import json
+import os
+import tempfile
+import threading
+import time
+
+
+class ResponseCache:
+    """
+    LRU cache of the (body, status, headers) of responses
+
+    Attributes:
+        max_entries: maximum number of entries kept in memory
+        max_bytes: maximum total size of the bodies kept in memory
+        ttl: seconds an entry is served for
+        directory: optional, directory of the shared tier
+        stats: counters of "hits", "shared_hits", "misses",
+            "invalidations" (entries replaced after a write),
+            "evictions" (entries dropped to fit the bounds) and
+            "expirations" (entries older than ttl)
+    """
+    prune_every = 64
+
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024,
+                 ttl=60, directory=None):
+        """Initializes an empty cache."""
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.directory = directory
+        self.stats = dict.fromkeys(("hits", "shared_hits", "misses",
+                                    "invalidations", "evictions",
+                                    "expirations"), 0)
+        self.__entries = OrderedDict()
+        self.__paths = {}
+        self.__bytes = 0
+        self.__writes = 0
+        self.__lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def from_env(cls):
+        """
+        Returns the cache configured by HBNB_API_CACHE_SIZE (entries, the
+        cache is off when unset or 0), HBNB_API_CACHE_BYTES,
+        HBNB_API_CACHE_TTL (seconds) and HBNB_API_CACHE_DIR (shared
+        tier), or None.
+        """
+        max_entries = int(os.getenv("HBNB_API_CACHE_SIZE", 0))
+        if max_entries <= 0:
+            return None
+        return cls(max_entries,
+                   int(os.getenv("HBNB_API_CACHE_BYTES", 64 * 1024 * 1024)),
+                   float(os.getenv("HBNB_API_CACHE_TTL", 60)),
+                   os.getenv("HBNB_API_CACHE_DIR"))
+
+    def get(self, path, etag):
+        """
+        Returns the entry of the URL path for etag, None on a miss.
+        """
+        now = time.time()
+        with self.__lock:
+            entry = self.__entries.get(etag)
+            if entry is not None:
+                if now - entry[0] <= self.ttl:
+                    self.__entries.move_to_end(etag)
+                    self.stats["hits"] += 1
+                    return entry[1]
+                self.__drop(etag)
+                self.stats["expirations"] += 1
+            elif self.__paths.get(path, etag) != etag:
+                self.__drop(self.__paths[path])
+                self.stats["invalidations"] += 1
+        value = self.__read_shared(etag, now)
+        with self.__lock:
+            if value is None:
+                self.stats["misses"] += 1
+            else:
+                self.stats["shared_hits"] += 1
+                self.__store(path, etag, value, now)
+        return value
+
+    def put(self, path, etag, value):
+        """
+        Caches value, a (body, status, headers) tuple, for the URL path
+        and etag.
+        """
+        now = time.time()
+        with self.__lock:
+            old = self.__paths.get(path)
+            if old is not None and old != etag:
+                self.__drop(old)
+                self.stats["invalidations"] += 1
+            self.__store(path, etag, value, now)
+        self.__write_shared(etag, value)
+
+    def counters(self):
+        """Returns the stats with the current entries and bytes."""
+        with self.__lock:
+            return dict(self.stats, entries=len(self.__entries),
+                        bytes=self.__bytes)
+
+    def clear(self):
+        """Empties the in-process tier."""
+        with self.__lock:
+            self.__entries.clear()
+            self.__paths.clear()
+            self.__bytes = 0
+
+    def __store(self, path, etag, value, now):
+        """Adds an entry, evicting the least recently used to fit."""
+        if etag in self.__entries:
+            self.__drop(etag)
+        self.__entries[etag] = (now, value, path)
+        self.__paths[path] = etag
+        self.__bytes += len(value[0])
+        while len(self.__entries) > self.max_entries or \
+                (self.__bytes > self.max_bytes and len(self.__entries) > 1):
+            self.__drop(next(iter(self.__entries)))
+            self.stats["evictions"] += 1
+
+    def __drop(self, etag):
+        """Removes an entry from the in-process tier."""
+        _, value, path = self.__entries.pop(etag)
+        self.__bytes -= len(value[0])
+        if self.__paths.get(path) == etag:
+            del self.__paths[path]
+
+    def __read_shared(self, etag, now):
+        """Returns the entry of the shared tier, None if missing."""
+        if not self.directory:
+            return None
+        path = os.path.join(self.directory, etag)
+        try:
+            if now - os.path.getmtime(path) > self.ttl:
+                return None
+            with open(path, encoding="latin-1") as f:
+                body, status, headers = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return body.encode("latin-1"), status, [tuple(h) for h in headers]
+
+    def __write_shared(self, etag, value):
+        """Stores an entry in the shared tier, pruning expired ones."""
+        if not self.directory:
+            return
+        try:
+            fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=".")
+            with os.fdopen(fd, "w", encoding="latin-1") as f:
+                json.dump([value[0].decode("latin-1")] + list(value[1:]), f)
+            os.replace(tmp, os.path.join(self.directory, etag))
+        except OSError:
+            return
+        self.__writes += 1
+        if self.__writes % self.prune_every == 0:
+            self.__prune_shared()
+
+    def __prune_shared(self):
+        """Removes the expired entries of the shared tier."""
+        limit = time.time() - self.ttl
+        for entry in os.scandir(self.directory):
+            try:
+                if entry.stat().st_mtime < limit:
+                    os.remove(entry.path)
+            except OSError:
+                pass
@@ -0,0 +1,36 @@
+#!/usr/bin/python3
+"""
+Flask JSON provider of the API, backed by models.engine.serializer.
+
+jsonify, request.get_json and the streamed lists then use orjson when it
+is installed, like FileStorage. Datetimes are written in ISO 8601 rather
+than as HTTP dates; the views only send the formatted dates of to_json()
+anyway.
+"""
+from flask.json.provider import DefaultJSONProvider
+from models.engine import serializer
+
+
+class SerializerJSONProvider(DefaultJSONProvider):
+    """JSON provider delegating to models.engine.serializer"""
+
+    def dumps(self, obj, **kwargs):
+        """Serializes obj to a compact JSON string, or indented by the
+        json module when asked for an indent (debug mode)."""
+        if kwargs.get("indent"):
+            return super().dumps(obj, **kwargs)
+        return serializer.dumps(obj, sort_keys=self.sort_keys).decode()
+
+    def loads(self, s, **kwargs):
+        """Deserializes a JSON string or bytes."""
+        return serializer.loads(s)
+
+    def response(self, *args, **kwargs):
+        """Returns the application/json response of the arguments."""
+        obj = self._prepare_response_obj(args, kwargs)
+        if (self.compact is None and self._app.debug) or \
+                self.compact is False:
+            return super().response(obj)
+        return self._app.response_class(
+            serializer.dumps(obj, sort_keys=self.sort_keys) + b"\n",
+            mimetype=self.mimetype)
@@ -5,10 +5,14 @@ This module handles operations related to amenities.
 from api.v1.views import app_views
 from models.amenity import Amenity
 from models import storage
+from api.v1.views.pagination import paginate
+from api.v1.views.conditional import conditional
+from api.v1.views.expansion import object_response
 from flask import (abort, jsonify, request)
 
 @app_views.route('/amenities', methods=['GET'], strict_slashes=False)
 @app_views.route('/amenities/<amenity_id>', methods=['GET'], strict_slashes=False)
+@conditional("Amenity")
 def get_amenities(amenity_id=None):
     """
     Retrieves amenities information.
@@ -23,6 +27,16 @@ def get_amenities(amenity_id=None):
         description: The ID of the amenity to retrieve. If not provided, returns all amenities.
         required: false
         example: "cf701d1a-3c19-4bac-bd99-15321f1140f2"
+      - name: limit
+        in: query
+        type: integer
+        description: Page size of the list; the next page is linked by the Link header.
+        required: false
+      - name: cursor
+        in: query
+        type: string
+        description: Opaque position of the page, from X-Next-Cursor.
+        required: false
 
     Responses:
       200:
@@ -52,12 +66,11 @@ def get_amenities(amenity_id=None):
                 ]
     """
     if amenity_id is None:
-        amenities = [amenity.to_json() for amenity in storage.all("Amenity").values()]
-        return jsonify(amenities)
+        return paginate("Amenity")
     amenity = storage.get("Amenity", amenity_id)
     if amenity is None:
         abort(404)
-    return jsonify(amenity.to_json())
+    return object_response(amenity)
 
 @app_views.route('/amenities/<amenity_id>', methods=['DELETE'], strict_slashes=False)
 def delete_amenity(amenity_id):
@@ -0,0 +1,170 @@
+#!/usr/bin/python3
+"""
+Bulk create, update and delete endpoints: POST /api/v1/<resource>/batch.
+
+The body is a JSON array of operations:
+    {"op": "create", "data": {...}}
+    {"op": "update", "id": <id>, "data": {...}}
+    {"op": "delete", "id": <id>}
+Every operation is validated before any is applied, with the rules of
+the single object endpoints. If one fails, nothing is applied and the
+response is a 400 listing the errors by index. Otherwise the operations
+are applied through storage.new_many() and storage.delete_many() and
+saved once, with a single commit or file write. The response is the list
+of the per-operation results, in order.
+"""
+from datetime import datetime
+from api.v1.views import app_views
+from flask import jsonify, request
+from models import storage
+from models.amenity import Amenity
+from models.city import City
+from models.place import Place
+from models.review import Review
+from models.state import State
+from models.user import User
+
+max_operations = 10000
+
+# <resource> -> (class, attributes required to create, {attribute holding
+# the id of a parent: parent class name}, attributes an update ignores)
+resources = {
+    "amenities": (Amenity, ("name",), {}, ()),
+    "states": (State, ("name",), {}, ()),
+    "users": (User, ("email", "password"), {}, ("email",)),
+    "cities": (City, ("name",), {"state_id": "State"}, ("state_id",)),
+    "places": (Place, ("name",), {"city_id": "City", "user_id": "User"},
+               ("city_id", "user_id")),
+    "reviews": (Review, ("text",), {"place_id": "Place", "user_id": "User"},
+                ("place_id", "user_id")),
+}
+ignored = ("id", "created_at", "updated_at")
+
+
+def error(index, status, message):
+    """Returns the error of the operation at index."""
+    return {"index": index, "status": status, "error": message}
+
+
+def validate(resource, operations):
+    """
+    Checks every operation against the storage.
+
+    Args:
+        resource (str): A key of resources.
+        operations (list): The operations of the request body.
+
+    Returns:
+        tuple: The list of (op, object or None, data) to apply and the
+            list of the errors, each a dict of "index", "status" and
+            "error".
+    """
+    cls, required, parents, frozen = resources[resource]
+    found = {}
+    targeted = set()
+    valid = []
+    errors = []
+
+    def exists(cls_name, id_):
+        """Looks up an object once per batch."""
+        if (cls_name, id_) not in found:
+            found[(cls_name, id_)] = storage.get(cls_name, id_)
+        return found[(cls_name, id_)]
+
+    for index, operation in enumerate(operations):
+        if not isinstance(operation, dict):
+            errors.append(error(index, 400, "Not a JSON object"))
+            continue
+        op = operation.get("op")
+        data = operation.get("data", {})
+        if op not in ("create", "update", "delete"):
+            errors.append(error(index, 400, "Invalid op"))
+            continue
+        if not isinstance(data, dict):
+            errors.append(error(index, 400, "Not a JSON"))
+            continue
+        if op == "create":
+            missing = [key for key in required + tuple(parents)
+                       if key not in data]
+            if missing:
+                errors.append(error(index, 400,
+                                    "Missing {}".format(missing[0])))
+                continue
+            lost = [key for key, parent in parents.items()
+                    if not isinstance(data[key], str) or
+                    exists(parent, data[key]) is None]
+            if lost:
+                errors.append(error(index, 404, "{} not found".format(
+                    parents[lost[0]])))
+                continue
+            valid.append((op, None, {k: v for k, v in data.items()
+                                     if k not in ignored}))
+            continue
+        id_ = operation.get("id")
+        if not isinstance(id_, str):
+            errors.append(error(index, 400, "Missing id"))
+        elif id_ in targeted:
+            errors.append(error(index, 400, "Duplicate id"))
+        elif exists(cls.__name__, id_) is None:
+            errors.append(error(index, 404, "Not found"))
+        else:
+            targeted.add(id_)
+            valid.append((op, exists(cls.__name__, id_),
+                          {k: v for k, v in data.items()
+                           if k not in ignored + frozen}))
+    return valid, errors
+
+
+def batch(resource):
+    """Applies an array of create, update and delete operations.
+
+    Args:
+        resource (str): A key of resources, from the URL.
+
+    Returns:
+        JSON: The list of the results, each with the "status" of the
+        operation and the "object" it created or updated or the "id" it
+        deleted; or, with a 400, the list of the errors.
+    """
+    operations = request.get_json(silent=True)
+    if not isinstance(operations, list):
+        return "Not a JSON array", 400
+    if len(operations) > max_operations:
+        return "Too many operations", 400
+    valid, errors = validate(resource, operations)
+    if errors:
+        return jsonify(errors), 400
+    cls = resources[resource][0]
+    saved = []
+    deleted = []
+    results = []
+    now = datetime.utcnow()
+    for op, obj, data in valid:
+        if op == "delete":
+            deleted.append(obj)
+            results.append({"status": 200, "id": obj.id})
+            continue
+        if op == "create":
+            obj = cls(**data)
+        else:
+            for key, value in data.items():
+                setattr(obj, key, value)
+            obj.updated_at = now
+        saved.append(obj)
+        results.append({"status": 201 if op == "create" else 200,
+                        "object": obj})
+    with storage.batch():
+        storage.new_many(saved)
+        storage.delete_many(deleted)
+        storage.save()
+    for result in results:
+        if "object" in result:
+            result["object"] = result["object"].to_json()
+    return jsonify(results), 200
+
+
+for resource in resources:
+    app_views.add_url_rule("/{}/batch".format(resource),
+                           "batch_" + resource, batch, methods=["POST"],
+                           defaults={"resource": resource},
+                           strict_slashes=False)
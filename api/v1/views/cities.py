@@ -6,8 +6,12 @@ from api.v1.views import app_views
 from flask import abort, jsonify, request
 from models.city import City  # Import City directly from the models module
 from models import storage  # Import storage directly from the models module
+from api.v1.views.pagination import paginate
+from api.v1.views.conditional import conditional
+from api.v1.views.expansion import object_response
 
 @app_views.route("/states/<state_id>/cities", methods=["GET"], strict_slashes=False)
+@conditional("State", "City")
 def state_all_cities(state_id):
     """Retrieve all cities of a given state by its ID.
 
@@ -20,10 +24,10 @@ def state_all_cities(state_id):
     state = storage.get("State", state_id)
     if state is None:
         abort(404)
-    all_cities = [city.to_json() for city in state.cities]
-    return jsonify(all_cities)
+    return paginate("City", {"state_id": state_id})
 
 @app_views.route("/cities/<city_id>", methods=["GET"], strict_slashes=False)
+@conditional("City")
 def one_city(city_id):
     """Retrieve a city by its ID.
 
@@ -36,7 +40,7 @@ def one_city(city_id):
     city = storage.get("City", city_id)
     if city is None:
         abort(404)
-    return jsonify(city.to_json())
+    return object_response(city)
 
 @app_views.route("/cities/<city_id>", methods=["DELETE"], strict_slashes=False)
 def delete_one_city(city_id):
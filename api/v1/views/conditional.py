@@ -0,0 +1,107 @@
+#!/usr/bin/python3
+"""
+Conditional GET of the API views.
+
+The validators of a view are derived from storage.version() of the
+classes it reads, without loading or serializing any object: the ETag
+hashes their generation tags, and the ones of the classes embedded by
+?expand (api.v1.views.expansion), with the requested URL and the body
+format negotiated from Accept (api.v1.views.streaming), which the
+responses list in Vary; Last-Modified
+is the latest change among them, left out while that change is in the
+current second: HTTP dates have no fraction of a second, so a later
+change within it would keep the same date. A request whose If-None-Match (or,
+without it, If-Modified-Since) still matches gets a 304 before the view
+runs. Otherwise the response is served from the response cache of the
+app (api.v1.cache) when it holds one for the ETag.
+"""
+from datetime import datetime, timezone
+from functools import wraps
+import hashlib
+from flask import current_app, make_response, request
+from api.v1.views.expansion import expanded_classes
+from api.v1.views.streaming import stream_mode
+from models import storage
+
+
+def validators(classes):
+    """
+    Returns the (etag, last_modified) of the current request, which
+    also reads the classes its ?expand reaches.
+    """
+    digest = hashlib.sha1(cache_key().encode())
+    last_modified = None
+    for cls in tuple(classes) + tuple(expanded_classes(classes)):
+        tag, modified = storage.version(cls)
+        digest.update("|{}:{}".format(cls, tag).encode())
+        if modified is not None and (last_modified is None or
+                                     modified > last_modified):
+            last_modified = modified
+    if last_modified is not None:
+        last_modified = last_modified.replace(microsecond=0)
+        if last_modified >= datetime.utcnow().replace(microsecond=0):
+            last_modified = None
+        else:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+    return digest.hexdigest(), last_modified
+
+
+def cache_key():
+    """
+    Returns the URL of the current request with the body format it
+    negotiated.
+    """
+    return "{} {}".format(stream_mode() or "", request.full_path)
+
+
+def not_modified(etag, last_modified):
+    """Tells whether the client copy of the response is still valid."""
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    since = request.if_modified_since
+    return since is not None and last_modified is not None and \
+        last_modified <= since
+
+
+def cached_response(etag, view, args, kwargs):
+    """
+    Returns the response of the view, from the response cache of the
+    app when it holds the one of etag.
+    """
+    cache = current_app.extensions.get("response_cache")
+    if cache is None:
+        return make_response(view(*args, **kwargs))
+    cached = cache.get(cache_key(), etag)
+    if cached is not None:
+        return make_response(cached)
+    response = make_response(view(*args, **kwargs))
+    if response.status_code == 200 and not response.is_streamed:
+        cache.put(cache_key(), etag, (
+            response.get_data(), response.status_code,
+            [(k, v) for k, v in response.headers
+             if k not in ("Content-Length", "ETag", "Last-Modified")]))
+    return response
+
+
+def conditional(*classes):
+    """
+    Decorates a GET view reading the objects of the given class names,
+    answering 304 when the client copy is still valid.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            etag, last_modified = validators(classes)
+            if not_modified(etag, last_modified):
+                response = make_response("", 304)
+            else:
+                response = cached_response(etag, view, args, kwargs)
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.vary.add("Accept")
+            if last_modified is not None:
+                response.last_modified = last_modified
+            return response
+        return wrapper
+    return decorator
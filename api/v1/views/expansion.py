@@ -0,0 +1,104 @@
+#!/usr/bin/python3
+"""
+Embedded expansion of the related objects in the API responses.
+
+?expand=cities,cities.places embeds, in each object served, the list of
+its related objects under the name of the relation, recursively along
+dotted paths. The relations are loaded by storage.expand() for a whole
+chunk of objects at once: one query per relation in DB mode, indexed
+lookups in file mode, instead of one request per parent object.
+"""
+from flask import jsonify, request
+from api.v1.views.fieldsets import requested_fields
+from models import storage
+
+# <class name> -> {<relation>: <class name of the related objects>}
+expansions = {
+    "State": {"cities": "City"},
+    "City": {"places": "Place"},
+    "Place": {"reviews": "Review", "amenities": "Amenity"},
+    "User": {"places": "Place", "reviews": "Review"},
+}
+chunk_size = 500
+
+
+def requested_expansions(cls):
+    """
+    Returns the tree of relations of ?expand for objects of the class
+    name cls, as nested {<relation>: {...}} dicts, None without ?expand.
+    Raises ValueError on an unknown relation.
+    """
+    if not request.args.get("expand"):
+        return None
+    tree = {}
+    for path in request.args["expand"].split(","):
+        node = tree
+        node_cls = cls
+        for name in path.strip().split("."):
+            if name not in expansions.get(node_cls, {}):
+                raise ValueError("Invalid expand")
+            node_cls = expansions[node_cls][name]
+            node = node.setdefault(name, {})
+    return tree
+
+
+def expanded_classes(classes):
+    """
+    Returns the class names the ?expand of the request reaches from any
+    of classes, for the validators of the response.
+    """
+    reached = set()
+
+    def walk(cls, tree):
+        """Adds the classes of tree."""
+        for name, subtree in tree.items():
+            reached.add(expansions[cls][name])
+            walk(expansions[cls][name], subtree)
+
+    for cls in classes:
+        try:
+            walk(cls, requested_expansions(cls) or {})
+        except ValueError:
+            pass
+    return sorted(reached - set(classes))
+
+
+def to_json(obj, fields, tree):
+    """Returns obj.to_json(fields) with the relations of tree embedded."""
+    new_dict = obj.to_json(fields)
+    for name, subtree in (tree or {}).items():
+        new_dict[name] = [to_json(related, None, subtree)
+                          for related in getattr(obj, name)]
+    return new_dict
+
+
+def render(objs, fields=None, tree=None):
+    """
+    Yields the to_json(fields) of objs with the relations of tree
+    embedded, expanding chunk_size objects at a time.
+    """
+    if not tree:
+        for obj in objs:
+            yield obj.to_json(fields)
+        return
+    chunk = []
+    for obj in objs:
+        chunk.append(obj)
+        if len(chunk) == chunk_size:
+            for obj in storage.expand(chunk, tree):
+                yield to_json(obj, fields, tree)
+            chunk = []
+    for obj in storage.expand(chunk, tree):
+        yield to_json(obj, fields, tree)
+
+
+def object_response(obj):
+    """
+    Returns the JSON response of obj with the requested fields and
+    expanded relations.
+    """
+    try:
+        tree = requested_expansions(obj.__class__.__name__)
+    except ValueError as e:
+        return str(e), 400
+    return jsonify(next(render([obj], requested_fields(), tree)))
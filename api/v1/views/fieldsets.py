@@ -0,0 +1,27 @@
+#!/usr/bin/python3
+"""
+Sparse fieldsets of the API responses.
+
+?fields=id,name (or a "fields" list in a places_search body) limits the
+serialized objects to the named attributes; the storage engines use it
+to load only those columns.
+"""
+from flask import request
+
+
+def requested_fields(data=None):
+    """
+    Returns the tuple of attribute names asked for by the request, from
+    the "fields" key of data when it has one, or None for every
+    attribute. Raises ValueError on a malformed "fields" key.
+    """
+    if data is not None and data.get("fields") is not None:
+        fields = data["fields"]
+        if not isinstance(fields, list) or \
+                not all(isinstance(name, str) for name in fields):
+            raise ValueError("Invalid fields")
+    elif "fields" in request.args:
+        fields = request.args["fields"].split(",")
+    else:
+        return None
+    return tuple(name.strip() for name in fields if name.strip())
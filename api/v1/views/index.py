@@ -5,7 +5,7 @@ This module defines the routes for the status and statistics endpoints of the AP
 
 from api.v1.views import app_views
 from models import storage
-from flask import jsonify
+from flask import current_app, jsonify, request
 
 @app_views.route('/status/')
 def get_status():
@@ -39,6 +39,10 @@ def get_status():
 def get_stats():
     """
     Endpoint that returns the count of objects of each class.
+
+    All the classes are counted in one storage call. With
+    ?approximate=true, large tables are counted from the database
+    statistics instead.
     
     Returns:
         Response: JSON response with the count of each object type.
@@ -67,6 +71,13 @@ def get_stats():
             type: integer
             example: 31
     
+    parameters:
+      - name: approximate
+        in: query
+        type: boolean
+        required: false
+        description: Use the table statistics of the database
+
     responses:
       200:
         description: Dictionary with the count of each object type.
@@ -91,7 +102,54 @@ def get_stats():
         "Review": "reviews",
         "State": "states"
     }
+    approximate = request.args.get("approximate", "false") in ("true", "1")
+    counts = storage.count_all(approximate=approximate)
     object_counts = {}
     for cls, endpoint in class_names.items():
-        object_counts[endpoint] = storage.count(cls)
+        object_counts[endpoint] = counts.get(cls, 0)
     return jsonify(object_counts)
+
+@app_views.route('/stats/cache/')
+def get_cache_stats():
+    """
+    Endpoint that returns the counters of the response cache.
+
+    Returns:
+        Response: JSON response with the hits, shared_hits, misses,
+        invalidations, evictions and expirations of the cache and its
+        current entries and bytes, empty when the cache is disabled.
+    """
+    cache = current_app.extensions.get("response_cache")
+    return jsonify(cache.counters() if cache is not None else {})
+
+@app_views.route('/stats/reloads/')
+def get_reload_stats():
+    """
+    Endpoint that returns the reload counters of the file storage.
+
+    Every request reloads the storage when it ends; these counters tell
+    how many reloads read the files and how many were skipped because
+    the files had not changed.
+
+    Returns:
+        Response: JSON response with the performed and skipped reloads
+        (and, in multi-process mode, the incremental ones), empty with
+        a database storage.
+    """
+    stats = getattr(storage, "reload_stats", None)
+    return jsonify(stats() if stats is not None else {})
+
+@app_views.route('/stats/pool/')
+def get_pool_stats():
+    """
+    Endpoint that returns the connection pool statistics of the
+    database storage.
+
+    Returns:
+        Response: JSON response with the size of the pool, the
+        connections checked in and out, the overflow in use, the
+        number of checkouts and their mean and max wait in
+        milliseconds, empty with the file storage.
+    """
+    stats = getattr(storage, "pool_stats", None)
+    return jsonify(stats() if stats is not None else {})
@@ -0,0 +1,126 @@
+#!/usr/bin/python3
+"""
+Keyset pagination of the list endpoints.
+
+A list endpoint pages when the query string has a "limit" or a "cursor".
+Pages are ordered by (created_at, id) and the cursor is the opaque,
+url-safe encoding of the (created_at, id) of the last object served, so a
+page is read straight from that position instead of skipping the objects
+of the previous pages. The body stays the JSON list of the objects; the
+next page is announced by a Link header (rel="next") and an X-Next-Cursor
+header, both missing on the last page. Unpaged lists are streamed when
+the request asks for it (see api.v1.views.streaming).
+"""
+import base64
+from bisect import bisect_right
+from datetime import datetime
+import json
+from flask import jsonify, request
+from api.v1.views.expansion import render, requested_expansions
+from api.v1.views.fieldsets import requested_fields
+from api.v1.views.streaming import stream_mode, stream_response
+from models import storage
+from models.base_model import time_format
+from urllib.parse import urlencode
+
+default_limit = 100
+max_limit = 1000
+
+
+def encode_cursor(obj):
+    """Returns the cursor of the page starting right after obj."""
+    raw = json.dumps([obj.created_at.strftime(time_format), obj.id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Returns the (created_at, id) a cursor points after."""
+    raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+    created_at, id_ = json.loads(raw)
+    return datetime.strptime(created_at, time_format), str(id_)
+
+
+def page_args():
+    """
+    Returns the (after, limit) of the requested page, (None, None) when
+    the request does not page. Raises ValueError on a bad parameter.
+    """
+    cursor = request.args.get("cursor")
+    limit = request.args.get("limit")
+    if cursor is None and limit is None:
+        return None, None
+    after = None
+    if cursor is not None:
+        try:
+            after = decode_cursor(cursor)
+        except (TypeError, ValueError):
+            raise ValueError("Invalid cursor")
+    if limit is None:
+        return after, default_limit
+    if not limit.isdigit() or not 0 < int(limit) <= max_limit:
+        raise ValueError("Invalid limit")
+    return after, int(limit)
+
+
+def page_response(objs, limit, fields=None, tree=None):
+    """
+    Returns the JSON response of a page, objs holding up to limit + 1
+    objects, the extra one telling there is a next page.
+    """
+    objs = list(objs)
+    response = jsonify(list(render(objs[:limit], fields, tree)))
+    if len(objs) > limit:
+        cursor = encode_cursor(objs[limit - 1])
+        args = request.args.to_dict()
+        args["cursor"] = cursor
+        url = "{}?{}".format(request.base_url, urlencode(args))
+        response.headers["Link"] = '<{}>; rel="next"'.format(url)
+        response.headers["X-Next-Cursor"] = cursor
+    return response
+
+
+def paginate(cls, filter_=None):
+    """
+    Returns the JSON response listing the objects of cls having the
+    values of filter_, paged when the request asks for it, limited to
+    the requested fields and with the requested relations embedded.
+    """
+    try:
+        after, limit = page_args()
+        tree = requested_expansions(cls)
+    except ValueError as e:
+        return str(e), 400
+    fields = requested_fields()
+    if limit is None:
+        mode = stream_mode()
+        if mode is not None:
+            return stream_response(storage.iter_page(
+                cls, filter_=filter_, fields=fields), mode, fields, tree)
+        if filter_ or fields is not None:
+            objs = storage.iter_page(cls, filter_=filter_, fields=fields)
+        else:
+            objs = storage.all(cls).values()
+        return jsonify(list(render(objs, fields, tree)))
+    return page_response(storage.iter_page(cls, after, limit + 1, filter_,
+                                           fields), limit, fields, tree)
+
+
+def paginate_list(objs, fields=None, tree=None):
+    """
+    Returns the JSON response listing the given fields of objs, with the
+    relations of tree embedded, paged in (created_at, id) order when the
+    request asks for it, streamed otherwise.
+    """
+    try:
+        after, limit = page_args()
+    except ValueError as e:
+        return str(e), 400
+    if limit is None:
+        return stream_response(objs, stream_mode() or "json", fields, tree)
+    objs = sorted(objs, key=lambda obj: (obj.created_at, obj.id))
+    start = 0
+    if after is not None:
+        start = bisect_right([(obj.created_at, obj.id) for obj in objs],
+                             after)
+    return page_response(objs[start:start + limit + 1], limit, fields,
+                         tree)
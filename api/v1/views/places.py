@@ -6,9 +6,20 @@ from flask import (abort, jsonify, request)
 from api.v1.views import app_views
 from models.place import Place
 from models import storage
-import os
+from api.v1.views.pagination import paginate, paginate_list
+from api.v1.views.fieldsets import requested_fields
+from api.v1.views.conditional import conditional
+from api.v1.views.expansion import object_response, requested_expansions
+
+# places_search body keys -> (Place attribute, index in (min, max))
+range_filters = {"min_price": ("price_by_night", 0),
+                 "max_price": ("price_by_night", 1),
+                 "min_rooms": ("number_rooms", 0),
+                 "min_bathrooms": ("number_bathrooms", 0),
+                 "min_guests": ("max_guest", 0)}
 
 @app_views.route('/cities/<city_id>/places', methods=['GET'], strict_slashes=False)
+@conditional("City", "Place")
 def get_places_in_city(city_id):
     """Retrieve all places in a specified city.
 
@@ -21,11 +32,11 @@ def get_places_in_city(city_id):
     city = storage.get("City", city_id)
     if city is None:
         abort(404)
-    places = [place.to_json() for place in city.places]
-    return jsonify(places)
+    return paginate("Place", {"city_id": city_id})
 
 
 @app_views.route('/places/<place_id>', methods=['GET'], strict_slashes=False)
+@conditional("Place")
 def get_place(place_id):
     """Retrieve a place by its ID.
 
@@ -38,7 +49,7 @@ def get_place(place_id):
     place = storage.get("Place", place_id)
     if place is None:
         abort(404)
-    return jsonify(place.to_json())
+    return object_response(place)
 
 
 @app_views.route('/places/<place_id>', methods=['DELETE'], strict_slashes=False)
@@ -115,33 +126,54 @@ def update_place(place_id):
 def search_places():
     """Search for places based on filters.
 
+    The JSON body may hold lists of "states", "cities" and "amenities"
+    ids, and the geographic filters:
+        "center": {"latitude": <float>, "longitude": <float>}, the
+            results are then sorted by distance to it,
+        "radius": maximum distance to "center", in kilometers,
+        "bbox": [west, south, east, north], in degrees,
+    and the numeric ranges "min_price", "max_price", "min_rooms",
+    "min_bathrooms" and "min_guests". A "fields" list of attribute names
+    (or ?fields=) limits the serialized attributes of the places, and
+    ?expand= embeds their reviews or amenities.
+
     Returns:
         JSON: List of places matching the search criteria.
     """
     data = request.get_json()
     if not data:
         return "Not a JSON", 400
-    
-    city_ids = data.get("cities", [])
-    state_ids = data.get("states", [])
-    amenities_ids = data.get("amenities", [])
-
-    if state_ids:
-        states = [storage.get("State", state_id) for state_id in state_ids]
-        city_ids.extend([city.id for state in states if state for city in state.cities])
-    
-    city_ids = list(set(city_ids))
-    
-    all_places = storage.all("Place").values()
-    
-    if city_ids:
-        all_places = [place for place in all_places if place.city_id in city_ids]
-    
-    if amenities_ids:
-        if os.getenv('HBNB_TYPE_STORAGE', 'fs') != 'db':
-            all_places = [place for place in all_places if set(amenities_ids).issubset(set(place.amenities_id))]
-        else:
-            all_places = [place for place in all_places if all(amenity in [a.id for a in place.amenities] for amenity in amenities_ids)]
-    
-    return jsonify([place.to_json() for place in all_places])
-
+    center = data.get("center")
+    radius = data.get("radius")
+    bbox = data.get("bbox")
+    try:
+        if center is not None:
+            center = (float(center["latitude"]), float(center["longitude"]))
+        if radius is not None:
+            radius = float(radius)
+            if center is None or radius < 0:
+                raise ValueError
+        if bbox is not None:
+            bbox = tuple(float(v) for v in bbox)
+            if len(bbox) != 4 or bbox[1] > bbox[3]:
+                raise ValueError
+    except (KeyError, TypeError, ValueError):
+        return "Invalid geographic filter", 400
+    ranges = {}
+    for key, (attr, bound) in range_filters.items():
+        if data.get(key) is not None:
+            if type(data[key]) not in (int, float):
+                return "Invalid {}".format(key), 400
+            ranges.setdefault(attr, [None, None])[bound] = data[key]
+    try:
+        fields = requested_fields(data)
+        tree = requested_expansions("Place")
+    except ValueError as e:
+        return str(e), 400
+
+    places = storage.search_places(states=data.get("states", []),
+                                   cities=data.get("cities", []),
+                                   amenities=data.get("amenities", []),
+                                   center=center, radius=radius, bbox=bbox,
+                                   ranges=ranges, fields=fields)
+    return paginate_list(places, fields, tree)
@@ -6,23 +6,27 @@ from flask import (abort, jsonify, request)
 from api.v1.views import app_views
 from models.review import Review
 from models import storage
+from api.v1.views.pagination import paginate
+from api.v1.views.conditional import conditional
+from api.v1.views.expansion import object_response
 
 @app_views.route("/places/<place_id>/reviews", methods=["GET"], strict_slashes=False)
+@conditional("Place", "Review")
 def get_reviews_for_place(place_id):
     """Retrieve all reviews for a specific place."""
     place = storage.get("Place", place_id)
     if not place:
         abort(404)
-    reviews = [review.to_json() for review in place.reviews]
-    return jsonify(reviews)
+    return paginate("Review", {"place_id": place_id})
 
 @app_views.route("/reviews/<review_id>", methods=["GET"], strict_slashes=False)
+@conditional("Review")
 def get_review(review_id):
     """Retrieve a single review by its ID."""
     review = storage.get("Review", review_id)
     if not review:
         abort(404)
-    return jsonify(review.to_json())
+    return object_response(review)
 
 @app_views.route("/reviews/<review_id>", methods=["DELETE"], strict_slashes=False)
 def delete_review(review_id):
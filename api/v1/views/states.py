@@ -6,9 +6,13 @@ Provides CRUD operations and other endpoints to interact with the State data.
 from api.v1.views import app_views
 from models.state import State
 from models import storage
+from api.v1.views.pagination import paginate
+from api.v1.views.conditional import conditional
+from api.v1.views.expansion import object_response
 from flask import abort, jsonify, make_response, request
 
 @app_views.route('/states', methods=['GET'], strict_slashes=False)
+@conditional("State")
 def view_all_states():
     """
     Retrieves a list of all states.
@@ -33,6 +37,18 @@ def view_all_states():
             type: string
             description: The last update date of the object
 
+    parameters:
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        description: Page size; the next page is linked by the Link header
+      - name: cursor
+        in: query
+        type: string
+        required: false
+        description: Opaque position of the page, from X-Next-Cursor
+
     responses:
       200:
         description: A list of dictionaries, each representing a State
@@ -43,10 +59,10 @@ def view_all_states():
             'id': '10098698-bace-4bfb-8c0a-6bae0f7f5b8f', 'name': 'Oregon',
             'updated_at': '2017-03-25T02:17:06'}]
     """
-    all_states = [state.to_json() for state in storage.all("State").values()]
-    return jsonify(all_states)
+    return paginate("State")
 
 @app_views.route('/states/<state_id>', methods=['GET'], strict_slashes=False)
+@conditional("State")
 def view_one_state(state_id=None):
     """
     Retrieves a state by its ID.
@@ -93,7 +109,7 @@ def view_one_state(state_id=None):
     state = storage.get("State", state_id)
     if state is None:
         abort(404)
-    return jsonify(state.to_json())
+    return object_response(state)
 
 @app_views.route('/states/<state_id>', methods=['DELETE'], strict_slashes=False)
 def delete_state(state_id=None):
@@ -0,0 +1,65 @@
+#!/usr/bin/python3
+"""
+Streaming JSON responses of the list endpoints.
+
+A streamed list is written while the objects are read from storage,
+one chunk of serialized objects at a time, instead of building the list
+of their dictionaries and the whole JSON document first: memory stays
+bounded by the chunk size and the first bytes leave before the last
+object is read. The body is the same JSON array as a jsonify'ed list,
+or one JSON object per line when the client accepts
+application/x-ndjson.
+"""
+from flask import current_app, request, stream_with_context
+from api.v1.views.expansion import render
+
+ndjson_mimetype = "application/x-ndjson"
+chunk_size = 64 * 1024
+
+
+def stream_mode():
+    """
+    Returns the streaming mode asked for by the request: "ndjson" when
+    it prefers application/x-ndjson, "json" with ?stream=true, or None.
+    """
+    accepted = request.accept_mimetypes
+    if accepted.best_match(["application/json",
+                            ndjson_mimetype]) == ndjson_mimetype:
+        return "ndjson"
+    if request.args.get("stream", "false") in ("true", "1"):
+        return "json"
+    return None
+
+
+def stream_response(objs, mode="json", fields=None, tree=None):
+    """
+    Returns the response streaming the to_json(fields) of objs, with the
+    relations of tree embedded, a JSON array or, in "ndjson" mode,
+    newline delimited JSON.
+    """
+    dumps = current_app.json.dumps
+    ndjson = mode == "ndjson"
+
+    def generate():
+        """Yields the serialized objects, chunk_size bytes at a time."""
+        chunk = [] if ndjson else ["["]
+        size = 0
+        for i, new_dict in enumerate(render(objs, fields, tree)):
+            item = dumps(new_dict, separators=(",", ":"))
+            if ndjson:
+                item += "\n"
+            elif i:
+                item = "," + item
+            chunk.append(item)
+            size += len(item)
+            if size >= chunk_size:
+                yield "".join(chunk)
+                chunk = []
+                size = 0
+        if not ndjson:
+            chunk.append("]\n")
+        yield "".join(chunk)
+
+    return current_app.response_class(
+        stream_with_context(generate()),
+        mimetype=ndjson_mimetype if ndjson else "application/json")
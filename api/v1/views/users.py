@@ -6,9 +6,13 @@ from flask import (abort, jsonify, request)
 from api.v1.views import app_views
 from models.user import User
 from models import storage
+from api.v1.views.pagination import paginate
+from api.v1.views.conditional import conditional
+from api.v1.views.expansion import object_response
 
 @app_views.route('/users', methods=['GET'], strict_slashes=False)
 @app_views.route('/users/<user_id>', methods=['GET'], strict_slashes=False)
+@conditional("User")
 def get_users(user_id=None):
     """
     Retrieves user information.
@@ -23,6 +27,16 @@ def get_users(user_id=None):
         description: The ID of the user to retrieve. If not provided, retrieves all users.
         required: false
         example: "32c11d3d-99a1-4406-ab41-7b6ccb7dd760"
+      - name: limit
+        in: query
+        type: integer
+        description: Page size of the list; the next page is linked by the Link header.
+        required: false
+      - name: cursor
+        in: query
+        type: string
+        description: Opaque position of the page, from X-Next-Cursor.
+        required: false
 
     Responses:
       200:
@@ -56,12 +70,11 @@ def get_users(user_id=None):
                 ]
     """
     if user_id is None:
-        users = [user.to_json() for user in storage.all("User").values()]
-        return jsonify(users)
+        return paginate("User")
     user = storage.get("User", user_id)
     if user is None:
         abort(404)
-    return jsonify(user.to_json())
+    return object_response(user)
 
 @app_views.route('/users/<user_id>', methods=['DELETE'], strict_slashes=False)
 def delete_user(user_id):
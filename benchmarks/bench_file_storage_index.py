@@ -0,0 +1,53 @@
+#!/usr/bin/python3
+"""
+Benchmarks FileStorage lookups on a large in-memory store.
+
+Usage: python3 -m benchmarks.bench_file_storage_index [number_of_objects]
+
+Fills FileStorage with number_of_objects objects (1,000,000 by default)
+spread over every model class, then reports the per-call latency of
+get(), count(cls) and all(cls). Nothing is written to file.json.
+"""
+from models import storage
+from models.amenity import Amenity
+from models.city import City
+from models.engine.file_storage import FileStorage
+from models.place import Place
+from models.review import Review
+from models.state import State
+from models.user import User
+import sys
+import timeit
+
+
+def fill(n):
+    """Loads n objects in the store, returns the id of one State"""
+    FileStorage._FileStorage__objects = {}
+    classes = [Review, Place, User, City, Amenity, State]
+    weights = [60, 20, 10, 6, 3, 1]
+    state_id = None
+    for cls, weight in zip(classes, weights):
+        for i in range(n * weight // sum(weights)):
+            obj = cls()
+            storage.new(obj)
+            state_id = obj.id
+    return state_id
+
+
+def bench(label, stmt, number):
+    """Prints the mean latency of stmt over number calls"""
+    seconds = timeit.timeit(stmt, number=number) / number
+    print("{:<24}{:>14.2f} us".format(label, seconds * 1e6))
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    state_id = fill(n)
+    print("{} objects, {} State".format(storage.count(),
+                                        storage.count("State")))
+    bench("get('State', id)", lambda: storage.get("State", state_id), 10000)
+    bench("count('State')", lambda: storage.count("State"), 10000)
+    bench("all('State')", lambda: storage.all("State"), 100)
+    bench("stats (6 x count)", lambda: [storage.count(c) for c in
+                                        ("Amenity", "City", "Place",
+                                         "Review", "State", "User")], 1000)
@@ -0,0 +1,66 @@
+#!/usr/bin/python3
+"""
+Benchmarks the places_search numeric range filters in FileStorage.
+
+Usage: python3 -m benchmarks.bench_place_ranges [number_of_places]
+
+Fills FileStorage with number_of_places places (1,000,000 by default)
+with random prices, rooms and guests, then compares a list comprehension
+over storage.all("Place") with storage.search_places(ranges=...), which
+evaluates the ranges over the numpy column store. Nothing is written to
+file.json.
+"""
+from models import storage
+from models.engine import file_storage
+from models.engine.file_storage import FileStorage
+from models.place import Place
+import random
+import sys
+import time
+
+
+def fill(n):
+    """Loads n places in the store"""
+    rand = random.Random(0)
+    FileStorage._FileStorage__objects = {}
+    for i in range(n):
+        storage.new(Place(price_by_night=rand.randrange(20, 1000),
+                          number_rooms=rand.randrange(1, 8),
+                          max_guest=rand.randrange(1, 16),
+                          latitude=rand.uniform(-60, 60),
+                          longitude=rand.uniform(-180, 180)))
+
+
+def comprehension(low, high, rooms, guests):
+    """Filters the places in Python"""
+    return [place for place in storage.all("Place").values()
+            if low <= place.price_by_night <= high and
+            place.number_rooms >= rooms and place.max_guest >= guests]
+
+
+def bench(label, func, number):
+    """Prints the mean latency of func over number calls"""
+    start = time.perf_counter()
+    for i in range(number):
+        found = func()
+    seconds = (time.perf_counter() - start) / number
+    print("{:<28}{:>10.2f} ms {:>8} places".format(label, seconds * 1000,
+                                                   len(found)))
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    fill(n)
+    print("{} places, numpy {}".format(
+        storage.count("Place"),
+        "installed" if file_storage.numpy else "missing"))
+    for low, high, rooms, guests in ((100, 150, 3, 4), (20, 1000, 7, 15)):
+        label = "price {}-{} rooms {} guests {}".format(low, high, rooms,
+                                                        guests)
+        print(label)
+        bench("  list comprehension",
+              lambda: comprehension(low, high, rooms, guests), 5)
+        bench("  search_places(ranges)", lambda: storage.search_places(
+            ranges={"price_by_night": (low, high),
+                    "number_rooms": (rooms, None),
+                    "max_guest": (guests, None)}), 5)
@@ -0,0 +1,94 @@
+#!/usr/bin/python3
+"""
+Benchmarks places_search filtering.
+
+Usage: python3 -m benchmarks.bench_places_search [number_of_places]
+
+Fills the storage selected by HBNB_TYPE_STORAGE with number_of_places
+places (100,000 by default) spread over 50 states of 10 cities, each
+place having 5 of 50 amenities. Then compares the filtering that
+places_search used to do in Python over storage.all("Place") with
+storage.search_places(). Point HBNB_SQLITE_PATH at a scratch database,
+file storage is never saved.
+"""
+import models
+from models import storage
+from models.amenity import Amenity
+from models.city import City
+from models.place import Place
+from models.state import State
+from models.user import User
+import random
+import sys
+import time
+
+
+def fill(n):
+    """Creates the states, cities, amenities and n places"""
+    rand = random.Random(0)
+    user = User(email="bench@hbnb.io", password="bench")
+    amenities = [Amenity(name="a{}".format(i)) for i in range(50)]
+    states = [State(name="s{}".format(i)) for i in range(50)]
+    cities = [City(name="c", state_id=state.id)
+              for state in states for i in range(10)]
+    for obj in [user] + amenities + states + cities:
+        storage.new(obj)
+    for i in range(n):
+        place = Place(name="p", city_id=rand.choice(cities).id,
+                      user_id=user.id)
+        linked = rand.sample(amenities, 5)
+        if models.storage_t == "db":
+            place.amenities.extend(linked)
+        else:
+            place.amenity_ids = [amenity.id for amenity in linked]
+        storage.new(place)
+    if models.storage_t == "db":
+        storage.save()
+    return states, cities, amenities
+
+
+def python_filter(states, cities, amenities):
+    """The places_search filtering before storage.search_places()"""
+    city_ids = list(cities)
+    for state_id in states:
+        state = storage.get("State", state_id)
+        city_ids.extend([city.id for city in state.cities])
+    city_ids = list(set(city_ids))
+    places = storage.all("Place").values()
+    if city_ids:
+        places = [place for place in places if place.city_id in city_ids]
+    if amenities:
+        if models.storage_t != "db":
+            places = [place for place in places
+                      if set(amenities).issubset(set(place.amenity_ids))]
+        else:
+            places = [place for place in places if
+                      all(amenity in [a.id for a in place.amenities]
+                          for amenity in amenities)]
+    return places
+
+
+def bench(label, func, number):
+    """Prints the mean latency of func over number calls"""
+    start = time.perf_counter()
+    for i in range(number):
+        found = func()
+    seconds = (time.perf_counter() - start) / number
+    print("{:<36}{:>10.2f} ms {:>8} places".format(label, seconds * 1000,
+                                                   len(found)))
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    states, cities, amenities = fill(n)
+    queries = {
+        "1 state": ([states[0].id], [], []),
+        "1 state + 1 city + 2 amenities": ([states[0].id], [cities[-1].id],
+                                           [a.id for a in amenities[:2]]),
+        "2 amenities": ([], [], [a.id for a in amenities[:2]]),
+    }
+    for label, (s, c, a) in queries.items():
+        number = 3 if models.storage_t == "db" and not (s or c) else 10
+        bench("python  " + label, lambda: python_filter(s, c, a), number)
+        bench("storage " + label,
+              lambda: storage.search_places(s, c, a), number)
@@ -0,0 +1,72 @@
+#!/usr/bin/python3
+"""
+Benchmarks the cold start of FileStorage: reload() of a large file.json.
+
+Usage: python3 -m benchmarks.bench_reload [megabytes]
+
+Writes about megabytes MB of places (100 by default) to a temporary
+file, then times reload() and the first get() after it, and measures
+with tracemalloc (which slows the second, measured, reload down) the
+memory the loaded objects hold and the peak memory reload() and save()
+need on top of it. The indexes of FileStorage are only
+built by the first call that needs them, so they are timed apart.
+Run it with HBNB_FS_LAZY=yes to measure the lazy mode, where reload()
+builds no object: the memory is then measured again once all() built
+every one of them.
+file.json itself is left untouched.
+"""
+from benchmarks.bench_serializer import fill
+from models import storage
+from models.engine.file_storage import FileStorage
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+
+def cold_reload():
+    """Reloads the file as a new process would"""
+    FileStorage._FileStorage__objects = {}
+    FileStorage._FileStorage__synced = (None, None)
+    storage.reload()
+
+
+def timed(label, func):
+    """Prints the duration of func"""
+    start = time.perf_counter()
+    func()
+    print("{:<32}{:>10.3f} s".format(label, time.perf_counter() - start))
+
+
+if __name__ == "__main__":
+    megabytes = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    with tempfile.TemporaryDirectory() as tmp:
+        FileStorage._FileStorage__file_path = os.path.join(tmp, "file.json")
+        fill(megabytes)
+        storage.save()
+        print("{} places, {:.1f} MB".format(
+            storage.count("Place"),
+            os.path.getsize(FileStorage._FileStorage__file_path) / 2 ** 20))
+        timed("reload()", cold_reload)
+        timed("first get()", lambda: storage.get("Place", "1").created_at)
+        timed("indexes, first related()",
+              lambda: storage.related("Place", "city_id", "1"))
+        FileStorage._FileStorage__objects = {}
+        tracemalloc.start()
+        cold_reload()
+        held, peak = tracemalloc.get_traced_memory()
+        print("{:<32}{:>10.1f} MB".format("held by the objects",
+                                          held / 2 ** 20))
+        print("{:<32}{:>10.1f} MB".format("reload() peak above that",
+                                          (peak - held) / 2 ** 20))
+        storage.all()
+        held = tracemalloc.get_traced_memory()[0]
+        print("{:<32}{:>10.1f} MB".format("held once all() built them",
+                                          held / 2 ** 20))
+        tracemalloc.reset_peak()
+        storage.save()
+        print("{:<32}{:>10.1f} MB".format(
+            "save() peak", (tracemalloc.get_traced_memory()[1] - held) /
+            2 ** 20))
+        tracemalloc.stop()
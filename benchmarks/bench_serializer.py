@@ -0,0 +1,73 @@
+#!/usr/bin/python3
+"""
+Benchmarks FileStorage save() and reload() with each JSON backend.
+
+Usage: python3 -m benchmarks.bench_serializer [megabytes]
+
+Fills FileStorage with places until file.json weighs about megabytes MB
+(100 by default), then times save() and reload() on a temporary file
+with the json module and with orjson (when installed), and the former
+path, to_dict() with strftime dates then json.dumps, for reference. The
+time spent parsing the file is shown apart from the building of the
+objects.
+file.json itself is left untouched.
+"""
+import json
+from models import storage
+from models.engine import serializer
+from models.engine.file_storage import FileStorage
+from models.place import Place
+import os
+import sys
+import tempfile
+import time
+
+
+def fill(megabytes):
+    """Loads places in the store until they weigh about megabytes MB"""
+    FileStorage._FileStorage__objects = {}
+    sample = Place(name="Place", description="A nice place " * 20,
+                   price_by_night=100, number_rooms=2, max_guest=4,
+                   latitude=48.85, longitude=2.35)
+    size = len(json.dumps(sample.to_dict())) + len("Place.") + 40
+    for i in range(megabytes * 1024 * 1024 // size):
+        storage.new(Place(**dict(sample.to_dict(), id=str(i))))
+
+
+def timed(label, func):
+    """Prints the duration of func"""
+    start = time.perf_counter()
+    func()
+    print("{:<32}{:>10.2f} s".format(label, time.perf_counter() - start))
+
+
+def former_save(path):
+    """Saves the way FileStorage did with the json module only"""
+    store = {k: v.to_dict() for k, v in storage.all().items()}
+    with open(path, "w", encoding="utf-8") as fd:
+        fd.write(json.dumps(store))
+
+
+if __name__ == "__main__":
+    megabytes = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    fill(megabytes)
+    orjson = serializer.orjson
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "file.json")
+        FileStorage._FileStorage__file_path = path
+        timed("to_dict + json.dumps (former)", lambda: former_save(path))
+        print("{} places, {:.1f} MB".format(storage.count("Place"),
+                                            os.path.getsize(path) / 2 ** 20))
+        for backend in ("json", "orjson"):
+            if backend == "orjson" and orjson is None:
+                print("orjson is not installed")
+                continue
+            serializer.orjson = orjson if backend == "orjson" else None
+            timed("save() " + backend, storage.save)
+            with open(path, "rb") as fd:
+                data = fd.read()
+            FileStorage._FileStorage__synced = (None, None)
+            timed("reload() " + backend, storage.reload)
+            timed("  of which loads() " + backend,
+                  lambda: serializer.loads(data))
+    serializer.orjson = orjson
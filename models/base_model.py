@@ -13,6 +13,44 @@ import uuid
 
 time_format = "%Y-%m-%dT%H:%M:%S.%f"
 
+
+def parse_datetime(value):
+    """parses a datetime in time_format, also accepting ISO 8601 without
+    the microseconds as written by the orjson serializer when they are 0;
+    fromisoformat is tried first as it is much faster than strptime"""
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return datetime.strptime(value, time_format)
+
+
+class LazyDatetime:
+    """data descriptor of a datetime attribute that may hold the string
+    read from file.json: it is parsed on first access only, so loading
+    objects never parses the dates nobody reads"""
+
+    def __set_name__(self, owner, name):
+        """remembers the name of the attribute"""
+        self.name = name
+
+    def __get__(self, obj, owner=None):
+        """returns the datetime, parsing and caching a string first"""
+        if obj is None:
+            return self
+        try:
+            value = obj.__dict__[self.name]
+        except KeyError:
+            raise AttributeError(self.name)
+        if isinstance(value, str):
+            value = parse_datetime(value)
+            obj.__dict__[self.name] = value
+        return value
+
+    def __set__(self, obj, value):
+        """stores the value in the instance"""
+        obj.__dict__[self.name] = value
+
+
 if models.storage_t == "db":
     Base = declarative_base()
 else:
@@ -23,8 +61,12 @@ class BaseModel:
     """The BaseModel class from which future classes will be derived"""
     if models.storage_t == "db":
         id = Column(String(60), primary_key=True)
-        created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+        created_at = Column(DateTime, default=datetime.utcnow, nullable=False,
+                            index=True)
         updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    else:
+        created_at = LazyDatetime()
+        updated_at = LazyDatetime()
 
     def __init__(self, *args, **kwargs):
         """Initialization of the base model"""
@@ -32,14 +74,14 @@ class BaseModel:
             for key, value in kwargs.items():
                 if key != "__class__":
                     setattr(self, key, value)
-            if kwargs.get("created_at", None) and isinstance(self.created_at, str):
-                self.created_at = datetime.strptime(
-                    kwargs["created_at"], time_format)
+            if kwargs.get("created_at", None) and \
+                    isinstance(kwargs["created_at"], str):
+                self.created_at = parse_datetime(kwargs["created_at"])
             else:
                 self.created_at = datetime.utcnow()
-            if kwargs.get("updated_at", None) and isinstance(self.updated_at, str):
-                self.updated_at = datetime.strptime(
-                    kwargs["updated_at"], time_format)
+            if kwargs.get("updated_at", None) and \
+                    isinstance(kwargs["updated_at"], str):
+                self.updated_at = parse_datetime(kwargs["updated_at"])
             else:
                 self.updated_at = datetime.utcnow()
             if kwargs.get("id", None) is None:
@@ -49,6 +91,14 @@ class BaseModel:
             self.created_at = datetime.utcnow()
             self.updated_at = self.created_at
 
+    if models.storage_t != "db":
+        def __setattr__(self, name, value):
+            """sets an attribute, keeping the storage indexes up to date"""
+            super().__setattr__(name, value)
+            storage = getattr(models, "storage", None)
+            if storage is not None:
+                storage.reindex(self, name)
+
     def __str__(self):
         """String representation of the BaseModel class"""
         return "[{:s}] ({:s}) {}".format(self.__class__.__name__, self.id,
@@ -60,20 +110,39 @@ class BaseModel:
         models.storage.new(self)
         models.storage.save()
 
-    def to_dict(self):
-        """returns a dictionary containing all keys/values of the instance"""
+    def to_dict(self, format_dates=True):
+        """returns a dictionary containing all keys/values of the instance,
+        with the dates left as datetime objects, or as the strings they
+        were loaded from if never read, unless format_dates"""
         new_dict = self.__dict__.copy()
-        if "created_at" in new_dict:
-            new_dict["created_at"] = new_dict["created_at"].strftime(
-                time_format)
-        if "updated_at" in new_dict:
-            new_dict["updated_at"] = new_dict["updated_at"].strftime(
-                time_format)
+        if format_dates and "created_at" in new_dict:
+            new_dict["created_at"] = self.created_at.strftime(time_format)
+        if format_dates and "updated_at" in new_dict:
+            new_dict["updated_at"] = self.updated_at.strftime(time_format)
         new_dict["__class__"] = self.__class__.__name__
         if "_sa_instance_state" in new_dict:
             del new_dict["_sa_instance_state"]
         return new_dict
 
+    def to_json(self, fields=None):
+        """returns the dictionary of the instance exposed by the API,
+        limited to the attributes named in fields when given"""
+        if fields is None:
+            new_dict = self.to_dict()
+            new_dict.pop("password", None)
+            return new_dict
+        new_dict = {}
+        for name in fields:
+            if name == "__class__":
+                new_dict[name] = self.__class__.__name__
+            elif name in self.__dict__ and name not in (
+                    "password", "_sa_instance_state"):
+                value = getattr(self, name)
+                if isinstance(value, datetime):
+                    value = value.strftime(time_format)
+                new_dict[name] = value
+        return new_dict
+
     def delete(self):
         """delete the current instance from the storage"""
         models.storage.delete(self)
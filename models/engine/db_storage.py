@@ -1,19 +1,73 @@
 #!/usr/bin/python3
+"""
+This is the db_storage module.
+This module deals with storing and retrieving data from a mysql database.
+This module contains one class DBStorage.
+"""
+from contextlib import contextmanager
+from datetime import datetime
 from models.amenity import Amenity
 from models.base_model import Base
 from models.city import City
+from models.engine import geo
 from models.place import Place
 from models.review import Review
 from models.state import State
 from models.user import User
 from os import getenv
-from sqlalchemy import (create_engine, func)
-from sqlalchemy.orm import (sessionmaker, scoped_session)
-"""
-This is the db_storage module.
-This module deals with storing and retrieving data from a mysql database.
-This module contains one class DBStorage.
-"""
+from sqlalchemy import (Column, DateTime, Integer, MetaData, String, Table,
+                        and_, create_engine, distinct, event, func, literal,
+                        or_, select, text, union_all)
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import (load_only, selectinload, sessionmaker,
+                            scoped_session)
+from sqlalchemy.pool import QueuePool
+import threading
+import time
+
+# generation of the objects of every class, bumped by the transactions
+# changing them (see DBStorage.version); on its own metadata as Base is
+# not declarative outside db mode
+class_versions = Table('class_versions', MetaData(),
+                       Column('cls', String(60), primary_key=True),
+                       Column('generation', Integer, nullable=False),
+                       Column('changed_at', DateTime, nullable=False))
+
+
+class TimedQueuePool(QueuePool):
+    """
+    class TimedQueuePool
+    QueuePool recording how long checkouts wait for a connection
+
+    instance attributes:
+       checkouts: number of connections checked out of the pool
+       wait_total: total time spent waiting for them, in seconds
+       wait_max: longest wait, in seconds
+    """
+
+    def __init__(self, *args, **kwargs):
+        """
+        initializes the pool and its counters
+        """
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.__lock = threading.Lock()
+
+    def _do_get(self):
+        """
+        checks a connection out of the pool, timing the wait
+        """
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - start
+            with self.__lock:
+                self.checkouts += 1
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
 
 
 class DBStorage:
@@ -24,34 +78,107 @@ class DBStorage:
     **class attributes**
        __engine: private, sqlAlchemy engine
        __session: private, MySQL session
+       __batch: private, per thread depth of nested batch() blocks
+
+    environment variables (connection pool):
+       HBNB_DB_POOL_SIZE: connections kept open (default 5)
+       HBNB_DB_MAX_OVERFLOW: extra connections allowed (default 10)
+       HBNB_DB_POOL_TIMEOUT: seconds to wait for a connection (default 30)
+       HBNB_DB_POOL_RECYCLE: seconds after which a connection is
+           replaced, keep it under MySQL wait_timeout (default 3600)
+       HBNB_DB_POOL_PRE_PING: "yes" to test connections on checkout
+           (default yes)
+       HBNB_DB_POOL_WARM: "yes" to open the pool_size connections at
+           startup (default yes)
 
     instance attributes:
        __models_available: private, dictionary of <string> <class>
     """
     __engine = None
     __session = None
+    __batch = threading.local()
 
     def __init__(self):
         """
         initializes engine
         """
-        self.__engine = create_engine('mysql+mysqldb://{}:{}@{}/{}'.format(
-            getenv('HBNB_MYSQL_USER'),
-            getenv('HBNB_MYSQL_PWD'),
-            getenv('HBNB_MYSQL_HOST'),
-            getenv('HBNB_MYSQL_DB')))
+        self.__engine = self._create_engine()
         self.__models_available = {"User": User,
                                    "Amenity": Amenity, "City": City,
                                    "Place": Place, "Review": Review,
                                    "State": State}
         if getenv('HBNB_MYSQL_ENV', 'not') == 'test':
             Base.metadata.drop_all(self.__engine)
+            class_versions.metadata.drop_all(self.__engine)
+        if getenv('HBNB_DB_POOL_WARM', 'yes') == 'yes':
+            self.warm_pool()
+
+    def _create_engine(self):
+        """
+        creates the sqlAlchemy engine, overridden by other SQL backends
+        """
+        return create_engine('mysql+mysqldb://{}:{}@{}/{}'.format(
+            getenv('HBNB_MYSQL_USER'),
+            getenv('HBNB_MYSQL_PWD'),
+            getenv('HBNB_MYSQL_HOST'),
+            getenv('HBNB_MYSQL_DB')), **self._pool_options())
+
+    @staticmethod
+    def _pool_options():
+        """
+        create_engine keyword arguments for the connection pool,
+        read from the HBNB_DB_POOL_* environment variables
+        """
+        return {
+            'poolclass': TimedQueuePool,
+            'pool_size': int(getenv('HBNB_DB_POOL_SIZE', 5)),
+            'max_overflow': int(getenv('HBNB_DB_MAX_OVERFLOW', 10)),
+            'pool_timeout': float(getenv('HBNB_DB_POOL_TIMEOUT', 30)),
+            'pool_recycle': int(getenv('HBNB_DB_POOL_RECYCLE', 3600)),
+            'pool_pre_ping': getenv('HBNB_DB_POOL_PRE_PING', 'yes') == 'yes',
+        }
+
+    def warm_pool(self):
+        """
+        opens the pool_size connections of the pool up front, so the
+        first requests do not pay for the connection setup
+        """
+        pool = self.__engine.pool
+        connections = []
+        try:
+            for i in range(pool.size()):
+                connections.append(self.__engine.raw_connection())
+        finally:
+            for connection in connections:
+                connection.close()
+
+    def pool_stats(self):
+        """
+        Occupancy and checkout wait times of the connection pool
+
+        Return:
+            dictionary with the pool size, the connections checked in
+            and out, the overflow in use, the number of checkouts and
+            their mean and max wait in milliseconds
+        """
+        pool = self.__engine.pool
+        stats = {"size": pool.size(), "checked_in": pool.checkedin(),
+                 "checked_out": pool.checkedout(),
+                 "overflow": pool.overflow()}
+        checkouts = getattr(pool, "checkouts", 0)
+        stats["checkouts"] = checkouts
+        stats["wait_mean_ms"] = \
+            pool.wait_total / checkouts * 1000 if checkouts else 0.0
+        stats["wait_max_ms"] = getattr(pool, "wait_max", 0.0) * 1000
+        return stats
 
     def all(self, cls=None):
         """
         returns a dictionary of all the class objects
         """
         orm_objects = {}
+        if cls is not None and not isinstance(cls, str):
+            cls = cls.__name__
         if cls:
             for k in self.__session.query(self.__models_available[cls]):
                 orm_objects[k.__dict__['id']] = k
@@ -69,11 +196,23 @@ class DBStorage:
         """
         self.__session.add(obj)
 
+    def new_many(self, objs):
+        """
+        adds several objs to the session
+        """
+        self.__session.add_all(objs)
+
     def save(self):
         """
         saves the objects fom the current session
+
+        Inside a batch() block the changes are only flushed to the
+        database, and committed when the outermost block exits.
         """
-        self.__session.commit()
+        if getattr(self.__batch, "depth", 0):
+            self.__session.flush()
+        else:
+            self.__session.commit()
 
     def delete(self, obj=None):
         """
@@ -81,7 +220,39 @@ class DBStorage:
         """
         if obj is not None:
             self.__session.delete(obj)
-            self.__session.commit()
+            self.save()
+
+    def delete_many(self, objs):
+        """
+        deletes several objects from the current session, committed once
+        """
+        for obj in objs:
+            self.__session.delete(obj)
+        self.save()
+
+    @contextmanager
+    def batch(self):
+        """
+        Runs the block as one unit of work, committed once at the end
+
+        Nested blocks join the outermost one. If the block raises, the
+        whole unit of work is rolled back. FileStorage.batch() only
+        defers the saves: there, the changes made before the error are
+        kept and saved.
+        """
+        depth = getattr(self.__batch, "depth", 0)
+        self.__batch.depth = depth + 1
+        try:
+            yield self
+        except BaseException:
+            if depth == 0:
+                self.__session.rollback()
+            raise
+        else:
+            if depth == 0:
+                self.__session.commit()
+        finally:
+            self.__batch.depth = depth
 
     def reload(self):
         """
@@ -89,8 +260,55 @@ class DBStorage:
         be in the init method
         """
         Base.metadata.create_all(self.__engine)
-        self.__session = scoped_session(sessionmaker(bind=self.__engine,
-                                                     expire_on_commit=False))
+        class_versions.metadata.create_all(self.__engine)
+        self._add_versions()
+        factory = sessionmaker(bind=self.__engine, expire_on_commit=False)
+        event.listen(factory, 'after_flush', self._flushed)
+        event.listen(factory, 'before_commit', self._bump_versions)
+        event.listen(factory, 'after_rollback',
+                     lambda session: session.info.pop('changed', None))
+        self.__session = scoped_session(factory)
+
+    def _add_versions(self):
+        """
+        adds the missing rows of class_versions, one per class
+        """
+        with self.__engine.begin() as conn:
+            known = set(conn.execute(select(class_versions.c.cls)).scalars())
+            rows = [{'cls': name, 'generation': 0,
+                     'changed_at': datetime.utcnow().replace(microsecond=0)}
+                    for name in self.__models_available if name not in known]
+            if not rows:
+                return
+            try:
+                with conn.begin_nested():
+                    conn.execute(class_versions.insert(), rows)
+            except IntegrityError:
+                pass
+
+    def _flushed(self, session, flush_context):
+        """
+        records the classes of the objects a flush added, changed or
+        deleted, in the info of the session until its commit
+        """
+        changed = session.info.setdefault('changed', set())
+        for obj in list(session.new) + list(session.dirty) + \
+                list(session.deleted):
+            if type(obj).__name__ in self.__models_available:
+                changed.add(type(obj).__name__)
+
+    def _bump_versions(self, session):
+        """
+        bumps the generation of the classes changed by the transaction,
+        in the transaction itself, right before it commits
+        """
+        session.flush()
+        changed = session.info.pop('changed', None)
+        if changed:
+            session.execute(class_versions.update().where(
+                class_versions.c.cls.in_(sorted(changed))).values(
+                generation=class_versions.c.generation + 1,
+                changed_at=datetime.utcnow().replace(microsecond=0)))
 
     def close(self):
         """
@@ -133,3 +351,247 @@ class DBStorage:
         if cls in self.__models_available.keys():
             return self.__session.query(self.__models_available[cls]).count()
         return -1
+
+    def version(self, cls):
+        """
+        Validators of the objects of a class, read from its table so
+        that every process sees the changes of the others
+
+        Arguments:
+            cls: class or string representing a class name
+
+        Return:
+            tuple of a tag changing whenever an object of the class is
+            added, deleted or saved, and the time of that last change
+            (None if unknown)
+
+        The tag is the generation of the class in class_versions, bumped
+        by every transaction changing one of its objects, with the time
+        of the change
+        """
+        if not isinstance(cls, str):
+            cls = cls.__name__
+        row = self.__session.execute(
+            select(class_versions.c.generation,
+                   class_versions.c.changed_at).where(
+                class_versions.c.cls == cls)).one_or_none()
+        if row is None:
+            return "0.", None
+        return "{}.{}".format(row[0], row[1].isoformat()), row[1]
+
+    def iter_page(self, cls, after=None, limit=None, filter_=None,
+                  fields=None):
+        """
+        Objects of a class in (created_at, id) order, one keyset page
+
+        Arguments:
+            cls: class or string representing a class name
+            after: optional, (created_at, id) of the last object of the
+                previous page, the page starts right after it
+            limit: optional, maximum number of objects
+            filter_: optional, dictionary of <column> value the objects
+                must have
+            fields: optional, names of the attributes the caller reads,
+                only those columns are loaded
+
+        Return:
+            iterator over the objects of the page, fetched in batches
+            of 500 rows when there is no limit
+        """
+        if not isinstance(cls, str):
+            cls = cls.__name__
+        model = self.__models_available[cls]
+        query = self.__session.query(model).filter_by(**(filter_ or {}))
+        query = self._load_only(query, model, fields)
+        if after is not None:
+            query = query.filter(or_(
+                model.created_at > after[0],
+                and_(model.created_at == after[0], model.id > after[1])))
+        query = query.order_by(model.created_at, model.id)
+        if limit is None:
+            return iter(query.yield_per(500))
+        return iter(query.limit(limit).all())
+
+    def search_places(self, states=None, cities=None, amenities=None,
+                      center=None, radius=None, bbox=None, ranges=None,
+                      fields=None):
+        """
+        Places matching the places_search filters, in a single query
+
+        Arguments:
+            states: optional, list of state ids, their cities are added
+                to cities
+            cities: optional, list of city ids the places must be in, no
+                states and no cities means every city
+            amenities: optional, list of amenity ids every place must
+                have
+            center: optional, (latitude, longitude) the places are sorted
+                by distance to
+            radius: optional, maximum distance to center in km
+            bbox: optional, (west, south, east, north) box the places
+                must be in
+            ranges: optional, dictionary of <numeric Place column>
+                (min, max) inclusive bounds, None for no bound
+            fields: optional, names of the attributes the caller reads,
+                only those columns are loaded
+
+        Return:
+            list of Place objects
+        """
+        from models.place import place_amenity
+        query = self.__session.query(Place)
+        if fields is not None and center is not None:
+            fields = list(fields) + ["latitude", "longitude"]
+        query = self._load_only(query, Place, fields)
+        if states or cities:
+            state_cities = select(City.id).where(
+                City.state_id.in_(states or []))
+            query = query.filter(or_(Place.city_id.in_(cities or []),
+                                     Place.city_id.in_(state_cities)))
+        amenities = set(amenities or [])
+        if amenities:
+            with_all = select(place_amenity.c.place_id).where(
+                place_amenity.c.amenity_id.in_(amenities)).group_by(
+                place_amenity.c.place_id).having(
+                func.count(distinct(place_amenity.c.amenity_id)) ==
+                len(amenities))
+            query = query.filter(Place.id.in_(with_all))
+        for attr, (low, high) in (ranges or {}).items():
+            column = getattr(Place, attr)
+            if low is not None:
+                query = query.filter(column >= low)
+            if high is not None:
+                query = query.filter(column <= high)
+        boxes = [bbox] if bbox is not None else []
+        if center is not None and radius is not None:
+            boxes.append(geo.bounding_box(center[0], center[1], radius))
+        for box in boxes:
+            query = query.filter(
+                Place.latitude.between(box[1], box[3]),
+                or_(*[Place.longitude.between(low, high)
+                      for low, high in geo.longitude_ranges(box)]))
+        places = query.all()
+        if center is None:
+            return places
+        if radius is not None:
+            places = [place for place in places if geo.distance(
+                center[0], center[1], place.latitude,
+                place.longitude) <= radius]
+        return geo.sort_by_distance(places, *center)
+
+    def expand(self, objs, tree):
+        """
+        Loads relationships of objects for all of them at once
+
+        Arguments:
+            objs: list of objects of the same class
+            tree: dictionary of <relationship> {<relationship of the
+                related objects>: ...}
+
+        Return:
+            list of the objects in the same order, as loaded in the
+            current session with their relationships, one query per
+            relationship of tree instead of one per object
+        """
+        if not objs or not tree:
+            return objs
+        model = type(objs[0])
+        loaded = {obj.id: obj for obj in self.__session.query(model).filter(
+            model.id.in_([obj.id for obj in objs])).options(
+            *self._selectinload(model, tree))}
+        return [loaded[obj.id] for obj in objs if obj.id in loaded]
+
+    @staticmethod
+    def _selectinload(model, tree):
+        """
+        loader options of the relationships of tree
+
+        Arguments:
+            model: mapped class
+            tree: dictionary of <relationship> {<nested relationship>: ...}
+
+        Return:
+            list of selectinload options, chained along the nested
+            relationships
+        """
+        options = []
+        for name, subtree in tree.items():
+            attr = getattr(model, name)
+            option = selectinload(attr)
+            if subtree:
+                option = option.options(*DBStorage._selectinload(
+                    attr.property.mapper.class_, subtree))
+            options.append(option)
+        return options
+
+    @staticmethod
+    def _load_only(query, model, fields):
+        """
+        restricts the columns loaded by query to fields, plus the ones
+        of the (created_at, id) order
+
+        Arguments:
+            query: query of model
+            model: mapped class
+            fields: names of attributes, None for every column
+
+        Return:
+            the query
+        """
+        if fields is None:
+            return query
+        columns = model.__table__.columns
+        names = set(fields) | {"id", "created_at"}
+        return query.options(load_only(
+            *[getattr(model, name) for name in names if name in columns]))
+
+    def count_all(self, approximate=False):
+        """
+        Number of objects of every class, in a single query
+
+        Arguments:
+            approximate: optional, if True read the row counts from the
+                table statistics of the database instead of counting.
+                Falls back to an exact count when there are none.
+
+        Return:
+            dictionary of <class name> <number of objects>
+        """
+        if approximate:
+            counts = self._approximate_counts(self.__session)
+            if counts is not None:
+                return counts
+        query = union_all(*[
+            select(literal(name).label("cls"),
+                   func.count().label("count")).select_from(model)
+            for name, model in self.__models_available.items()])
+        return {name: count for name, count in
+                self.__session.execute(query)}
+
+    def _approximate_counts(self, session):
+        """
+        row counts of every table from the MySQL table statistics,
+        overridden by other SQL backends
+
+        Return:
+            dictionary of <class name> <estimated number of objects>
+        """
+        rows = session.execute(text(
+            "SELECT TABLE_NAME, TABLE_ROWS FROM information_schema.TABLES"
+            " WHERE TABLE_SCHEMA = DATABASE()"))
+        return self._counts_by_class(dict(rows.all()))
+
+    def _counts_by_class(self, by_table):
+        """
+        maps row counts by table name to counts by class name
+
+        Return:
+            dictionary of <class name> <number of rows>, None if a table
+            has no count
+        """
+        counts = {}
+        for name, model in self.__models_available.items():
+            if by_table.get(model.__tablename__) is None:
+                return None
+            counts[name] = int(by_table[model.__tablename__])
+        return counts
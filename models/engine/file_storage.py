@@ -6,16 +6,55 @@ This module defines one class, FileStorage.
 This class handles saving the information in JSON format in a file.
 """
 
+import atexit
+from bisect import bisect_left, bisect_right, insort
+from contextlib import contextmanager
 from datetime import datetime
-import json
+from itertools import chain
+from math import floor
 from models.amenity import Amenity
 from models.base_model import BaseModel
 from models.city import City
+from models.engine import geo
+from models.engine import serializer
 from models.place import Place
 from models.review import Review
 from models.state import State
 from models.user import User
+import logging
 import os
+import re
+import shutil
+import threading
+import uuid
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Attributes holding the id of a related object, by class name, indexed
+# by FileStorage.related(). amenity_ids holds a list of ids.
+relations = {
+    "City": ("state_id",),
+    "Place": ("city_id", "user_id", "amenity_ids"),
+    "Review": ("place_id", "user_id"),
+}
+
+# Numeric Place attributes mirrored in columns when numpy is installed,
+# for the range filters of FileStorage.search_places().
+place_columns = ("price_by_night", "number_rooms", "number_bathrooms",
+                 "max_guest", "latitude", "longitude")
+
+# Start of a line of a snapshot written by serializer.dump_items(), up to
+# the record: "<class name>.<id>":{
+pair_line = re.compile(rb'"([A-Za-z_]\w*)\.[^"\\]+":\{')
+
+# Reports the snapshots reload() could not load.
+logger = logging.getLogger(__name__)
 
 
 class FileStorage:
@@ -24,21 +63,168 @@ class FileStorage:
 
     **Class Attributes:**
         __file_path (str): Private. The path to the JSON file.
-        __objects (dict): Private. A dictionary of all the objects.
+        __objects (dict): Private. A dictionary of all the objects,
+            keyed by "<class name>.<id>".
+        __by_class (dict): Private. Secondary index of __objects:
+            <class name> -> {<key>: <object>}.
+        __related (dict): Private. Reverse index of the attributes in
+            relations: (<class name>, <attribute>) -> {<value>:
+            {<key>: <object>}}.
+        __related_values (dict): Private. <key> -> list of
+            (<attribute>, <value>) the object is indexed under.
+        __place_keys (list): Private. Key of every Place by ordinal, a
+            small integer naming the place in the amenity bitmaps.
+        __place_ordinals (dict): Private. Place key -> ordinal.
+        __free_ordinals (list): Private. Ordinals of deleted places.
+        __amenity_bitmaps (dict): Private. Inverted index of
+            Place.amenity_ids: <amenity id> -> int whose bit n is set
+            when the place of ordinal n has the amenity.
+        __geo_cell_size (float): Private. Side in degrees of the cells
+            of the spatial index (HBNB_FS_GEO_CELL, default 0.5).
+        __geo_cells (dict): Private. Spatial index of the places:
+            (<latitude cell>, <longitude cell>) -> {<key>: <object>}.
+        __geo_cell_of (dict): Private. Place key -> its cell.
+        __columns (dict): Private. Column store of the places, with
+            numpy only: <attribute of place_columns> -> float array by
+            ordinal, NaN when the value is missing or not a number.
+        __live (numpy.ndarray): Private. Bool array by ordinal, True for
+            the ordinals of existing places.
+        __ordered (dict): Private. <class name> -> sorted list of the
+            (created_at, id) of its objects, built on the first
+            iter_page() of the class.
+        __generations (dict): Private. <class name> -> number of changes
+            to its objects since the indexes were built.
+        __last_modified (dict): Private. <class name> -> time of the
+            last change to its objects. The times of the changes before
+            a load are not kept in the files (a deletion leaves no
+            updated_at behind), so a load counts as a change of every
+            class it finds objects of: Last-Modified never goes back.
+        __epoch (str): Private. Random token renewed with the indexes,
+            so that generations never repeat across reloads or restarts.
+        __indexed (tuple): Private. The __objects dict the indexes were
+            built from, used to detect a wholesale replacement, and the
+            set of the class names whose objects are indexed.
+        __dirty (dict): Private. Keys passed to new() or delete() since
+            the last save, mapped to the object or None once deleted.
+        __journal (bool): Private. Journal mode, set with
+            HBNB_FS_JOURNAL=yes: save() appends the dirty objects to
+            __journal_path instead of rewriting __file_path.
+        __journal_max (int): Private. Size in bytes past which the
+            journal is compacted into __file_path (HBNB_FS_JOURNAL_MAX).
+        __synced (tuple): Private. The __objects dict and the on-disk
+            state (inode, size, mtime of the files) it last matched.
+        __reloads (dict): Private. Number of reloads "performed" and
+            "skipped" because nothing changed on disk.
+        __batch (threading.local): Private. Per thread depth of nested
+            batch() blocks and whether a save was deferred in them.
+        __group_commit_ms (int): Private. With HBNB_FS_GROUP_COMMIT_MS
+            set, saves are deferred and flushed together at most that
+            many milliseconds later.
+        __timer (threading.Timer): Private. The pending group commit.
+        __flush_lock (threading.Lock): Private. Serializes the writes
+            to the files and the reloads that load them. A reload finding
+            the files unchanged does not take it.
+        __writing (tuple): Private. The on-disk state the write in
+            progress started from, None between writes.
+        __write_lock (threading.RLock): Private. Held by the threads
+            changing __objects or the indexes, and by the lookups reading
+            several indexes. get() never waits for it, and no thread
+            holds it while writing the files.
+        __lent (bool): Private. True once all() handed __objects out:
+            the next change copies it first, so that the dict a caller
+            iterates never changes under it.
+        __durability (str): Private. What a write waits for, set with
+            HBNB_FS_DURABILITY: "none" (the OS cache), "file" (fsync of
+            the file, the default) or "dir" (fsync of the directory as
+            well, so that the rename itself survives a crash).
+        __keep_previous (bool): Private. Set with
+            HBNB_FS_KEEP_PREVIOUS=yes: each snapshot keeps the one it
+            replaces as __file_path + ".prev", read back if __file_path
+            is ever unreadable.
+        __damaged (tuple): Private. On-disk state of the snapshot last
+            found unreadable, None if the last one loaded was fine. The
+            next write keeps that file as __file_path + ".damaged"
+            instead of losing it.
+        __lazy (bool): Private. Lazy mode, set with HBNB_FS_LAZY=yes:
+            reload() only finds where each record of the snapshot is,
+            and the objects are built when get() or all() returns them,
+            or a class at a time when the indexes of the class are
+            first needed.
+        __records (tuple): Private. In lazy mode, the __objects dict
+            the records are pending for, the snapshot open for reading,
+            <class name> -> {<key>: (offset << 32) | length of its
+            record} for the objects not built yet, <class name> ->
+            number of objects, and the size and mtime of the snapshot
+            when scanned. The snapshot stays open, and its disk space
+            used, until every object is built; it must be replaced, as
+            save() does, never changed in place.
+        __shared (bool): Private. Multi-process mode, set with
+            HBNB_FS_SHARED=yes where fcntl is available: the processes
+            share the files in journal mode, write under an exclusive
+            lock of __file_path + ".lock", which holds a generation
+            counter bumped by every write, and apply the journal records
+            of the others as they come instead of reloading everything.
+        __lock (tuple): Private. Path and descriptor of the lock file.
+        __tail (tuple): Private. Inode of the snapshot, offset in the
+            journal and generation counter __objects is up to date with
+            in multi-process mode.
 
     **Instance Attributes:**
-        __models_available (dict): Private. Classes currently handled by FileStorage.
+        __models_available (dict): Private. Classes currently handled
+            by FileStorage.
     """
     __file_path = "file.json"
     if os.getenv("FS_TEST", "no") == "yes":
         __file_path = "test_file.json"
+    __journal_path = __file_path + ".journal"
     __objects = {}
+    __by_class = {}
+    __related = {}
+    __related_values = {}
+    __place_keys = []
+    __place_ordinals = {}
+    __free_ordinals = []
+    __amenity_bitmaps = {}
+    __geo_cell_size = float(os.getenv("HBNB_FS_GEO_CELL", 0.5))
+    __geo_cells = {}
+    __geo_cell_of = {}
+    __columns = {}
+    __live = None
+    __ordered = {}
+    __generations = {}
+    __last_modified = {}
+    __epoch = None
+    __indexed = (None, set())
+    __dirty = {}
+    __journal = os.getenv("HBNB_FS_JOURNAL", "no") == "yes"
+    __journal_max = int(os.getenv("HBNB_FS_JOURNAL_MAX", 4 * 1024 * 1024))
+    __synced = (None, None)
+    __reloads = {"performed": 0, "skipped": 0}
+    __batch = threading.local()
+    __group_commit_ms = int(os.getenv("HBNB_FS_GROUP_COMMIT_MS", 0))
+    __timer = None
+    __flush_lock = threading.Lock()
+    __writing = None
+    __write_lock = threading.RLock()
+    __lent = False
+    __durability = os.getenv("HBNB_FS_DURABILITY", "file")
+    __keep_previous = os.getenv("HBNB_FS_KEEP_PREVIOUS", "no") == "yes"
+    __damaged = None
+    __lazy = os.getenv("HBNB_FS_LAZY", "no") == "yes"
+    __records = (None, None, None, None, None)
+    __shared = os.getenv("HBNB_FS_SHARED", "no") == "yes" and \
+        fcntl is not None
+    if __shared:
+        __journal = True
+    __lock = (None, None)
+    __tail = (None, 0, None)
 
     def __init__(self):
         """
         Initializes the FileStorage instance.
-        
-        Sets up the available models and reloads any existing data from the file.
+
+        Sets up the available models and reloads any existing data
+        from the file.
         """
         self.__models_available = {
             "User": User, "BaseModel": BaseModel,
@@ -46,23 +232,408 @@ class FileStorage:
             "Place": Place, "Review": Review,
             "State": State
         }
+        if FileStorage.__group_commit_ms > 0:
+            atexit.register(self.__group_commit)
         self.reload()
 
+    @staticmethod
+    def __class_name(cls):
+        """
+        Returns the class name of cls, which may be a class or a string.
+        """
+        if cls is None or isinstance(cls, str):
+            return cls
+        return cls.__name__
+
+    def __class_index(self, *classes):
+        """
+        Returns the per-class index, building first the indexes of the
+        given class names, of every class by default, unless built
+        since __objects was last replaced.
+
+        Once __objects is replaced, every index is rebuilt in one pass,
+        except in lazy mode: there, the indexes of a class are only
+        built, and its pending objects with them, when first needed, so
+        that the cities of a state are found without building every
+        place and review.
+        """
+        objects, built = FileStorage.__indexed
+        if objects is FileStorage.__objects and \
+                built.issuperset(classes or self.__models_available):
+            return FileStorage.__by_class
+        with FileStorage.__write_lock:
+            if FileStorage.__indexed[0] is not FileStorage.__objects:
+                self.__reset_indexes()
+                FileStorage.__epoch = uuid.uuid4().hex
+                self.__index_classes(self.__models_available)
+                FileStorage.__generations = {
+                    cls: len(objs)
+                    for cls, objs in FileStorage.__by_class.items()}
+                FileStorage.__last_modified = dict.fromkeys(
+                    FileStorage.__by_class, datetime.utcnow())
+            else:
+                self.__index_classes(classes or self.__models_available)
+            return FileStorage.__by_class
+
+    @staticmethod
+    def __reset_indexes():
+        """
+        Empties the indexes for the current __objects, under
+        __write_lock.
+
+        __indexed is cleared before anything else, so that a thread
+        reading the indexes meanwhile waits for them to be built.
+        """
+        FileStorage.__indexed = (None, set())
+        FileStorage.__by_class = {}
+        FileStorage.__related = {}
+        FileStorage.__related_values = {}
+        FileStorage.__place_keys = []
+        FileStorage.__place_ordinals = {}
+        FileStorage.__free_ordinals = []
+        FileStorage.__amenity_bitmaps = {}
+        FileStorage.__geo_cells = {}
+        FileStorage.__geo_cell_of = {}
+        FileStorage.__columns = {}
+        FileStorage.__live = None
+        FileStorage.__ordered = {}
+        FileStorage.__indexed = (FileStorage.__objects, set())
+
+    def __index_classes(self, classes):
+        """
+        Builds the pending objects of the classes not indexed yet among
+        classes, then indexes every object of theirs, under
+        __write_lock.
+        """
+        built = FileStorage.__indexed[1]
+        classes = set(classes) - built
+        if not classes:
+            return
+        records = self.__pending()
+        if records is not None:
+            for cls in classes:
+                for key in list(records.get(cls, ())):
+                    self.__build_pending(key)
+        for k, v in FileStorage.__objects.items():
+            cls = v.__class__.__name__
+            if cls not in classes:
+                continue
+            FileStorage.__by_class.setdefault(cls, {})[k] = v
+            if cls == "Place":
+                self.__place_ordinal(k)
+                self.__index_geo(k, v)
+            self.__index_related(k, v, bitmaps=False)
+        if "Place" in classes:
+            FileStorage.__amenity_bitmaps = {
+                amenity_id: self.__bitmap(
+                    FileStorage.__place_ordinals[k] for k in places)
+                for amenity_id, places in FileStorage.__related.get(
+                    ("Place", "amenity_ids"), {}).items()}
+            self.__build_columns()
+        built.update(classes)
+
+    @staticmethod
+    def __touch(cls, modified=None):
+        """
+        Counts a change to an object of cls, modified at the given time.
+        """
+        FileStorage.__generations[cls] = \
+            FileStorage.__generations.get(cls, 0) + 1
+        if isinstance(modified, datetime):
+            last = FileStorage.__last_modified.get(cls)
+            if last is None or modified > last:
+                FileStorage.__last_modified[cls] = modified
+
+    @staticmethod
+    def __index_related(key, obj, bitmaps=True):
+        """
+        Adds obj to the reverse indexes of its class, and to the amenity
+        bitmaps unless they are built afterwards.
+        """
+        cls = obj.__class__.__name__
+        indexed = []
+        for attr in relations.get(cls, ()):
+            value = getattr(obj, attr, None)
+            values = value if isinstance(value, list) else [value]
+            index = FileStorage.__related.setdefault((cls, attr), {})
+            for value in values:
+                if value:
+                    index.setdefault(value, {})[key] = obj
+                    indexed.append((attr, value))
+                    if bitmaps and attr == "amenity_ids":
+                        bit = 1 << FileStorage.__place_ordinals[key]
+                        FileStorage.__amenity_bitmaps[value] = \
+                            FileStorage.__amenity_bitmaps.get(value, 0) | bit
+        if indexed:
+            FileStorage.__related_values[key] = indexed
+
+    @staticmethod
+    def __unindex_related(key, obj):
+        """
+        Removes obj from the reverse indexes of its class.
+        """
+        cls = obj.__class__.__name__
+        for attr, value in FileStorage.__related_values.pop(key, ()):
+            index = FileStorage.__related[(cls, attr)]
+            index[value].pop(key, None)
+            if not index[value]:
+                del index[value]
+            if attr == "amenity_ids":
+                bit = 1 << FileStorage.__place_ordinals[key]
+                bitmap = FileStorage.__amenity_bitmaps[value] & ~bit
+                if bitmap:
+                    FileStorage.__amenity_bitmaps[value] = bitmap
+                else:
+                    del FileStorage.__amenity_bitmaps[value]
+
+    @staticmethod
+    def __geo_cell(latitude, longitude):
+        """
+        Returns the cell of the spatial index holding a point.
+        """
+        size = FileStorage.__geo_cell_size
+        return (floor(latitude / size), floor(longitude / size))
+
+    @staticmethod
+    def __index_geo(key, place):
+        """
+        Adds a place to the spatial index if it has coordinates.
+        """
+        try:
+            cell = FileStorage.__geo_cell(float(place.latitude),
+                                          float(place.longitude))
+        except (TypeError, ValueError):
+            return
+        FileStorage.__geo_cells.setdefault(cell, {})[key] = place
+        FileStorage.__geo_cell_of[key] = cell
+
+    @staticmethod
+    def __unindex_geo(key):
+        """
+        Removes a place from the spatial index.
+        """
+        cell = FileStorage.__geo_cell_of.pop(key, None)
+        if cell is not None:
+            FileStorage.__geo_cells[cell].pop(key, None)
+            if not FileStorage.__geo_cells[cell]:
+                del FileStorage.__geo_cells[cell]
+
+    def __geo_candidates(self, bbox):
+        """
+        Returns the places in the cells overlapping a bounding box.
+        """
+        south = self.__geo_cell(bbox[1], 0)[0]
+        north = self.__geo_cell(bbox[3], 0)[0]
+        ranges = [(self.__geo_cell(0, low)[1], self.__geo_cell(0, high)[1])
+                  for low, high in geo.longitude_ranges(bbox)]
+        cells = (north - south + 1) * sum(high - low + 1
+                                          for low, high in ranges)
+        places = {}
+        if cells > len(FileStorage.__geo_cells):
+            for (i, j), cell in FileStorage.__geo_cells.items():
+                if south <= i <= north and \
+                        any(low <= j <= high for low, high in ranges):
+                    places.update(cell)
+        else:
+            for i in range(south, north + 1):
+                for low, high in ranges:
+                    for j in range(low, high + 1):
+                        places.update(FileStorage.__geo_cells.get((i, j),
+                                                                  {}))
+        return places
+
+    @staticmethod
+    def __number(value):
+        """
+        Returns value as a float, NaN if it is not a number.
+        """
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return float("nan")
+
+    def __build_columns(self):
+        """
+        Builds the column store from the places, when numpy is there.
+        """
+        if numpy is None:
+            return
+        places = [FileStorage.__objects[k] if k else None
+                  for k in FileStorage.__place_keys]
+        FileStorage.__columns = {
+            attr: numpy.fromiter((self.__number(getattr(p, attr, None))
+                                  for p in places), numpy.float64,
+                                 len(places))
+            for attr in place_columns}
+        FileStorage.__live = numpy.array([p is not None for p in places],
+                                         dtype=bool)
+
+    def __set_row(self, key, place):
+        """
+        Writes the values of a place in its row of the column store.
+        """
+        if numpy is None:
+            return
+        ordinal = FileStorage.__place_ordinals[key]
+        if ordinal >= len(FileStorage.__live):
+            size = max(16, 2 * len(FileStorage.__live))
+            for attr, column in FileStorage.__columns.items():
+                FileStorage.__columns[attr] = numpy.resize(column, size)
+            live = numpy.zeros(size, dtype=bool)
+            live[:len(FileStorage.__live)] = FileStorage.__live
+            FileStorage.__live = live
+        for attr, column in FileStorage.__columns.items():
+            column[ordinal] = self.__number(getattr(place, attr, None))
+        FileStorage.__live[ordinal] = True
+
+    def __range_filter(self, places, ranges):
+        """
+        Returns the places whose attributes are within ranges.
+
+        places is a dict of candidates, or None for every place. With
+        numpy, the ranges are evaluated as boolean masks over the
+        column store.
+        """
+        if numpy is None:
+            if places is None:
+                places = self.__class_index("Place").get("Place", {})
+            return {k: v for k, v in places.items()
+                    if all((low is None or
+                            self.__number(getattr(v, attr)) >= low) and
+                           (high is None or
+                            self.__number(getattr(v, attr)) <= high)
+                           for attr, (low, high) in ranges.items())}
+        mask = FileStorage.__live.copy()
+        for attr, (low, high) in ranges.items():
+            column = FileStorage.__columns[attr]
+            if low is not None:
+                mask &= column >= low
+            if high is not None:
+                mask &= column <= high
+        keys = FileStorage.__place_keys
+        if places is None:
+            return {keys[ordinal]: FileStorage.__objects[keys[ordinal]]
+                    for ordinal in numpy.flatnonzero(mask)}
+        ordinals = FileStorage.__place_ordinals
+        return {k: v for k, v in places.items() if mask[ordinals[k]]}
+
+    @staticmethod
+    def __place_ordinal(key):
+        """
+        Returns the ordinal of a Place key, assigning one if needed.
+        """
+        ordinal = FileStorage.__place_ordinals.get(key)
+        if ordinal is None:
+            if FileStorage.__free_ordinals:
+                ordinal = FileStorage.__free_ordinals.pop()
+                FileStorage.__place_keys[ordinal] = key
+            else:
+                ordinal = len(FileStorage.__place_keys)
+                FileStorage.__place_keys.append(key)
+            FileStorage.__place_ordinals[key] = ordinal
+        return ordinal
+
+    @staticmethod
+    def __bitmap(ordinals):
+        """
+        Returns the int with the bits of ordinals set.
+        """
+        bits = bytearray(len(FileStorage.__place_keys) // 8 + 1)
+        for ordinal in ordinals:
+            bits[ordinal >> 3] |= 1 << (ordinal & 7)
+        return int.from_bytes(bits, "little")
+
+    @staticmethod
+    def __bitmap_ordinals(bitmap):
+        """
+        Yields the ordinals whose bit is set in bitmap.
+        """
+        bits = bin(bitmap)[:1:-1]
+        ordinal = bits.find("1")
+        while ordinal != -1:
+            yield ordinal
+            ordinal = bits.find("1", ordinal + 1)
+
+    def related(self, cls, attr, value):
+        """
+        Returns the objects of a class whose attribute refers to value.
+
+        **Arguments:**
+            cls (str): A class or class name, a key of relations.
+            attr (str): One of the attributes of relations[cls].
+            value (str): The id looked for.
+
+        **Returns:**
+            list: The objects of class cls whose attr is value, or
+                contains value for a list attribute.
+        """
+        cls = self.__class_name(cls)
+        with FileStorage.__write_lock:
+            self.__class_index(cls)
+            index = FileStorage.__related.get((cls, attr), {})
+            return list(index.get(value, {}).values())
+
+    def expand(self, objs, tree):
+        """
+        Prepares the relations of objects to be read for all of them.
+
+        **Arguments:**
+            objs (list): Objects of the same class.
+            tree (dict): <relation> -> {<relation of the related
+                objects>: ...}
+
+        **Returns:**
+            list: objs. The relation properties of the models already
+                read the indexes of related(), one lookup per object,
+                which builds the indexes it reads on first use.
+        """
+        return objs
+
+    def reindex(self, obj, attr):
+        """
+        Updates the indexes after an attribute of obj changed.
+
+        **Arguments:**
+            obj (BaseModel): An object, indexed only if in __objects.
+            attr (str): The name of the attribute that changed.
+        """
+        cls = obj.__class__.__name__
+        key = cls + "." + obj.__dict__.get("id", "")
+        if FileStorage.__objects.get(key) is not obj:
+            return
+        with FileStorage.__write_lock:
+            self.__class_index(cls)
+            self.__touch(cls, getattr(obj, "updated_at", None))
+            if attr in relations.get(cls, ()):
+                self.__unindex_related(key, obj)
+                self.__index_related(key, obj)
+            if cls == "Place" and attr in place_columns:
+                self.__set_row(key, obj)
+                if attr in ("latitude", "longitude"):
+                    self.__unindex_geo(key)
+                    self.__index_geo(key, obj)
+
     def all(self, cls=None):
         """
         Returns the required objects.
 
         **Arguments:**
-            cls (str): Optional. A valid Class Name. If provided, only objects of that class will be returned.
+            cls (str): Optional. A valid class or class name. If
+                provided, only objects of that class will be returned.
 
         **Returns:**
-            dict: A dictionary of objects. If cls is provided, returns objects of that class; otherwise, returns all objects.
+            dict: A dictionary of objects. If cls is provided, returns
+                objects of that class; otherwise, returns all objects.
+                Later changes of the storage do not alter it.
         """
         if cls is None:
-            return FileStorage.__objects
-        else:
-            result = {k: v for k, v in FileStorage.__objects.items() if v.__class__.__name__ == cls}
-            return result
+            with FileStorage.__write_lock:
+                self.__hydrate()
+                FileStorage.__lent = True
+                return FileStorage.__objects
+        cls = self.__class_name(cls)
+        with FileStorage.__write_lock:
+            return dict(self.__class_index(cls).get(cls, {}))
 
     def new(self, obj):
         """
@@ -72,52 +643,830 @@ class FileStorage:
             obj (BaseModel): An instance of a class derived from BaseModel.
         """
         if obj is not None:
-            FileStorage.__objects[obj.id] = obj
+            with FileStorage.__write_lock:
+                self.__put(obj)
+                FileStorage.__dirty[obj.__class__.__name__ + "." +
+                                    obj.id] = obj
+
+    def __own(self):
+        """
+        Copies __objects before a change if all() handed it out.
+        """
+        if not FileStorage.__lent:
+            return
+        objects = FileStorage.__objects
+        copy = dict(objects)
+        if FileStorage.__synced[0] is objects:
+            FileStorage.__synced = (copy, FileStorage.__synced[1])
+        FileStorage.__objects = copy
+        if FileStorage.__indexed[0] is objects:
+            FileStorage.__indexed = (copy, FileStorage.__indexed[1])
+        if FileStorage.__records[0] is objects:
+            FileStorage.__records = (copy,) + FileStorage.__records[1:]
+        FileStorage.__lent = False
+
+    def __put(self, obj):
+        """
+        Puts obj in __objects and in the indexes, under __write_lock.
+        """
+        cls = obj.__class__.__name__
+        key = cls + "." + obj.id
+        by_class = self.__class_index(cls)
+        self.__own()
+        self.__touch(cls, obj.updated_at)
+        old = FileStorage.__objects.get(key)
+        if old is not None:
+            self.__unindex_related(key, old)
+        if cls in FileStorage.__ordered:
+            self.__unorder(cls, old)
+            insort(FileStorage.__ordered[cls], (obj.created_at, obj.id))
+        FileStorage.__objects[key] = obj
+        by_class.setdefault(cls, {})[key] = obj
+        if cls == "Place":
+            self.__place_ordinal(key)
+            self.__unindex_geo(key)
+            self.__index_geo(key, obj)
+            self.__set_row(key, obj)
+        self.__index_related(key, obj)
 
     def save(self):
         """
         Serializes all objects to the JSON file.
-        
-        Converts the objects to JSON format and writes them to the file specified by __file_path.
+
+        Converts the objects to JSON format and writes them to the file
+        specified by __file_path, one chunk at a time. In journal mode,
+        only the objects changed since the last save are appended to the
+        journal, and the file is rewritten once the journal grows past
+        __journal_max.
+
+        Inside a batch() block, the write is deferred until the
+        outermost block exits. With group commit enabled, it is deferred
+        to the next group commit.
+        """
+        if getattr(FileStorage.__batch, "depth", 0):
+            FileStorage.__batch.pending = True
+        elif FileStorage.__group_commit_ms > 0:
+            with FileStorage.__flush_lock:
+                if FileStorage.__timer is None:
+                    FileStorage.__timer = threading.Timer(
+                        FileStorage.__group_commit_ms / 1000,
+                        self.__group_commit)
+                    FileStorage.__timer.daemon = True
+                    FileStorage.__timer.start()
+        else:
+            with FileStorage.__flush_lock:
+                self.__flush()
+
+    @contextmanager
+    def batch(self):
+        """
+        Defers every save() of the block to a single one when it exits.
+
+        Blocks can be nested: the objects are written once, when the
+        outermost block of the thread exits.
+
+        Unlike DBStorage.batch(), this is not a unit of work: the changes
+        are made to the objects in memory as the block runs, and cannot
+        be rolled back. If the block raises, the changes it made before
+        stay, and the deferred save is still written as it exits, so
+        that file.json keeps matching the objects served.
+
+        **Example:**
+            with storage.batch():
+                for name in names:
+                    State(name=name).save()
+        """
+        FileStorage.__batch.depth = getattr(FileStorage.__batch, "depth", 0)
+        if FileStorage.__batch.depth == 0:
+            FileStorage.__batch.pending = False
+        FileStorage.__batch.depth += 1
+        try:
+            yield self
+        finally:
+            FileStorage.__batch.depth -= 1
+            if FileStorage.__batch.depth == 0 and \
+                    FileStorage.__batch.pending:
+                FileStorage.__batch.pending = False
+                self.save()
+
+    def __group_commit(self):
+        """
+        Writes the saves deferred since the group commit was scheduled.
+        """
+        with FileStorage.__flush_lock:
+            if FileStorage.__timer is not None:
+                FileStorage.__timer.cancel()
+                FileStorage.__timer = None
+                self.__flush()
+
+    def __flush(self):
+        """
+        Writes the objects to the file, or the changes to the journal.
+
+        In multi-process mode, the write happens under the exclusive
+        lock, once the changes of the other processes are applied, and
+        bumps the generation counter.
+        """
+        if not FileStorage.__shared:
+            FileStorage.__writing = self.__disk_state()
+            try:
+                self.__write()
+            finally:
+                FileStorage.__writing = None
+            return
+        with self.__locked(True) as fd:
+            self.__catch_up(fd)
+            self.__write()
+            generation = self.__generation(fd) + 1
+            os.pwrite(fd, b"%020d" % generation, 0)
+            snapshot, journal = self.__disk_state()
+            FileStorage.__tail = (snapshot and snapshot[0],
+                                  journal[1] if journal else 0, generation)
+
+    def __write(self):
+        """
+        Writes the objects to the file, or the changes to the journal.
+
+        The changes are taken from __dirty under __write_lock, and put
+        back if the write fails; the other threads go on reading and
+        changing the objects while they are written.
+        """
+        if not FileStorage.__journal:
+            self.__write_snapshot()
+            return
+        disk = self.__disk_state()
+        dirty = self.__take_dirty()
+        try:
+            lines = []
+            for k, v in dirty.items():
+                record = {"key": k,
+                          "object": v.to_dict(False) if v else None}
+                lines.append(serializer.dumps(record) + b"\n")
+            with open(FileStorage.__journal_path, mode="ab") as fd:
+                fd.write(b"".join(lines))
+                size = fd.tell()
+                self.__sync(fd)
+        except BaseException:
+            self.__restore_dirty(dirty)
+            raise
+        if disk[1] is None:
+            self.__sync_dir()
+        if size > FileStorage.__journal_max:
+            self.__write_snapshot()
+        else:
+            self.__mark_synced(disk)
+
+    def __write_snapshot(self):
+        """
+        Rewrites __file_path with every object and empties the journal.
+
+        The objects are written to a temporary file of the same
+        directory, synced to disk as __durability says, then renamed
+        over __file_path: readers and crashes see the former file or
+        the new one, never a truncated one. A file reload() could not
+        load is kept as __file_path + ".damaged" rather than replaced.
+        In lazy mode, the records still pending are copied as they are
+        from the former snapshot, without building their objects.
+        """
+        disk = self.__disk_state()
+        path = FileStorage.__file_path
+        tmp = "{}.{}.tmp".format(path, uuid.uuid4().hex)
+        kept = ""
+        with FileStorage.__write_lock:
+            source, pending = self.__copy_pending()
+            items = list(FileStorage.__objects.items())
+            dirty = self.__take_dirty()
+        try:
+            with open(tmp, mode="xb") as fd:
+                serializer.dump_items(chain(
+                    ((k, v.to_dict(False)) for k, v in items),
+                    ((k, os.pread(source, packed & 0xffffffff,
+                                  packed >> 32)) for k, packed in pending)),
+                    fd)
+                self.__sync(fd)
+            if disk[0] is not None and disk[0] == FileStorage.__damaged:
+                kept = ".damaged"
+            elif FileStorage.__keep_previous and disk[0] is not None:
+                kept = ".prev"
+            if kept:
+                try:
+                    os.link(path, tmp + kept)
+                except OSError:
+                    shutil.copyfile(path, tmp + kept)
+                os.replace(tmp + kept, path + kept)
+            os.replace(tmp, path)
+        except BaseException:
+            for leftover in (tmp, tmp + kept):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+            self.__restore_dirty(dirty)
+            raise
+        finally:
+            if source is not None:
+                os.close(source)
+        FileStorage.__damaged = None
+        self.__sync_dir()
+        if FileStorage.__journal:
+            open(FileStorage.__journal_path, mode="w").close()
+        self.__mark_synced(disk)
+
+    def __copy_pending(self):
+        """
+        Returns a descriptor of the snapshot of the pending records, to
+        be closed by the caller, and the list of their (key, (offset <<
+        32) | length), under __write_lock.
+
+        The descriptor is a duplicate, read with os.pread(), so that
+        the objects can go on being built meanwhile. Without os.pread(),
+        every pending object is built instead, and (None, []) returned.
+        """
+        objects, fd, records, counts, stat = FileStorage.__records
+        if records is None or objects is not FileStorage.__objects:
+            return None, []
+        if not hasattr(os, "pread"):
+            self.__hydrate()
+            return None, []
+        self.__check_pending(fd, stat)
+        return os.dup(fd.fileno()), [item for cls in records.values()
+                                     for item in cls.items()]
+
+    @staticmethod
+    def __take_dirty():
+        """
+        Returns the changes to be saved and empties __dirty.
+        """
+        with FileStorage.__write_lock:
+            dirty = FileStorage.__dirty
+            FileStorage.__dirty = {}
+        return dirty
+
+    @staticmethod
+    def __restore_dirty(dirty):
+        """
+        Puts back in __dirty the changes of a failed write, under the
+        ones made since.
+        """
+        with FileStorage.__write_lock:
+            FileStorage.__dirty = {**dirty, **FileStorage.__dirty}
+
+    @staticmethod
+    def __sync(fd):
+        """
+        Flushes a file open for writing to disk, unless __durability is
+        "none".
+        """
+        fd.flush()
+        if FileStorage.__durability != "none":
+            os.fsync(fd.fileno())
+
+    @staticmethod
+    def __sync_dir():
+        """
+        Flushes the directory entries of __file_path to disk when
+        __durability is "dir".
+        """
+        if FileStorage.__durability != "dir":
+            return
+        fd = os.open(os.path.dirname(FileStorage.__file_path) or ".",
+                     os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    @contextmanager
+    def __locked(self, exclusive):
+        """
+        Holds the lock of the files shared by the processes, exclusive
+        for writing or shared for reading, and yields the descriptor of
+        the lock file.
+
+        POSIX record locks belong to the process, so workers forked
+        with the descriptor already open still exclude each other; the
+        threads of a process are serialized by __flush_lock.
+        """
+        path = FileStorage.__file_path + ".lock"
+        if FileStorage.__lock[0] != path:
+            if FileStorage.__lock[1] is not None:
+                os.close(FileStorage.__lock[1])
+            FileStorage.__lock = (path, os.open(path, os.O_RDWR | os.O_CREAT,
+                                                0o666))
+        fd = FileStorage.__lock[1]
+        fcntl.lockf(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield fd
+        finally:
+            fcntl.lockf(fd, fcntl.LOCK_UN)
+
+    @staticmethod
+    def __generation(fd):
+        """
+        Returns the generation counter kept in the lock file.
+        """
+        data = os.pread(fd, 20, 0)
+        return int(data) if data.strip() else 0
+
+    def __catch_up(self, fd):
+        """
+        Brings __objects up to date with the files, under the lock.
+
+        The journal records appended by the other processes since
+        __tail are applied one by one, except to the objects with
+        changes of this process yet to be saved, so that it keeps
+        reading its own writes. Everything is reloaded only when
+        another process rewrote the snapshot, or __objects was replaced.
+        """
+        generation = self.__generation(fd)
+        snapshot, offset, seen = FileStorage.__tail
+        current = FileStorage.__synced[0] is FileStorage.__objects
+        if current and generation == seen:
+            FileStorage.__reloads["skipped"] += 1
+            return
+        disk = self.__disk_state()
+        inode = disk[0] and disk[0][0]
+        if current and inode == snapshot:
+            FileStorage.__reloads["incremental"] = \
+                FileStorage.__reloads.get("incremental", 0) + 1
+            offset = self.__replay_journal(None, offset)
+        else:
+            offset = self.__load_all(disk)
+        FileStorage.__tail = (inode, offset, generation)
+
+    def __disk_state(self):
+        """
+        Returns (inode, size, mtime) of the file and of the journal,
+        None for a missing file.
+        """
+        state = []
+        for path in (FileStorage.__file_path, FileStorage.__journal_path):
+            try:
+                st = os.stat(path)
+                state.append((st.st_ino, st.st_size, st.st_mtime_ns))
+            except OSError:
+                state.append(None)
+        return tuple(state)
+
+    def __mark_synced(self, before):
+        """
+        Records that __objects matches the files again after a write.
+
+        before is the on-disk state right before the write: if somebody
+        else had changed the files since the last sync, nothing is
+        recorded so that the next reload picks their change up.
+        """
+        objects, disk = FileStorage.__synced
+        if objects is FileStorage.__objects and disk == before:
+            FileStorage.__synced = (objects, self.__disk_state())
+
+    def reload_stats(self):
         """
-        store = {k: v.to_json() for k, v in FileStorage.__objects.items()}
-        with open(FileStorage.__file_path, mode="w+", encoding="utf-8") as fd:
-            fd.write(json.dumps(store))
+        Returns how many reloads were performed and skipped.
+
+        **Returns:**
+            dict: {"performed": <int>, "skipped": <int>}, and in
+                multi-process mode "incremental": <int>, the number of
+                times the journal records of other processes were
+                applied.
+        """
+        return dict(FileStorage.__reloads)
 
     def reload(self):
         """
         Deserializes the JSON file to __objects.
-        
-        Loads the objects from the JSON file specified by __file_path. 
-        Silently skips any errors encountered during the process.
+
+        Loads the objects from the JSON file specified by __file_path,
+        one record at a time, or from the previous snapshot kept beside
+        it if that file is unreadable, then replays the journal over
+        them in journal mode. The changes not saved yet are kept.
+        Nothing is done if the files have not changed since __objects
+        was last loaded or saved, other than by a save of this process
+        still in progress: that check does not wait for the save, only
+        an actual load does.
+        Without a snapshot file, the store is empty. If the snapshot
+        cannot be read, or is not valid, and neither can the previous
+        one, the error is logged and the objects in memory are kept,
+        empty when starting: the next reload tries again, and the next
+        write keeps the file as __file_path + ".damaged" instead of
+        replacing it.
+        In multi-process mode, only the changes of the other processes
+        are applied, see __catch_up().
+        A pending group commit is left to its timer: the objects it
+        will write stay in __objects.
         """
-        FileStorage.__objects = {}
         try:
-            with open(FileStorage.__file_path, mode="r+", encoding="utf-8") as fd:
-                temp = json.load(fd)
-        except Exception as e:
+            if FileStorage.__shared:
+                self.__reload_shared()
+                return
+            if self.__up_to_date(self.__disk_state()):
+                FileStorage.__reloads["skipped"] += 1
+                return
+            with FileStorage.__flush_lock:
+                disk = self.__disk_state()
+                if self.__up_to_date(disk):
+                    FileStorage.__reloads["skipped"] += 1
+                    return
+                self.__load_all(disk)
+        except (OSError, ValueError) as error:
+            logger.error("Cannot load %s, keeping the %d objects in "
+                         "memory: %s", FileStorage.__file_path,
+                         len(FileStorage.__objects), error)
+
+    def __reload_shared(self):
+        """
+        Reloads in multi-process mode, see reload().
+        """
+        path, fd = FileStorage.__lock
+        if path == FileStorage.__file_path + ".lock" and \
+                FileStorage.__synced[0] is FileStorage.__objects and \
+                self.__generation(fd) == FileStorage.__tail[2]:
+            FileStorage.__reloads["skipped"] += 1
             return
-        for k, v in temp.items():
-            cls = v.pop("__class__", None)
-            if cls in self.__models_available:
-                FileStorage.__objects[k] = self.__models_available[cls](**v)
+        with FileStorage.__flush_lock, self.__locked(False) as fd:
+            self.__catch_up(fd)
+
+    def __up_to_date(self, disk):
+        """
+        Tells whether __objects matches the files in the on-disk state
+        disk, or will once the write in progress is over.
+        """
+        objects, synced_disk = FileStorage.__synced
+        return objects is FileStorage.__objects and \
+            synced_disk in (disk, FileStorage.__writing)
+
+    def __load_all(self, disk):
+        """
+        Replaces __objects with the objects of the files, which are in
+        the given on-disk state, plus the changes not saved yet.
+
+        The objects are loaded into a new dict, published in one step
+        under __write_lock: until then the other threads keep reading
+        the former objects. The changes made before or meanwhile, by
+        any thread, are then applied again on top of the loaded
+        objects, so that a reload never loses a write in progress.
+
+        Returns the offset in the journal its records were applied up
+        to. Raises OSError or ValueError, with __objects untouched, if
+        neither the snapshot nor the previous one can be loaded; the
+        snapshot is then recorded in __damaged.
+        """
+        FileStorage.__reloads["performed"] += 1
+        objects = {}
+        pending = None
+        damaged = None
+        try:
+            pending = self.__load_file(FileStorage.__file_path, objects)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as error:
+            damaged = disk[0]
+            objects.clear()
+            try:
+                pending = self.__load_file(FileStorage.__file_path + ".prev",
+                                           objects)
+            except (OSError, ValueError):
+                FileStorage.__damaged = damaged
+                raise error
+        offset = 0
+        try:
+            if FileStorage.__journal:
+                offset = self.__replay_journal(objects, pending=pending)
+        except BaseException:
+            if pending is not None:
+                pending[0].close()
+            raise
+        with FileStorage.__write_lock:
+            FileStorage.__objects = objects
+            FileStorage.__synced = (objects, disk)
+            FileStorage.__damaged = damaged
+            FileStorage.__lent = False
+            previous = FileStorage.__records[1]
+            FileStorage.__records = (None, None, None, None, None)
+            if pending is not None:
+                self.__publish_pending(objects, pending)
+            if previous is not None:
+                previous.close()
+            for key, obj in FileStorage.__dirty.items():
+                old = self.__built(key)
+                if obj is not None:
+                    self.__put(obj)
+                elif old is not None:
+                    self.__drop(old)
+        return offset
+
+    def __load_file(self, path, objects):
+        """
+        Loads the objects of a snapshot into the dict objects.
+
+        In lazy mode, a snapshot written by dump_items() is only
+        scanned, and what __scan() found is returned instead; None is
+        returned once the objects are loaded.
+        Raises OSError if the file cannot be read and ValueError if it
+        is not a valid snapshot.
+        """
+        if FileStorage.__lazy:
+            pending = self.__scan(path)
+            if pending is not None:
+                return pending
+        with open(path, mode="r", encoding="utf-8", newline="") as fd:
+            for k, v in serializer.iter_items(fd):
+                self.__load(v, objects)
+        return None
+
+    def __scan(self, path):
+        """
+        Finds the records of a snapshot without building them.
+
+        Returns the snapshot, open for reading, <class name> -> {<key>:
+        (offset << 32) | length of its record}, <class name> -> number
+        of records and
+        the size and mtime of the snapshot; None if the file is not
+        made of one pair per line, as written by dump_items(). A record
+        is only parsed once built, so an invalid one makes that get()
+        or all() raise ValueError.
+        """
+        fd = open(path, mode="rb")
+        try:
+            st = os.fstat(fd.fileno())
+            records = {}
+            counts = {}
+            offset = 0
+            last = False
+            for line in fd:
+                start = 1 if offset == 0 else 0
+                if last or (offset == 0 and not line.startswith(b"{")):
+                    fd.close()
+                    return None
+                if line.endswith(b",\n"):
+                    end = len(line) - 2
+                else:
+                    last = True
+                    end = len(line) - 1
+                    if line == b"{}":
+                        break
+                match = pair_line.match(line, start)
+                if match is None or not line.endswith(b"}", 0, end) or \
+                        (last and not line.endswith(b"}")):
+                    fd.close()
+                    return None
+                cls = match.group(1).decode()
+                key = line[start + 1:match.end() - 3].decode()
+                value = match.end() - 1
+                if cls in self.__models_available and \
+                        key not in records.get(cls, ()):
+                    records.setdefault(cls, {})[key] = \
+                        (offset + value) << 32 | (end - value)
+                    counts[cls] = counts.get(cls, 0) + 1
+                offset += len(line)
+            if not last:
+                fd.close()
+                return None
+        except BaseException:
+            fd.close()
+            raise
+        return fd, records, counts, (st.st_size, st.st_mtime_ns)
+
+    def __publish_pending(self, objects, pending):
+        """
+        Makes the records found by __scan() the pending records of the
+        new __objects dict objects, which holds the objects of the
+        journal, under __write_lock.
+
+        The indexes are emptied, to be built a class at a time, and the
+        validators of version() set from what the scan found, so that
+        they do not need the indexes.
+        """
+        fd, records, counts, stat = pending
+        for key, obj in objects.items():
+            cls = obj.__class__.__name__
+            counts[cls] = counts.get(cls, 0) + 1
+        self.__reset_indexes()
+        FileStorage.__records = (objects, fd, records, counts, stat)
+        FileStorage.__generations = dict(counts)
+        FileStorage.__last_modified = dict.fromkeys(
+            (cls for cls, count in counts.items() if count),
+            datetime.utcnow())
+        FileStorage.__epoch = uuid.uuid4().hex
+
+    @staticmethod
+    def __pending():
+        """
+        Returns the pending records of __objects, None if every object
+        is built.
+        """
+        objects, fd, records, counts, stat = FileStorage.__records
+        return records if objects is FileStorage.__objects else None
+
+    def __build_pending(self, key):
+        """
+        Builds the object of a pending record into __objects, under
+        __write_lock, and returns it.
+        """
+        objects, fd, records, counts, stat = FileStorage.__records
+        self.__check_pending(fd, stat)
+        packed = records[key.partition(".")[0]].pop(key)
+        self.__load(self.__read_pending(fd, packed), objects)
+        return objects.get(key)
+
+    def __built(self, key):
+        """
+        Returns the object of key, None if there is none, building it
+        first if its record is pending, under __write_lock.
+        """
+        records = self.__pending()
+        if records is not None and \
+                key in records.get(key.partition(".")[0], ()):
+            return self.__build_pending(key)
+        return FileStorage.__objects.get(key)
+
+    @staticmethod
+    def __check_pending(fd, stat):
+        """
+        Raises ValueError if the snapshot of the pending records was
+        changed in place since it was scanned: FileStorage only ever
+        replaces it.
+        """
+        st = os.fstat(fd.fileno())
+        if (st.st_size, st.st_mtime_ns) != stat:
+            raise ValueError("{} changed in place since it was loaded"
+                             .format(fd.name))
+
+    @staticmethod
+    def __read_pending(fd, packed):
+        """
+        Returns the record at (offset << 32) | length in the snapshot.
+        """
+        fd.seek(packed >> 32)
+        return serializer.loads(fd.read(packed & 0xffffffff))
+
+    def __hydrate(self):
+        """
+        Builds every pending object, under __write_lock, and closes the
+        snapshot.
+        """
+        objects, fd, records, counts, stat = FileStorage.__records
+        if fd is None:
+            return
+        if objects is FileStorage.__objects:
+            self.__check_pending(fd, stat)
+            for cls in records.values():
+                for key, packed in cls.items():
+                    self.__load(self.__read_pending(fd, packed), objects)
+        FileStorage.__records = (None, None, None, None, None)
+        fd.close()
+
+    def __load(self, record, objects):
+        """
+        Puts the object described by record in the dict objects.
+        """
+        obj = self.__build(record)
+        if obj is not None:
+            objects[obj.__class__.__name__ + "." + obj.id] = obj
+
+    def __build(self, record):
+        """
+        Returns the object described by record, None for an unknown
+        class.
+
+        The attributes of a complete record are copied straight into
+        the object, without going through __init__ and the reindex() of
+        every attribute; its dates stay strings until first read (see
+        models.base_model.LazyDatetime).
+        """
+        cls = record.pop("__class__", None)
+        if cls not in self.__models_available:
+            return None
+        model = self.__models_available[cls]
+        if isinstance(record.get("id"), str) and \
+                isinstance(record.get("created_at"), str) and \
+                isinstance(record.get("updated_at"), str):
+            obj = model.__new__(model)
+            obj.__dict__.update(record)
+        else:
+            obj = model(**record)
+        return obj
+
+    def __replay_journal(self, objects, offset=0, pending=None):
+        """
+        Applies the journal records from offset, in order, on top of
+        the dict objects being loaded, and of the records pending
+        returned by __scan(), and returns the offset right after the
+        last one.
+
+        A torn last line, left by a crash in the middle of an append,
+        is ignored. With objects None, the records are applied to
+        __objects incrementally: the indexes are kept up to date and
+        the objects with unsaved changes are left alone.
+        """
+        try:
+            with open(FileStorage.__journal_path, mode="rb") as fd:
+                fd.seek(offset)
+                for line in fd:
+                    try:
+                        record = serializer.loads(line)
+                    except ValueError:
+                        break
+                    if not line.endswith(b"\n"):
+                        break
+                    offset += len(line)
+                    key = record["key"]
+                    cls = key.partition(".")[0]
+                    if pending is not None and \
+                            pending[1].get(cls, {}).pop(key, None) is not None:
+                        pending[2][cls] -= 1
+                    if objects is not None:
+                        if record["object"] is None:
+                            objects.pop(key, None)
+                        else:
+                            self.__load(record["object"], objects)
+                        continue
+                    with FileStorage.__write_lock:
+                        if key in FileStorage.__dirty:
+                            continue
+                        old = self.__built(key)
+                        if record["object"] is not None:
+                            obj = self.__build(record["object"])
+                            if obj is not None:
+                                self.__put(obj)
+                        elif old is not None:
+                            self.__drop(old)
+        except FileNotFoundError:
+            pass
+        return offset
 
     def delete(self, obj=None):
         """
         Removes an object from __objects and saves the changes.
 
         **Arguments:**
-            obj (BaseModel): Optional. The object to be removed. If not provided, no action is taken.
+            obj (BaseModel): Optional. The object to be removed. If not
+                provided, no action is taken.
         """
         if obj:
-            FileStorage.__objects.pop(obj.id, None)
+            self.__remove(obj)
             self.save()
 
+    def new_many(self, objs):
+        """
+        Adds several objects to __objects, see new().
+
+        **Arguments:**
+            objs (iterable): Instances of classes derived from BaseModel.
+        """
+        with FileStorage.__write_lock:
+            for obj in objs:
+                self.new(obj)
+
+    def delete_many(self, objs):
+        """
+        Removes several objects from __objects and saves the changes
+        once.
+
+        **Arguments:**
+            objs (iterable): The objects to be removed.
+        """
+        with FileStorage.__write_lock:
+            for obj in objs:
+                self.__remove(obj)
+        self.save()
+
+    def __remove(self, obj):
+        """
+        Removes obj from __objects and from the indexes, to be saved.
+        """
+        with FileStorage.__write_lock:
+            self.__drop(obj)
+            FileStorage.__dirty[obj.__class__.__name__ + "." + obj.id] = \
+                None
+
+    def __drop(self, obj):
+        """
+        Removes obj from __objects and from the indexes, under
+        __write_lock.
+        """
+        cls = obj.__class__.__name__
+        key = cls + "." + obj.id
+        by_class = self.__class_index(cls)
+        self.__own()
+        old = FileStorage.__objects.pop(key, None)
+        if old is not None:
+            self.__unindex_related(key, obj)
+            self.__unorder(cls, old)
+            self.__touch(cls, datetime.utcnow())
+        by_class.get(cls, {}).pop(key, None)
+        self.__unindex_geo(key)
+        ordinal = FileStorage.__place_ordinals.pop(key, None)
+        if ordinal is not None:
+            FileStorage.__place_keys[ordinal] = None
+            FileStorage.__free_ordinals.append(ordinal)
+            if numpy is not None:
+                FileStorage.__live[ordinal] = False
+
     def close(self):
         """
-        Reloads the storage.
+        Reloads the storage if the file changed.
 
-        This method is typically called at the end of a session to ensure the latest data is loaded from the file.
+        This method is typically called at the end of a session to ensure
+        the latest data is loaded from the file.
         """
         self.reload()
 
@@ -130,26 +1479,225 @@ class FileStorage:
             id_ (str): The id of the object.
 
         **Returns:**
-            BaseModel: The object with the given class name and id, or None if not found.
+            BaseModel: The object with the given class name and id, or
+                None if not found.
         """
-        if cls not in self.__models_available:
+        cls = self.__class_name(cls)
+        if cls not in self.__models_available or id_ is None:
             return None
-        all_objs = self.all(cls)
-        return all_objs.get(id_, None)
+        key = cls + "." + id_
+        obj = FileStorage.__objects.get(key, None)
+        if obj is None and FileStorage.__records[2]:
+            with FileStorage.__write_lock:
+                return self.__built(key)
+        return obj
 
     def count(self, cls=None):
         """
         Counts the number of objects in a certain class or in total.
 
         **Arguments:**
-            cls (str): Optional. The name of the class. If provided, counts only objects of that class.
+            cls (str): Optional. The name of the class. If provided,
+                counts only objects of that class.
 
         **Returns:**
-            int: The number of objects in that class, or in total if no class is specified. Returns -1 if the class is not valid.
+            int: The number of objects in that class, or in total if no
+                class is specified. Returns -1 if the class is not valid.
         """
+        objects, fd, records, counts, stat = FileStorage.__records
+        if objects is not FileStorage.__objects:
+            counts = None
         if cls is None:
-            return len(self.__objects)
+            if counts is not None:
+                return sum(self.count(name)
+                           for name in self.__models_available)
+            return len(FileStorage.__objects)
+        cls = self.__class_name(cls)
         if cls in self.__models_available:
-            return len(self.all(cls))
+            if counts is not None and \
+                    cls not in FileStorage.__indexed[1]:
+                return counts.get(cls, 0)
+            return len(self.__class_index(cls).get(cls, {}))
         return -1
 
+    def version(self, cls):
+        """
+        Returns the validators of the objects of a class.
+
+        **Arguments:**
+            cls (str): A class or class name.
+
+        **Returns:**
+            tuple: A tag changing whenever an object of the class is
+                added, changed or deleted, and the time of the last
+                change (None if unknown).
+        """
+        cls = self.__class_name(cls)
+        with FileStorage.__write_lock:
+            if FileStorage.__indexed[0] is not FileStorage.__objects:
+                self.__class_index()
+            tag = "{}.{}".format(FileStorage.__epoch,
+                                 FileStorage.__generations.get(cls, 0))
+            return tag, FileStorage.__last_modified.get(cls)
+
+    @staticmethod
+    def __unorder(cls, obj):
+        """
+        Removes obj from the (created_at, id) order of its class.
+        """
+        ordered = FileStorage.__ordered.get(cls)
+        if ordered is None or obj is None:
+            return
+        entry = (obj.created_at, obj.id)
+        i = bisect_left(ordered, entry)
+        if i < len(ordered) and ordered[i] == entry:
+            del ordered[i]
+
+    def iter_page(self, cls, after=None, limit=None, filter_=None,
+                  fields=None):
+        """
+        Iterates over objects of a class in (created_at, id) order.
+
+        **Arguments:**
+            cls (str): A class or class name.
+            after (tuple): Optional. (created_at, id) of the last object
+                of the previous page; the page starts right after it.
+            limit (int): Optional. Maximum number of objects.
+            filter_ (dict): Optional. <attribute> -> value the objects
+                must have. A foreign key of relations is looked up in
+                its index.
+            fields (list): Optional. Attributes the caller reads, unused
+                as the objects are already in memory.
+
+        **Returns:**
+            iterator: The objects of the page. The order is read 500
+                entries at a time, each time from the last entry read,
+                so that objects added or deleted meanwhile by other
+                threads never make it skip or repeat one.
+        """
+        cls = self.__class_name(cls)
+        filter_ = dict(filter_ or {})
+        indexed = [attr for attr in filter_ if attr in relations.get(cls, ())]
+        if indexed:
+            attr = indexed[0]
+            objs = self.related(cls, attr, filter_.pop(attr))
+            order = sorted((obj.created_at, obj.id) for obj in objs)
+        else:
+            with FileStorage.__write_lock:
+                by_class = self.__class_index(cls)
+                if cls not in FileStorage.__ordered:
+                    FileStorage.__ordered[cls] = sorted(
+                        (obj.created_at, obj.id)
+                        for obj in by_class.get(cls, {}).values())
+                order = FileStorage.__ordered[cls]
+        found = 0
+        while True:
+            with FileStorage.__write_lock:
+                start = bisect_right(order, after) if after is not None \
+                    else 0
+                chunk = order[start:start + 500]
+            if not chunk:
+                return
+            for after in chunk:
+                if limit is not None and found >= limit:
+                    return
+                obj = FileStorage.__objects.get(cls + "." + after[1])
+                if obj is None or any(getattr(obj, k, None) != v
+                                      for k, v in filter_.items()):
+                    continue
+                found += 1
+                yield obj
+
+    def search_places(self, states=None, cities=None, amenities=None,
+                      center=None, radius=None, bbox=None, ranges=None,
+                      fields=None):
+        """
+        Finds the places matching the places_search filters.
+
+        **Arguments:**
+            states (list): Optional. Ids of states, their cities are
+                added to cities.
+            cities (list): Optional. Ids of cities the places must be in.
+                No states and no cities means every city.
+            amenities (list): Optional. Ids of amenities every place must
+                have.
+            center (tuple): Optional. (latitude, longitude) the results
+                are sorted by distance to.
+            radius (float): Optional. Maximum distance to center, in km.
+            bbox (tuple): Optional. (west, south, east, north) box the
+                places must be in.
+            ranges (dict): Optional. <attribute of place_columns> ->
+                (min, max) inclusive bounds, None for no bound.
+            fields (list): Optional. Attributes the caller reads, unused
+                as the objects are already in memory.
+
+        **Returns:**
+            list: The matching Place objects.
+        """
+        with FileStorage.__write_lock:
+            self.__class_index("Place")
+            city_ids = set(cities or [])
+            for state_id in states or []:
+                city_ids.update(city.id for city in
+                                self.related("City", "state_id", state_id))
+            places = None
+            if states or cities:
+                # few candidates: checked against the amenity postings below
+                index = FileStorage.__related.get(("Place", "city_id"), {})
+                places = {}
+                for city_id in city_ids:
+                    places.update(index.get(city_id, {}))
+            amenities = set(amenities or [])
+            if amenities and places is not None:
+                index = FileStorage.__related.get(("Place", "amenity_ids"), {})
+                for posting in sorted((index.get(amenity_id, {})
+                                       for amenity_id in amenities), key=len):
+                    places = {k: v for k, v in places.items() if k in posting}
+            elif amenities:
+                bitmaps = sorted((FileStorage.__amenity_bitmaps.get(
+                    amenity_id, 0) for amenity_id in amenities),
+                    key=int.bit_count)
+                matches = bitmaps[0]
+                for bitmap in bitmaps[1:]:
+                    if not matches:
+                        break
+                    matches &= bitmap
+                keys = FileStorage.__place_keys
+                places = {keys[ordinal]: FileStorage.__objects[keys[ordinal]]
+                          for ordinal in self.__bitmap_ordinals(matches)}
+            if ranges:
+                places = self.__range_filter(places, ranges)
+            if center is not None and radius is not None:
+                circle = geo.bounding_box(center[0], center[1], radius)
+                if places is None:
+                    places = self.__geo_candidates(bbox or circle)
+                places = {k: v for k, v in places.items()
+                          if k in FileStorage.__geo_cell_of and
+                          geo.distance(center[0], center[1], float(v.latitude),
+                                       float(v.longitude)) <= radius}
+            if bbox is not None:
+                if places is None:
+                    places = self.__geo_candidates(bbox)
+                places = {k: v for k, v in places.items()
+                          if k in FileStorage.__geo_cell_of and
+                          geo.in_bbox(float(v.latitude), float(v.longitude),
+                                      bbox)}
+            if places is None:
+                places = self.__class_index("Place").get("Place", {})
+            places = list(places.values())
+        if center is None:
+            return places
+        return geo.sort_by_distance(places, *center)
+
+    def count_all(self, approximate=False):
+        """
+        Counts the objects of every class in one call.
+
+        **Arguments:**
+            approximate (bool): Optional. Accepted for compatibility with
+                DBStorage, the counts are always exact.
+
+        **Returns:**
+            dict: <class name> -> number of objects of that class.
+        """
+        return {cls: self.count(cls) for cls in self.__models_available}
@@ -0,0 +1,74 @@
+#!/usr/bin/python3
+"""
+This is the geo module.
+
+This module holds the geometry shared by the storage engines for the
+places_search radius and bounding box filters. Distances are in
+kilometers, bounding boxes are (west, south, east, north) in degrees as
+in GeoJSON; west > east for a box crossing the antimeridian.
+"""
+from math import asin, cos, degrees, radians, sin, sqrt
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def distance(lat1, lon1, lat2, lon2):
+    """
+    Great-circle distance between two points, in kilometers.
+    """
+    dlat = radians(lat2 - lat1)
+    dlon = radians(lon2 - lon1)
+    a = sin(dlat / 2) ** 2 + \
+        cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * asin(min(1.0, sqrt(a)))
+
+
+def bounding_box(lat, lon, radius):
+    """
+    Smallest bounding box holding the circle of radius km around a point.
+    """
+    dlat = degrees(radius / EARTH_RADIUS_KM)
+    south, north = lat - dlat, lat + dlat
+    if south <= -90 or north >= 90:
+        return (-180.0, max(south, -90.0), 180.0, min(north, 90.0))
+    dlon = degrees(asin(min(1.0, sin(radius / EARTH_RADIUS_KM) /
+                            cos(radians(lat)))))
+    if dlon >= 180:
+        return (-180.0, south, 180.0, north)
+    west = (lon - dlon + 180) % 360 - 180
+    east = (lon + dlon + 180) % 360 - 180
+    return (west, south, east, north)
+
+
+def longitude_ranges(bbox):
+    """
+    The (min, max) longitude ranges covered by a bounding box: one, or
+    two for a box crossing the antimeridian.
+    """
+    west, south, east, north = bbox
+    if west <= east:
+        return [(west, east)]
+    return [(west, 180.0), (-180.0, east)]
+
+
+def in_bbox(lat, lon, bbox):
+    """
+    Whether a point is inside a bounding box.
+    """
+    if not bbox[1] <= lat <= bbox[3]:
+        return False
+    return any(low <= lon <= high for low, high in longitude_ranges(bbox))
+
+
+def sort_by_distance(places, latitude, longitude):
+    """
+    Sorts places by distance to a point, places without coordinates last.
+    """
+    def key(place):
+        """distance of a place, infinite without coordinates"""
+        try:
+            return distance(latitude, longitude, float(place.latitude),
+                            float(place.longitude))
+        except (TypeError, ValueError):
+            return float("inf")
+    return sorted(places, key=key)
@@ -0,0 +1,195 @@
+#!/usr/bin/python3
+"""
+JSON serializer shared by FileStorage and the API.
+
+Uses orjson when it is installed, the json module otherwise; set
+HBNB_JSON=json to force the json module. Both backends serialize
+datetime objects natively, in the ISO 8601 format of
+models.base_model.time_format (orjson leaves out microseconds equal to
+0, which BaseModel parses as well), so that callers can hand them
+BaseModel.to_dict(format_dates=False) records instead of formatting every
+date with strftime first.
+"""
+from datetime import datetime
+import json
+import re
+from models.base_model import time_format
+import os
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if os.getenv("HBNB_JSON") == "json":
+    orjson = None
+
+backend = "orjson" if orjson is not None else "json"
+
+
+def _default(obj):
+    """Serializes the types json does not know."""
+    if isinstance(obj, datetime):
+        return obj.strftime(time_format)
+    raise TypeError("Object of type {} is not JSON serializable".format(
+        obj.__class__.__name__))
+
+
+def dumps(obj, sort_keys=False):
+    """
+    Serializes obj to JSON.
+
+    **Arguments:**
+        obj: The object to serialize.
+        sort_keys (bool): Optional. Sorts the keys of the dictionaries.
+
+    **Returns:**
+        bytes: The compact UTF-8 encoded JSON document.
+    """
+    if orjson is not None:
+        option = orjson.OPT_SORT_KEYS if sort_keys else 0
+        return orjson.dumps(obj, default=_default, option=option)
+    return json.dumps(obj, default=_default, sort_keys=sort_keys,
+                      separators=(",", ":"),
+                      ensure_ascii=False).encode("utf-8")
+
+
+def loads(data):
+    """
+    Deserializes a JSON document.
+
+    **Arguments:**
+        data (bytes): The document, bytes or str.
+
+    **Returns:**
+        The deserialized object.
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+chunk_size = 64 * 1024
+_decoder = json.JSONDecoder()
+_whitespace = re.compile(r"[ \t\n\r]*")
+
+
+def dump_items(items, fd):
+    """
+    Writes a JSON object to a binary file, one chunk at a time, with a
+    line per pair.
+
+    **Arguments:**
+        items (iterable): The (key, value) pairs of the object, consumed
+            one at a time. A bytes value is written as it is, already
+            serialized.
+        fd (file): The file, open for writing in binary mode.
+
+    The pairs are serialized one by one and written whenever chunk_size
+    bytes are pending, so the whole document is never held in memory.
+    """
+    chunk = [b"{"]
+    size = 1
+    for i, (key, value) in enumerate(items):
+        if not isinstance(value, bytes):
+            value = dumps(value)
+        item = dumps(key) + b":" + value
+        if i:
+            item = b",\n" + item
+        chunk.append(item)
+        size += len(item)
+        if size >= chunk_size:
+            fd.write(b"".join(chunk))
+            chunk = []
+            size = 0
+    chunk.append(b"}")
+    fd.write(b"".join(chunk))
+
+
+def _decode_line(buf, pos):
+    """
+    Decodes the pairs of the line starting at pos in buf, as written by
+    dump_items(), with orjson.
+
+    Returns the dict of the pairs and the position right after them, or
+    (None, None) if orjson is missing or the line is not made of whole
+    pairs.
+    """
+    newline = buf.find("\n", pos)
+    if orjson is None or newline == -1:
+        return None, None
+    line = buf[pos:newline].rstrip()
+    if line.endswith(","):
+        line = line[:-1]
+    try:
+        return orjson.loads("{" + line + "}"), pos + len(line)
+    except ValueError:
+        return None, None
+
+
+def iter_items(fd):
+    """
+    Reads a JSON object from a text file, one pair at a time.
+
+    **Arguments:**
+        fd (file): The file, open for reading in text mode.
+
+    **Returns:**
+        iterator: The (key, value) pairs of the object, in order. The
+            file is read chunk_size characters at a time, so only one
+            value is held in memory besides the current chunk. The lines
+            of whole pairs written by dump_items() are parsed by orjson
+            when it is installed, anything else by the json module.
+
+    Raises ValueError if the document is not a JSON object.
+    """
+    buf = fd.read(chunk_size)
+    pos = 0
+    expected = "{"
+    key = None
+    while True:
+        pos = _whitespace.match(buf, pos).end()
+        if pos == len(buf):
+            data = fd.read(chunk_size)
+            if not data:
+                raise ValueError("Unexpected end of JSON document")
+            buf = buf[pos:] + data
+            pos = 0
+            continue
+        char = buf[pos]
+        if expected in ("first key", ",") and char == "}":
+            return
+        if expected in ("{", ":", ","):
+            if char != expected:
+                raise ValueError("Expected {!r}".format(expected))
+            pos += 1
+            expected = {"{": "first key", ":": "value", ",": "key"}[char]
+            continue
+        if expected != "value":
+            pairs, end = _decode_line(buf, pos)
+            if end is not None:
+                yield from pairs.items()
+                pos = end
+                expected = ","
+                continue
+        try:
+            value, end = _decoder.raw_decode(buf, pos)
+        except ValueError:
+            end = None
+        if end is None or (end == len(buf) and
+                           not isinstance(value, (dict, list, str))):
+            data = fd.read(chunk_size)
+            if data:
+                buf = buf[pos:] + data
+                pos = 0
+                continue
+            if end is None:
+                raise ValueError("Invalid JSON value")
+        pos = end
+        if expected == "value":
+            yield key, value
+            expected = ","
+        elif isinstance(value, str):
+            key = value
+            expected = ":"
+        else:
+            raise ValueError("Expected a key")
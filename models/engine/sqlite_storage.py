@@ -0,0 +1,68 @@
+#!/usr/bin/python3
+"""
+This is the sqlite_storage module.
+This module deals with storing and retrieving data from a SQLite database
+file, for single node deployments and development without MySQL.
+This module contains one class SQLiteStorage.
+"""
+from models.engine.db_storage import DBStorage
+from os import getenv
+from sqlalchemy import (create_engine, event, inspect, text)
+
+
+class SQLiteStorage(DBStorage):
+    """
+    class SQLiteStorage
+    Save and retrieve data from a SQLite database using sqlAlchemy ORM
+
+    The database runs in WAL mode so readers do not block the writer.
+
+    environment variables:
+       HBNB_SQLITE_PATH: database file (default hbnb.db)
+       HBNB_SQLITE_SYNCHRONOUS: PRAGMA synchronous (default NORMAL)
+       HBNB_SQLITE_MMAP_SIZE: PRAGMA mmap_size in bytes (default 256MiB)
+       HBNB_SQLITE_CACHE_SIZE: PRAGMA cache_size (default -65536, i.e.
+           64MiB)
+    """
+
+    def _create_engine(self):
+        """
+        creates the sqlAlchemy engine on the SQLite database file
+        """
+        engine = create_engine(
+            'sqlite:///{}'.format(getenv('HBNB_SQLITE_PATH', 'hbnb.db')),
+            connect_args={'check_same_thread': False},
+            **self._pool_options())
+        pragmas = {
+            'journal_mode': 'WAL',
+            'synchronous': getenv('HBNB_SQLITE_SYNCHRONOUS', 'NORMAL'),
+            'mmap_size': int(getenv('HBNB_SQLITE_MMAP_SIZE', 256 << 20)),
+            'cache_size': int(getenv('HBNB_SQLITE_CACHE_SIZE', -65536)),
+            'foreign_keys': 'ON',
+            'busy_timeout': 5000,
+        }
+
+        @event.listens_for(engine, 'connect')
+        def set_pragmas(dbapi_connection, connection_record):
+            """applies the pragmas to every new connection"""
+            cursor = dbapi_connection.cursor()
+            for name, value in pragmas.items():
+                cursor.execute('PRAGMA {}={}'.format(name, value))
+            cursor.close()
+
+        return engine
+
+    def _approximate_counts(self, session):
+        """
+        row counts of every table from sqlite_stat1, filled by ANALYZE
+
+        Return:
+            dictionary of <class name> <estimated number of objects>, or
+            None if the database was never analyzed
+        """
+        if not inspect(session.connection()).has_table('sqlite_stat1'):
+            return None
+        rows = session.execute(text(
+            "SELECT tbl, MAX(CAST(stat AS INTEGER)) FROM sqlite_stat1"
+            " GROUP BY tbl"))
+        return self._counts_by_class(dict(rows.all()))
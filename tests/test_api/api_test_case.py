@@ -0,0 +1,42 @@
+#!/usr/bin/python3
+"""
+Contains the ApiTestCase class, base of the tests of the API
+"""
+from api.v1.app import app
+import models
+from models.engine.file_storage import FileStorage
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+
+class ApiTestCase(unittest.TestCase):
+    """
+    Runs the app with a test client, on a temporary file.json in file
+    mode or on the database of the run in db mode, without the response
+    cache
+    """
+    def setUp(self):
+        """Points the storage at an empty file and creates the client"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        if models.storage_t != "db":
+            path = os.path.join(self.tmp.name, "file.json")
+            for attr, value in (("file_path", path),
+                                ("journal_path", path + ".journal"),
+                                ("objects", {}), ("dirty", {}),
+                                ("synced", (None, None)),
+                                ("damaged", None)):
+                self.patch(FileStorage, "_FileStorage__" + attr, value)
+        patcher = mock.patch.dict(app.extensions)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        app.extensions.pop("response_cache", None)
+        self.client = app.test_client()
+
+    def patch(self, target, attr, value):
+        """Sets target.attr to value for the duration of the test"""
+        patcher = mock.patch.object(target, attr, value)
+        patcher.start()
+        self.addCleanup(patcher.stop)
@@ -0,0 +1,112 @@
+#!/usr/bin/python3
+"""
+Contains the TestTeardown and TestConcurrentRequests classes
+"""
+from api.v1.app import app
+import models
+import os
+from models.engine import file_storage
+from models.engine.file_storage import FileStorage
+import threading
+import time
+from tests.test_api.api_test_case import ApiTestCase
+import unittest
+
+
+@unittest.skipIf(models.storage_t == "db", "not testing file storage")
+class TestTeardown(ApiTestCase):
+    """Test the storage reload of the request teardown"""
+    def test_damaged_file(self):
+        """Test a damaged file.json does not fail the requests"""
+        response = self.client.post("/api/v1/states", json={"name": "A"})
+        self.assertEqual(response.status_code, 201)
+        path = FileStorage._FileStorage__file_path
+        with open(path + ".new", "w") as fd:
+            fd.write("{garbage")
+        os.replace(path + ".new", path)
+        with self.assertLogs(file_storage.logger, "ERROR"):
+            response = self.client.get("/api/v1/status/")
+        self.assertEqual(response.status_code, 200)
+        with self.assertLogs(file_storage.logger, "ERROR"):
+            response = self.client.get("/api/v1/states")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([s["name"] for s in response.get_json()], ["A"])
+
+
+@unittest.skipIf(models.storage_t == "db", "not testing file storage")
+class TestConcurrentRequests(ApiTestCase):
+    """Test requests served by several threads at once"""
+    def test_stress(self):
+        """Test concurrent GET, POST and DELETE requests while the
+        teardown of each request reloads the storage"""
+        base = [self.client.post("/api/v1/states",
+                                 json={"name": str(i)}).get_json()["id"]
+                for i in range(10)]
+        stop = threading.Event()
+        errors = []
+        kept = []
+
+        def hammer(func):
+            """Calls func with a client of its own until stop is set,
+            recording any failure"""
+            def run():
+                """Body of the thread"""
+                client = app.test_client()
+                try:
+                    while not stop.is_set():
+                        func(client)
+                except BaseException as e:
+                    errors.append(e)
+                    stop.set()
+            return threading.Thread(target=run)
+
+        def read(client):
+            """Lists the states and gets one of them"""
+            response = client.get("/api/v1/states")
+            self.assertEqual(response.status_code, 200)
+            ids = {s["id"] for s in response.get_json()}
+            self.assertLessEqual(set(base), ids)
+            response = client.get("/api/v1/states/" + base[0])
+            self.assertEqual(response.status_code, 200)
+
+        def write(client):
+            """Creates two states, then deletes one of them"""
+            ids = []
+            for name in ("kept", "deleted"):
+                response = client.post("/api/v1/states", json={"name": name})
+                self.assertEqual(response.status_code, 201)
+                ids.append(response.get_json()["id"])
+            kept.append(ids[0])
+            response = client.get("/api/v1/states/" + ids[1])
+            self.assertEqual(response.status_code, 200)
+            response = client.delete("/api/v1/states/" + ids[1])
+            self.assertEqual(response.status_code, 200)
+            response = client.get("/api/v1/states/" + ids[1])
+            self.assertEqual(response.status_code, 404)
+
+        def reload(client):
+            """Makes the next teardown reload everything, as after a
+            change of another process"""
+            FileStorage._FileStorage__synced = (None, None)
+            response = client.get("/api/v1/status/")
+            self.assertEqual(response.status_code, 200)
+            time.sleep(0.01)
+
+        threads = [hammer(read) for i in range(4)] + \
+            [hammer(write) for i in range(2)] + [hammer(reload)]
+        for thread in threads:
+            thread.start()
+        time.sleep(1)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__synced = (None, None)
+        models.storage.reload()
+        self.assertEqual(set(models.storage.all("State")),
+                         {"State." + id_ for id_ in base + kept})
+
+
+if __name__ == "__main__":
+    unittest.main()
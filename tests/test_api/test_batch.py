@@ -0,0 +1,163 @@
+#!/usr/bin/python3
+"""
+Contains the TestBatch class
+"""
+import importlib
+import models
+from models.engine.file_storage import FileStorage
+from sqlalchemy import event
+from tests.test_api.api_test_case import ApiTestCase
+import unittest
+from unittest import mock
+# the module, shadowed in api.v1.views by its batch() view
+batch = importlib.import_module("api.v1.views.batch")
+
+
+class TestBatch(ApiTestCase):
+    """Test the bulk endpoints POST /api/v1/<resource>/batch"""
+    def setUp(self):
+        """Creates a state"""
+        super().setUp()
+        self.state = self.create("states", {"name": "A"})
+
+    def create(self, resource, data):
+        """POSTs one object, deleted at the end of the test"""
+        url = "/api/v1/" + resource
+        if resource == "cities":
+            url = "/api/v1/states/{}/cities".format(data["state_id"])
+        obj = self.client.post(url, json=data).get_json()
+        self.addCleanup(self.client.delete,
+                        "/api/v1/{}/{}".format(resource, obj["id"]))
+        return obj
+
+    def batch(self, resource, operations):
+        """POSTs operations to the batch endpoint of resource"""
+        response = self.client.post("/api/v1/{}/batch".format(resource),
+                                    json=operations)
+        if response.status_code == 200:
+            for result in response.get_json():
+                if result["status"] == 201:
+                    self.addCleanup(self.client.delete, "/api/v1/{}/{}".format(
+                        resource, result["object"]["id"]))
+        return response
+
+    def get(self, resource, id_):
+        """Returns the object of resource, None if not found"""
+        response = self.client.get("/api/v1/{}/{}".format(resource, id_))
+        return response.get_json() if response.status_code == 200 else None
+
+    def test_statuses(self):
+        """Test the results of create, update and delete, in order"""
+        other = self.create("states", {"name": "B"})
+        response = self.batch("states", [
+            {"op": "create", "data": {"name": "C", "id": "mine"}},
+            {"op": "update", "id": self.state["id"],
+             "data": {"name": "D", "created_at": "2000-01-01T00:00:00"}},
+            {"op": "delete", "id": other["id"]}])
+        self.assertEqual(response.status_code, 200)
+        results = response.get_json()
+        self.assertEqual([r["status"] for r in results], [201, 200, 200])
+        self.assertEqual(results[0]["object"]["name"], "C")
+        self.assertNotEqual(results[0]["object"]["id"], "mine")
+        self.assertEqual(results[1]["object"]["name"], "D")
+        self.assertEqual(results[2], {"status": 200, "id": other["id"]})
+        state = self.get("states", self.state["id"])
+        self.assertEqual(state["name"], "D")
+        self.assertEqual(state["created_at"], self.state["created_at"])
+        self.assertIsNotNone(self.get("states", results[0]["object"]["id"]))
+        self.assertIsNone(self.get("states", other["id"]))
+
+    def test_all_or_nothing(self):
+        """Test nothing is applied when one operation fails"""
+        response = self.batch("states", [
+            {"op": "create", "data": {"name": "C"}},
+            {"op": "update", "id": self.state["id"], "data": {"name": "D"}},
+            {"op": "delete", "id": "nope"},
+            {"op": "create", "data": {}},
+            {"op": "move"},
+            "state"])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json(), [
+            {"index": 2, "status": 404, "error": "Not found"},
+            {"index": 3, "status": 400, "error": "Missing name"},
+            {"index": 4, "status": 400, "error": "Invalid op"},
+            {"index": 5, "status": 400, "error": "Not a JSON object"}])
+        self.assertEqual(self.get("states", self.state["id"])["name"], "A")
+        names = [s["name"] for s in
+                 self.client.get("/api/v1/states").get_json()]
+        self.assertNotIn("C", names)
+
+    def test_duplicate_id(self):
+        """Test an object is targeted once per batch"""
+        response = self.batch("states", [
+            {"op": "update", "id": self.state["id"], "data": {"name": "D"}},
+            {"op": "delete", "id": self.state["id"]},
+            {"op": "update", "data": {"name": "E"}}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json(), [
+            {"index": 1, "status": 400, "error": "Duplicate id"},
+            {"index": 2, "status": 400, "error": "Missing id"}])
+
+    def test_parents(self):
+        """Test the parents of a create must exist"""
+        response = self.batch("cities", [
+            {"op": "create", "data": {"name": "X", "state_id": "nope"}},
+            {"op": "create", "data": {"name": "Y"}}])
+        self.assertEqual(response.get_json(), [
+            {"index": 0, "status": 404, "error": "State not found"},
+            {"index": 1, "status": 400, "error": "Missing state_id"}])
+        response = self.batch("cities", [
+            {"op": "create", "data": {"name": "X",
+                                      "state_id": self.state["id"]}}])
+        self.assertEqual(response.status_code, 200)
+        cities = self.client.get("/api/v1/states/{}/cities".format(
+            self.state["id"])).get_json()
+        self.assertEqual([c["name"] for c in cities], ["X"])
+
+    def test_frozen(self):
+        """Test an update leaves the parents of an object alone"""
+        other = self.create("states", {"name": "B"})
+        city = self.create("cities", {"name": "X",
+                                      "state_id": self.state["id"]})
+        response = self.batch("cities", [
+            {"op": "update", "id": city["id"],
+             "data": {"name": "Y", "state_id": other["id"]}}])
+        self.assertEqual(response.status_code, 200)
+        city = self.get("cities", city["id"])
+        self.assertEqual(city["name"], "Y")
+        self.assertEqual(city["state_id"], self.state["id"])
+
+    def test_single_write(self):
+        """Test the whole batch is written at once"""
+        operations = [{"op": "create", "data": {"name": str(i)}}
+                      for i in range(10)]
+        operations.append({"op": "delete", "id": self.state["id"]})
+        if models.storage_t == "db":
+            commits = []
+            engine = models.storage._DBStorage__engine
+            listener = (lambda conn: commits.append(conn))
+            event.listen(engine, "commit", listener)
+            self.addCleanup(event.remove, engine, "commit", listener)
+            self.batch("states", operations)
+            self.assertEqual(len(commits), 1)
+            return
+        write = FileStorage._FileStorage__write
+        with mock.patch.object(FileStorage, "_FileStorage__write",
+                               autospec=True, side_effect=write) as writes:
+            self.batch("states", operations)
+        self.assertEqual(writes.call_count, 1)
+
+    def test_request(self):
+        """Test the body must be a bounded JSON array"""
+        response = self.client.post("/api/v1/states/batch",
+                                    json={"op": "create"})
+        self.assertEqual(response.status_code, 400)
+        with mock.patch.object(batch, "max_operations", 1):
+            response = self.batch("states", [{"op": "delete"}] * 2)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_data(as_text=True),
+                         "Too many operations")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,154 @@
+#!/usr/bin/python3
+"""
+Contains the TestResponseCache and TestResponseCacheViews classes
+"""
+from api.v1 import cache
+from api.v1.app import app
+from api.v1.cache import ResponseCache
+import os
+import tempfile
+from tests.test_api.api_test_case import ApiTestCase
+import unittest
+from unittest import mock
+
+
+def entry(body=b"[]"):
+    """Returns a cached (body, status, headers) value"""
+    return body, 200, [("Content-Type", "application/json")]
+
+
+class TestResponseCache(unittest.TestCase):
+    """Test the ResponseCache class"""
+    def test_hit_and_miss(self):
+        """Test an entry is served for its ETag"""
+        c = ResponseCache()
+        self.assertIsNone(c.get("/a", "e1"))
+        c.put("/a", "e1", entry())
+        self.assertEqual(c.get("/a", "e1"), entry())
+        counters = c.counters()
+        self.assertEqual((counters["hits"], counters["misses"]), (1, 1))
+        self.assertEqual((counters["entries"], counters["bytes"]), (1, 2))
+
+    def test_invalidation(self):
+        """Test a new ETag of the URL drops its former entry"""
+        c = ResponseCache()
+        c.put("/a", "e1", entry())
+        self.assertIsNone(c.get("/a", "e2"))
+        self.assertEqual(c.counters()["invalidations"], 1)
+        self.assertEqual(c.counters()["entries"], 0)
+        c.put("/a", "e2", entry())
+        c.put("/a", "e3", entry())
+        self.assertEqual(c.counters()["invalidations"], 2)
+        self.assertEqual(c.get("/a", "e3"), entry())
+        self.assertEqual(c.counters()["entries"], 1)
+
+    def test_evictions(self):
+        """Test the least recently used entry is evicted"""
+        c = ResponseCache(max_entries=2)
+        c.put("/a", "a", entry())
+        c.put("/b", "b", entry())
+        c.get("/a", "a")
+        c.put("/c", "c", entry())
+        self.assertEqual(c.counters()["evictions"], 1)
+        self.assertIsNone(c.get("/b", "b"))
+        self.assertIsNotNone(c.get("/a", "a"))
+        self.assertIsNotNone(c.get("/c", "c"))
+
+    def test_max_bytes(self):
+        """Test the entries are evicted to fit in max_bytes"""
+        c = ResponseCache(max_bytes=10)
+        c.put("/a", "a", entry(b"123456"))
+        c.put("/b", "b", entry(b"123456"))
+        self.assertEqual(c.counters()["entries"], 1)
+        self.assertEqual(c.counters()["bytes"], 6)
+        self.assertIsNone(c.get("/a", "a"))
+        c.put("/c", "c", entry(b"x" * 20))
+        self.assertEqual(c.get("/c", "c"), entry(b"x" * 20))
+
+    def test_ttl(self):
+        """Test entries older than ttl expire"""
+        c = ResponseCache(ttl=60)
+        with mock.patch.object(cache.time, "time", return_value=1000):
+            c.put("/a", "a", entry())
+        with mock.patch.object(cache.time, "time", return_value=1060):
+            self.assertEqual(c.get("/a", "a"), entry())
+        with mock.patch.object(cache.time, "time", return_value=1061):
+            self.assertIsNone(c.get("/a", "a"))
+        self.assertEqual(c.counters()["expirations"], 1)
+        self.assertEqual(c.counters()["entries"], 0)
+
+    def test_shared(self):
+        """Test the workers serve each other's entries from directory"""
+        with tempfile.TemporaryDirectory() as directory:
+            first = ResponseCache(directory=directory, ttl=60)
+            second = ResponseCache(directory=directory, ttl=60)
+            first.put("/a", "a", entry(b"\xe9t\xe9"))
+            self.assertEqual(second.get("/a", "a"), entry(b"\xe9t\xe9"))
+            self.assertEqual(second.counters()["shared_hits"], 1)
+            self.assertEqual(second.get("/a", "a"), entry(b"\xe9t\xe9"))
+            self.assertEqual(second.counters()["hits"], 1)
+            old = os.path.getmtime(os.path.join(directory, "a")) - 61
+            os.utime(os.path.join(directory, "a"), (old, old))
+            self.assertIsNone(ResponseCache(directory=directory,
+                                            ttl=60).get("/a", "a"))
+
+    def test_from_env(self):
+        """Test the cache is off unless HBNB_API_CACHE_SIZE is set"""
+        with mock.patch.dict(os.environ):
+            os.environ.pop("HBNB_API_CACHE_SIZE", None)
+            self.assertIsNone(ResponseCache.from_env())
+            os.environ["HBNB_API_CACHE_SIZE"] = "0"
+            self.assertIsNone(ResponseCache.from_env())
+            os.environ["HBNB_API_CACHE_SIZE"] = "5"
+            self.assertEqual(ResponseCache.from_env().max_entries, 5)
+
+
+class TestResponseCacheViews(ApiTestCase):
+    """Test the response cache of the GET views"""
+    def setUp(self):
+        """Turns the cache on"""
+        super().setUp()
+        self.cache = ResponseCache()
+        app.extensions["response_cache"] = self.cache
+
+    def post(self, url, data):
+        """POSTs data, deleting the object at the end of the test"""
+        obj = self.client.post("/api/v1/" + url, json=data).get_json()
+        kind = "cities" if "state_id" in obj else "states"
+        self.addCleanup(self.client.delete,
+                        "/api/v1/{}/{}".format(kind, obj["id"]))
+        return obj
+
+    def test_hit(self):
+        """Test a second GET is served from the cache"""
+        self.post("states", {"name": "A"})
+        first = self.client.get("/api/v1/states")
+        second = self.client.get("/api/v1/states")
+        self.assertEqual(second.get_data(), first.get_data())
+        self.assertEqual(second.headers["ETag"], first.headers["ETag"])
+        self.assertEqual(second.mimetype, "application/json")
+        self.assertEqual(self.cache.counters()["hits"], 1)
+
+    def test_city_invalidates_cities(self):
+        """Test a new City invalidates the cities of its state"""
+        state = self.post("states", {"name": "A"})
+        url = "/api/v1/states/{}/cities".format(state["id"])
+        self.assertEqual(self.client.get(url).get_json(), [])
+        self.assertEqual(self.client.get(url).get_json(), [])
+        self.assertEqual(self.cache.counters()["hits"], 1)
+        city = self.post("states/{}/cities".format(state["id"]),
+                         {"name": "B"})
+        cities = self.client.get(url).get_json()
+        self.assertEqual([c["id"] for c in cities], [city["id"]])
+        self.assertEqual(self.cache.counters()["invalidations"], 1)
+
+    def test_counters(self):
+        """Test the counters are served"""
+        self.client.get("/api/v1/states")
+        counters = self.client.get("/api/v1/stats/cache/").get_json()
+        self.assertEqual(counters["misses"], 1)
+        self.assertEqual(counters["entries"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+#!/usr/bin/python3
+"""
+Contains the TestConditional class
+"""
+from datetime import datetime, timedelta
+import models
+from models.engine.file_storage import FileStorage
+from models.state import State
+from tests.test_api.api_test_case import ApiTestCase
+import unittest
+from werkzeug.http import http_date
+
+
+class TestConditional(ApiTestCase):
+    """Test the conditional GETs of the list endpoints"""
+    def post_states(self, count):
+        """Creates count states, deleted at the end of the test"""
+        ids = []
+        for i in range(count):
+            response = self.client.post("/api/v1/states",
+                                        json={"name": str(i)})
+            ids.append(response.get_json()["id"])
+            self.addCleanup(self.client.delete, "/api/v1/states/" + ids[-1])
+        return ids
+
+    def listed(self, response):
+        """Returns the ids of the states of a list response"""
+        return {state["id"] for state in response.get_json()}
+
+    def test_etag(self):
+        """Test the ETag answers 304 until a state is deleted"""
+        ids = self.post_states(2)
+        etag = self.client.get("/api/v1/states").headers["ETag"]
+        response = self.client.get("/api/v1/states",
+                                   headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.client.delete("/api/v1/states/" + ids[0])
+        response = self.client.get("/api/v1/states",
+                                   headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(ids[0], self.listed(response))
+        self.assertIn(ids[1], self.listed(response))
+
+    def test_delete_within_the_second(self):
+        """Test a delete in the second of If-Modified-Since is served"""
+        ids = self.post_states(2)
+        since = http_date(datetime.utcnow().replace(microsecond=0))
+        self.client.delete("/api/v1/states/" + ids[0])
+        response = self.client.get("/api/v1/states",
+                                   headers={"If-Modified-Since": since})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(ids[0], self.listed(response))
+
+    def test_delete_then_restart(self):
+        """Test If-Modified-Since after a delete and a restart is served"""
+        now = datetime.utcnow()
+        states = []
+        for hours in (2, 1):
+            state = State(name=str(hours))
+            state.updated_at = now - timedelta(hours=hours)
+            models.storage.new(state)
+            states.append(state)
+            self.addCleanup(self.client.delete, "/api/v1/states/" + state.id)
+        models.storage.save()
+        since = http_date(now - timedelta(minutes=30))
+        self.client.delete("/api/v1/states/" + states[1].id)
+        if models.storage_t != "db":
+            FileStorage._FileStorage__objects = {}
+            FileStorage._FileStorage__synced = (None, None)
+            models.storage.reload()
+        response = self.client.get("/api/v1/states",
+                                   headers={"If-Modified-Since": since})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(states[1].id, self.listed(response))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+#!/usr/bin/python3
+"""
+Contains the TestStats class
+"""
+import models
+from tests.test_api.api_test_case import ApiTestCase
+import unittest
+
+
+class TestStats(ApiTestCase):
+    """Test the statistics endpoints"""
+    def test_reload_stats(self):
+        """Test the reloads of the request teardowns are counted"""
+        before = self.client.get("/api/v1/stats/reloads/").get_json()
+        if models.storage_t == "db":
+            self.assertEqual(before, {})
+            return
+        self.client.get("/api/v1/status/")
+        self.client.get("/api/v1/status/")
+        after = self.client.get("/api/v1/stats/reloads/").get_json()
+        self.assertEqual(after["performed"] + after["skipped"],
+                         before["performed"] + before["skipped"] + 3)
+        self.assertGreaterEqual(after["skipped"], before["skipped"] + 2)
+
+    def test_pool_stats(self):
+        """Test the connection pool statistics are served"""
+        stats = self.client.get("/api/v1/stats/pool/").get_json()
+        if models.storage_t != "db":
+            self.assertEqual(stats, {})
+            return
+        self.assertEqual(set(stats), {"size", "checked_in", "checked_out",
+                                      "overflow", "checkouts",
+                                      "wait_mean_ms", "wait_max_ms"})
+        self.assertGreaterEqual(stats["checkouts"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
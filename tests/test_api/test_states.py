@@ -0,0 +1,36 @@
+#!/usr/bin/python3
+"""
+Contains the TestStatesGroupCommit class
+"""
+import json
+import models
+from models.engine.file_storage import FileStorage
+from tests.test_api.api_test_case import ApiTestCase
+import unittest
+from unittest import mock
+
+
+@unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+class TestStatesGroupCommit(ApiTestCase):
+    """Test group commit through the requests of the API"""
+    def test_posts_grouped(self):
+        """Test that the POSTs of one interval are written once"""
+        self.patch(FileStorage, "_FileStorage__group_commit_ms", 1000)
+        write = FileStorage._FileStorage__write
+        with mock.patch.object(FileStorage, "_FileStorage__write",
+                               autospec=True, side_effect=write) as writes:
+            ids = [self.client.post("/api/v1/states",
+                                    json={"name": str(i)}).get_json()["id"]
+                   for i in range(5)]
+            self.assertEqual(writes.call_count, 0)
+            response = self.client.get("/api/v1/states")
+            self.assertEqual(len(response.get_json()), 5)
+            models.storage._FileStorage__group_commit()
+            self.assertEqual(writes.call_count, 1)
+        with open(FileStorage._FileStorage__file_path) as f:
+            self.assertEqual(set(json.load(f)),
+                             {"State." + id_ for id_ in ids})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+#!/usr/bin/python3
+"""
+Contains the TestStreamingNegotiation class
+"""
+from api.v1.app import app
+from api.v1.cache import ResponseCache
+import json
+from tests.test_api.api_test_case import ApiTestCase
+import unittest
+
+ndjson = {"Accept": "application/x-ndjson"}
+
+
+class TestStreamingNegotiation(ApiTestCase):
+    """Test the JSON and NDJSON responses of one URL, with the cache on"""
+    def setUp(self):
+        """Turns the cache on and creates a state"""
+        super().setUp()
+        app.extensions["response_cache"] = ResponseCache()
+        state = self.client.post("/api/v1/states",
+                                 json={"name": "A"}).get_json()
+        self.addCleanup(self.client.delete,
+                        "/api/v1/states/" + state["id"])
+        self.id = state["id"]
+
+    def test_json_then_ndjson(self):
+        """Test a cached JSON response is not served as NDJSON"""
+        first = self.client.get("/api/v1/states")
+        self.assertEqual(first.mimetype, "application/json")
+        self.assertIn(self.id, [s["id"] for s in first.get_json()])
+        self.assertIn("Accept", first.vary)
+        second = self.client.get("/api/v1/states", headers=ndjson)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.mimetype, "application/x-ndjson")
+        lines = second.get_data(as_text=True).splitlines()
+        self.assertIn(self.id, [json.loads(line)["id"] for line in lines])
+        self.assertNotEqual(second.headers["ETag"], first.headers["ETag"])
+        self.assertIn("Accept", second.vary)
+        third = self.client.get("/api/v1/states")
+        self.assertEqual(third.get_data(), first.get_data())
+
+    def test_etag_per_format(self):
+        """Test the ETag of the JSON response does not validate NDJSON"""
+        etag = self.client.get("/api/v1/states").headers["ETag"]
+        headers = dict(ndjson, **{"If-None-Match": etag})
+        response = self.client.get("/api/v1/states", headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "application/x-ndjson")
+        response = self.client.get("/api/v1/states",
+                                   headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -143,6 +143,17 @@ class TestBaseModel(unittest.TestCase):
         self.assertEqual(new_d["created_at"], bm.created_at.strftime(t_format))
         self.assertEqual(new_d["updated_at"], bm.updated_at.strftime(t_format))
 
+    def test_to_json_fields(self):
+        """test that to_json only serializes the requested fields"""
+        t_format = "%Y-%m-%dT%H:%M:%S.%f"
+        bm = BaseModel()
+        bm.name = "Holberton"
+        bm.password = "secret"
+        self.assertNotIn("password", bm.to_json())
+        d = bm.to_json(("name", "created_at", "password", "missing"))
+        self.assertEqual(d, {"name": "Holberton",
+                             "created_at": bm.created_at.strftime(t_format)})
+
     def test_str(self):
         """test that the str method has the correct output"""
         inst = BaseModel()
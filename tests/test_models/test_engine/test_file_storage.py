@@ -7,6 +7,7 @@ from datetime import datetime
 import inspect
 import models
 from models.engine import file_storage
+from models.engine import serializer
 from models.amenity import Amenity
 from models.base_model import BaseModel
 from models.city import City
@@ -17,7 +18,11 @@ from models.user import User
 import json
 import os
 import pep8
+import tempfile
+import threading
+import time
 import unittest
+from unittest import mock
 FileStorage = file_storage.FileStorage
 classes = {"Amenity": Amenity, "BaseModel": BaseModel, "City": City,
            "Place": Place, "Review": Review, "State": State, "User": User}
@@ -113,3 +118,1166 @@ class TestFileStorage(unittest.TestCase):
         with open("file.json", "r") as f:
             js = f.read()
         self.assertEqual(json.loads(string), json.loads(js))
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_all_cls_uses_index(self):
+        """Test that all(cls) returns only objects of that class"""
+        storage = FileStorage()
+        save = FileStorage._FileStorage__objects
+        FileStorage._FileStorage__objects = {}
+        state = State()
+        city = City()
+        storage.new(state)
+        storage.new(city)
+        self.assertEqual(storage.all("State"), {"State." + state.id: state})
+        self.assertEqual(storage.all(City), {"City." + city.id: city})
+        self.assertEqual(storage.all("User"), {})
+        FileStorage._FileStorage__objects = save
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_get(self):
+        """Test that get returns the object by class name and id"""
+        storage = FileStorage()
+        save = FileStorage._FileStorage__objects
+        FileStorage._FileStorage__objects = {}
+        state = State()
+        storage.new(state)
+        self.assertIs(storage.get("State", state.id), state)
+        self.assertIsNone(storage.get("City", state.id))
+        self.assertIsNone(storage.get("Nope", state.id))
+        FileStorage._FileStorage__objects = save
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_count(self):
+        """Test that count follows new and delete"""
+        storage = FileStorage()
+        save = FileStorage._FileStorage__objects
+        FileStorage._FileStorage__objects = {}
+        states = [State() for i in range(3)]
+        for state in states:
+            storage.new(state)
+        storage.new(User())
+        self.assertEqual(storage.count("State"), 3)
+        self.assertEqual(storage.count(), 4)
+        self.assertEqual(storage.count("Nope"), -1)
+        storage.delete(states[0])
+        self.assertEqual(storage.count("State"), 2)
+        self.assertIsNone(storage.get("State", states[0].id))
+        FileStorage._FileStorage__objects = save
+
+
+class TmpFileStorageTestCase(unittest.TestCase):
+    """Base class for tests running FileStorage on a temporary file"""
+    journal = False
+    lazy = False
+
+    def setUp(self):
+        """Point FileStorage at a temporary file"""
+        self.tmp = tempfile.TemporaryDirectory()
+        path = os.path.join(self.tmp.name, "file.json")
+        self.saved = {}
+        for attr, value in (("file_path", path),
+                            ("journal_path", path + ".journal"),
+                            ("journal", self.journal), ("objects", {}),
+                            ("lazy", self.lazy),
+                            ("records", (None, None, None, None)),
+                            ("damaged", None),
+                            ("dirty", {}),
+                            ("journal_max", 4 * 1024 * 1024)):
+            attr = "_FileStorage__" + attr
+            self.saved[attr] = getattr(FileStorage, attr)
+            setattr(FileStorage, attr, value)
+        self.storage = FileStorage()
+
+    def tearDown(self):
+        """Restore FileStorage"""
+        if FileStorage._FileStorage__records[1] is not None:
+            FileStorage._FileStorage__records[1].close()
+        for attr, value in self.saved.items():
+            setattr(FileStorage, attr, value)
+        self.tmp.cleanup()
+
+
+@unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+class TestFileStorageJournal(TmpFileStorageTestCase):
+    """Test FileStorage in journal mode"""
+    journal = True
+
+    def journal_lines(self):
+        """Returns the records in the journal"""
+        with open(FileStorage._FileStorage__journal_path) as f:
+            return [json.loads(line) for line in f]
+
+    def test_save_appends(self):
+        """Test that save appends the changed objects only"""
+        first = State(name="California")
+        first.save()
+        second = State(name="Nevada")
+        second.save()
+        records = self.journal_lines()
+        self.assertEqual([r["key"] for r in records],
+                         ["State." + first.id, "State." + second.id])
+        self.assertFalse(os.path.exists(FileStorage._FileStorage__file_path))
+
+    def test_reload_replays_journal(self):
+        """Test that reload merges the snapshot and the journal"""
+        first = State(name="California")
+        first.save()
+        second = State(name="Nevada")
+        second.save()
+        second.delete()
+        first.name = "Arizona"
+        first.save()
+        self.storage.reload()
+        self.assertEqual(list(self.storage.all("State")),
+                         ["State." + first.id])
+        self.assertEqual(self.storage.get("State", first.id).name, "Arizona")
+
+    def test_compaction(self):
+        """Test that a journal past the threshold is compacted"""
+        FileStorage._FileStorage__journal_max = 0
+        state = State(name="California")
+        state.save()
+        self.assertEqual(self.journal_lines(), [])
+        with open(FileStorage._FileStorage__file_path) as f:
+            self.assertIn("State." + state.id, json.load(f))
+        self.storage.reload()
+        self.assertIsNotNone(self.storage.get("State", state.id))
+
+
+@unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+class TestFileStorageReload(TmpFileStorageTestCase):
+    """Test that FileStorage only reloads when the file changed"""
+    def test_close_skips_unchanged_file(self):
+        """Test that close does not rebuild the objects after a save"""
+        state = State(name="California")
+        state.save()
+        objects = self.storage.all()
+        before = self.storage.reload_stats()
+        self.storage.close()
+        self.storage.close()
+        after = self.storage.reload_stats()
+        self.assertIs(self.storage.all(), objects)
+        self.assertEqual(after["skipped"], before["skipped"] + 2)
+        self.assertEqual(after["performed"], before["performed"])
+
+    def test_close_reloads_changed_file(self):
+        """Test that close picks up a file written by somebody else"""
+        state = State(name="California")
+        state.save()
+        with open(FileStorage._FileStorage__file_path, "w") as f:
+            json.dump({}, f)
+        before = self.storage.reload_stats()
+        self.storage.close()
+        self.assertEqual(self.storage.reload_stats()["performed"],
+                         before["performed"] + 1)
+        self.assertIsNone(self.storage.get("State", state.id))
+
+
+@unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+class TestFileStorageRelated(TmpFileStorageTestCase):
+    """Test the reverse foreign key indexes of FileStorage"""
+    def test_state_cities(self):
+        """Test that State.cities follows new, delete and updates"""
+        state = State(name="California")
+        other = State(name="Nevada")
+        city = City(name="Fresno", state_id=state.id)
+        self.storage.new(state)
+        self.storage.new(other)
+        self.storage.new(city)
+        self.assertEqual(state.cities, [city])
+        self.assertEqual(other.cities, [])
+        city.state_id = other.id
+        self.assertEqual(state.cities, [])
+        self.assertEqual(other.cities, [city])
+        self.storage.delete(city)
+        self.assertEqual(other.cities, [])
+
+    def test_place_relations(self):
+        """Test that places, reviews and amenities are indexed"""
+        user = User()
+        city = City()
+        place = Place(city_id=city.id, user_id=user.id)
+        review = Review(place_id=place.id, user_id=user.id)
+        amenity = Amenity(name="Wifi")
+        for obj in (user, city, place, review, amenity):
+            self.storage.new(obj)
+        place.amenities = amenity
+        self.assertEqual(city.places, [place])
+        self.assertEqual(user.places, [place])
+        self.assertEqual(user.reviews, [review])
+        self.assertEqual(place.reviews, [review])
+        self.assertEqual(place.amenities, [amenity])
+        self.assertEqual(self.storage.related("Place", "amenity_ids",
+                                              amenity.id), [place])
+
+    def test_reload_rebuilds_relations(self):
+        """Test that the indexes are rebuilt from the file"""
+        state = State(name="California")
+        state.save()
+        City(name="Fresno", state_id=state.id).save()
+        FileStorage._FileStorage__objects = {}
+        self.storage.reload()
+        state = self.storage.get("State", state.id)
+        self.assertEqual([city.name for city in state.cities], ["Fresno"])
+
+
+@unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+class TestFileStorageBatch(TmpFileStorageTestCase):
+    """Test batch() and group commit"""
+    def file_keys(self):
+        """Returns the keys saved in the file, None if there is no file"""
+        try:
+            with open(FileStorage._FileStorage__file_path) as f:
+                return set(json.load(f))
+        except FileNotFoundError:
+            return None
+
+    def test_batch_defers_save(self):
+        """Test that saves in a batch are written once at the end"""
+        with self.storage.batch():
+            first = State(name="California")
+            first.save()
+            with self.storage.batch():
+                second = State(name="Nevada")
+                second.save()
+            self.assertIsNone(self.file_keys())
+        self.assertEqual(self.file_keys(),
+                         {"State." + first.id, "State." + second.id})
+
+    def test_batch_raises(self):
+        """Test that the changes of a failing batch are kept and saved"""
+        state = State(name="California")
+        with self.assertRaises(RuntimeError):
+            with self.storage.batch():
+                state.save()
+                raise RuntimeError("failed")
+        self.assertIs(self.storage.get(State, state.id), state)
+        self.assertEqual(self.file_keys(), {"State." + state.id})
+        self.assertFalse(FileStorage._FileStorage__batch.pending)
+        self.assertEqual(FileStorage._FileStorage__batch.depth, 0)
+
+    def test_group_commit(self):
+        """Test that group commit coalesces saves into one write"""
+        FileStorage._FileStorage__group_commit_ms = 50
+        try:
+            state = State(name="California")
+            state.save()
+            self.assertIsNone(self.file_keys())
+            time.sleep(0.2)
+            self.assertEqual(self.file_keys(), {"State." + state.id})
+        finally:
+            FileStorage._FileStorage__group_commit_ms = 0
+
+
+@unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+class TestFileStorageCountAll(TmpFileStorageTestCase):
+    """Test count_all"""
+    def test_count_all(self):
+        """Test that count_all counts every class"""
+        for i in range(3):
+            self.storage.new(State())
+        self.storage.new(User())
+        counts = self.storage.count_all()
+        self.assertEqual(counts["State"], 3)
+        self.assertEqual(counts["User"], 1)
+        self.assertEqual(counts["Place"], 0)
+
+
+@unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+class TestFileStorageSearchPlaces(TmpFileStorageTestCase):
+    """Test search_places"""
+    def setUp(self):
+        """Creates two states with a city and a place each"""
+        super().setUp()
+        self.wifi = Amenity(name="Wifi")
+        self.pool = Amenity(name="Pool")
+        self.states = [State(), State()]
+        self.cities = [City(state_id=state.id) for state in self.states]
+        self.places = [Place(city_id=city.id) for city in self.cities]
+        self.places[0].amenity_ids = [self.wifi.id, self.pool.id]
+        self.places[1].amenity_ids = [self.wifi.id]
+        for obj in [self.wifi, self.pool] + self.states + self.cities + \
+                self.places:
+            self.storage.new(obj)
+
+    def test_no_filter(self):
+        """Test that no filter returns every place"""
+        self.assertCountEqual(self.storage.search_places(), self.places)
+
+    def test_states_and_cities(self):
+        """Test that states and cities are combined"""
+        found = self.storage.search_places(states=[self.states[0].id])
+        self.assertEqual(found, [self.places[0]])
+        found = self.storage.search_places(states=[self.states[0].id],
+                                           cities=[self.cities[1].id])
+        self.assertCountEqual(found, self.places)
+
+    def test_amenities(self):
+        """Test that places must have every amenity"""
+        found = self.storage.search_places(amenities=[self.wifi.id])
+        self.assertCountEqual(found, self.places)
+        found = self.storage.search_places(amenities=[self.wifi.id,
+                                                      self.pool.id])
+        self.assertEqual(found, [self.places[0]])
+        found = self.storage.search_places(cities=[self.cities[1].id],
+                                           amenities=[self.pool.id])
+        self.assertEqual(found, [])
+
+    def test_amenity_bitmaps_follow_changes(self):
+        """Test that deleting, re-creating and relinking places is seen"""
+        self.storage.delete(self.places[0])
+        found = self.storage.search_places(amenities=[self.pool.id])
+        self.assertEqual(found, [])
+        place = Place(city_id=self.cities[0].id)
+        self.storage.new(place)
+        place.amenities = self.pool
+        found = self.storage.search_places(amenities=[self.pool.id])
+        self.assertEqual(found, [place])
+        place.amenity_ids = []
+        found = self.storage.search_places(amenities=[self.pool.id])
+        self.assertEqual(found, [])
+        FileStorage._FileStorage__indexed = (None, set())
+        found = self.storage.search_places(amenities=[self.wifi.id])
+        self.assertEqual(found, [self.places[1]])
+
+
+@unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+class TestFileStorageGeoSearch(TmpFileStorageTestCase):
+    """Test the radius and bounding box filters of search_places"""
+    def setUp(self):
+        """Creates places in Paris, London, Fiji and nowhere"""
+        super().setUp()
+        self.paris = Place(latitude=48.8566, longitude=2.3522)
+        self.london = Place(latitude=51.5074, longitude=-0.1278)
+        self.fiji = Place(latitude=-17.7134, longitude=179.9)
+        self.nowhere = Place(latitude=None, longitude=None)
+        for place in (self.paris, self.london, self.fiji, self.nowhere):
+            self.storage.new(place)
+
+    def test_radius(self):
+        """Test that the radius is in km and results sorted by distance"""
+        search = self.storage.search_places
+        self.assertEqual(search(center=(48.85, 2.35), radius=100),
+                         [self.paris])
+        self.assertEqual(search(center=(51.0, 0.0), radius=400),
+                         [self.london, self.paris])
+        self.assertEqual(search(center=(-17.7, -179.9), radius=50),
+                         [self.fiji])
+
+    def test_bbox(self):
+        """Test the bounding box, across the antimeridian too"""
+        search = self.storage.search_places
+        self.assertCountEqual(search(bbox=(-1, 48, 3, 52)),
+                              [self.paris, self.london])
+        self.assertEqual(search(bbox=(179, -18, -179, -17)), [self.fiji])
+
+    def test_center_sorts(self):
+        """Test that a center without radius only sorts the results"""
+        found = self.storage.search_places(center=(52, 0))
+        self.assertEqual(found, [self.london, self.paris, self.fiji,
+                                 self.nowhere])
+
+    def test_moved_place(self):
+        """Test that the spatial index follows coordinate changes"""
+        self.paris.latitude = 51.5
+        self.paris.longitude = -0.12
+        found = self.storage.search_places(bbox=(1, 48, 3, 49))
+        self.assertEqual(found, [])
+        found = self.storage.search_places(center=(51.5, -0.1), radius=10)
+        self.assertCountEqual(found, [self.paris, self.london])
+
+
+@unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+class TestFileStorageRangeSearch(TmpFileStorageTestCase):
+    """Test the numeric range filters of search_places"""
+    def setUp(self):
+        """Creates places at various prices"""
+        super().setUp()
+        self.city = City()
+        self.places = [Place(city_id=self.city.id, price_by_night=price,
+                             number_rooms=rooms, max_guest=guests)
+                       for price, rooms, guests in ((50, 1, 2), (120, 2, 4),
+                                                    (300, 4, 8))]
+        for place in self.places:
+            self.storage.new(place)
+
+    def check_ranges(self):
+        """Runs the range searches"""
+        search = self.storage.search_places
+        found = search(ranges={"price_by_night": (100, 300)})
+        self.assertCountEqual(found, self.places[1:])
+        found = search(ranges={"price_by_night": (None, 200),
+                               "max_guest": (3, None)})
+        self.assertEqual(found, [self.places[1]])
+        found = search(cities=[self.city.id],
+                       ranges={"number_rooms": (3, None)})
+        self.assertEqual(found, [self.places[2]])
+        self.places[0].price_by_night = 500
+        self.storage.delete(self.places[2])
+        found = search(ranges={"price_by_night": (250, None)})
+        self.assertEqual(found, [self.places[0]])
+        place = Place(price_by_night=260)
+        self.storage.new(place)
+        found = search(ranges={"price_by_night": (250, None)})
+        self.assertCountEqual(found, [self.places[0], place])
+
+    @unittest.skipIf(file_storage.numpy is None, "numpy is not installed")
+    def test_ranges_numpy(self):
+        """Test the range filters on the column store"""
+        self.check_ranges()
+
+    def test_ranges_without_numpy(self):
+        """Test the range filters without numpy"""
+        with mock.patch.object(file_storage, "numpy", None):
+            FileStorage._FileStorage__indexed = (None, set())
+            self.check_ranges()
+
+
+@unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+class TestFileStorageIterPage(TmpFileStorageTestCase):
+    """Test the keyset pagination of FileStorage"""
+    def setUp(self):
+        """Creates states in a known creation order"""
+        super().setUp()
+        self.states = []
+        for i in range(5):
+            state = State(name=str(i),
+                          created_at="2017-03-25T0{}:00:00.0".format(i))
+            self.storage.new(state)
+            self.states.append(state)
+
+    def keyset(self, obj):
+        """Returns the (created_at, id) of obj"""
+        return (obj.created_at, obj.id)
+
+    def test_pages(self):
+        """Test walking the pages"""
+        pages = []
+        after = None
+        while True:
+            page = list(self.storage.iter_page(State, after, 2))
+            if not page:
+                break
+            pages.append(page)
+            after = self.keyset(page[-1])
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        self.assertEqual(sum(pages, []), self.states)
+
+    def test_follows_changes(self):
+        """Test the order after new() and delete()"""
+        list(self.storage.iter_page("State"))
+        self.storage.delete(self.states[1])
+        state = State(created_at="2017-03-25T02:30:00.0")
+        self.storage.new(state)
+        after = self.keyset(self.states[0])
+        self.assertEqual(list(self.storage.iter_page("State", after, 3)),
+                         [self.states[2], state, self.states[3]])
+
+    def test_filter(self):
+        """Test paging the objects of a foreign key"""
+        cities = [City(state_id=self.states[0].id,
+                       created_at="2017-03-26T0{}:00:00.0".format(i))
+                  for i in range(3)]
+        for city in reversed(cities):
+            self.storage.new(city)
+        self.storage.new(City(state_id=self.states[1].id))
+        filter_ = {"state_id": self.states[0].id}
+        page = self.storage.iter_page(City, self.keyset(cities[0]), 5,
+                                      filter_)
+        self.assertEqual(list(page), cities[1:])
+        filter_["name"] = "none"
+        self.assertEqual(list(self.storage.iter_page(City, None, 5,
+                                                     filter_)), [])
+
+
+@unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+class TestFileStorageVersion(TmpFileStorageTestCase):
+    """Test the validators of FileStorage.version"""
+    def test_version_changes(self):
+        """Test the tag follows new(), attribute changes and delete()"""
+        state = State(name="A")
+        tags = [self.storage.version(State)[0]]
+        self.storage.new(state)
+        tags.append(self.storage.version("State")[0])
+        self.assertEqual(self.storage.version("State")[1], state.updated_at)
+        state.name = "B"
+        tags.append(self.storage.version("State")[0])
+        self.storage.delete(state)
+        tags.append(self.storage.version("State")[0])
+        self.assertEqual(len(set(tags)), 4)
+        self.assertGreater(self.storage.version("State")[1],
+                           state.updated_at)
+
+    def test_version_per_class(self):
+        """Test changes to other classes keep the tag"""
+        self.storage.new(State())
+        tag = self.storage.version("State")
+        city = City()
+        self.storage.new(city)
+        city.name = "C"
+        self.assertEqual(self.storage.version("State"), tag)
+
+    def test_version_reload(self):
+        """Test a reload from a changed file renews the tag"""
+        self.storage.new(State())
+        self.storage.save()
+        tag = self.storage.version("State")[0]
+        self.storage.reload()
+        self.assertEqual(self.storage.version("State")[0], tag)
+        FileStorage._FileStorage__synced = (None, None)
+        self.storage.reload()
+        self.assertNotEqual(self.storage.version("State")[0], tag)
+
+    def test_version_delete_reload(self):
+        """Test a reload after a delete keeps the time of the delete"""
+        first, second = State(name="A"), State(name="B")
+        self.storage.new_many([first, second])
+        self.storage.save()
+        self.storage.delete(second)
+        deleted = self.storage.version(State)[1]
+        self.assertGreater(deleted, second.updated_at)
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__synced = (None, None)
+        self.storage.reload()
+        self.assertGreaterEqual(self.storage.version(State)[1], deleted)
+        self.assertIsNone(self.storage.version(City)[1])
+
+
+@unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+class TestFileStorageSerializer(TmpFileStorageTestCase):
+    """Test save() and reload() with each JSON backend"""
+    def round_trip(self):
+        """Checks a state is unchanged by save() and reload()"""
+        state = State(name="Évora")
+        state.created_at = datetime(2017, 3, 25, 2, 17, 6)
+        self.storage.new(state)
+        self.storage.save()
+        FileStorage._FileStorage__synced = (None, None)
+        self.storage.reload()
+        reloaded = self.storage.get(State, state.id)
+        self.assertIsNot(reloaded, state)
+        self.assertEqual(reloaded.to_dict(), state.to_dict())
+
+    def test_json(self):
+        """Test the json module backend"""
+        with mock.patch.object(serializer, "orjson", None):
+            self.round_trip()
+
+    @unittest.skipIf(serializer.orjson is None, "orjson is not installed")
+    def test_orjson(self):
+        """Test the orjson backend"""
+        self.round_trip()
+
+
+@unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+class TestFileStorageMany(TmpFileStorageTestCase):
+    """Test new_many and delete_many"""
+    def test_new_and_delete_many(self):
+        """Test the objects are indexed and the file written once"""
+        states = [State(name=str(i)) for i in range(3)]
+        cities = [City(state_id=states[0].id) for i in range(2)]
+        with mock.patch.object(FileStorage, "_FileStorage__flush") as flush:
+            self.storage.new_many(states + cities)
+            self.storage.delete_many(cities[:1])
+        flush.assert_called_once_with()
+        self.assertEqual(self.storage.count(State), 3)
+        self.assertEqual(self.storage.related(City, "state_id",
+                                              states[0].id), cities[1:])
+
+
+@unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+class TestFileStorageExpand(TmpFileStorageTestCase):
+    """Test expand"""
+    def test_expand(self):
+        """Test the objects are returned and their relations indexed"""
+        state = State(name="A")
+        city = City(name="B", state_id=state.id)
+        self.storage.new_many([state, city])
+        self.assertEqual(self.storage.expand([state], {"cities": {}}),
+                         [state])
+        self.assertEqual(state.cities, [city])
+        self.assertEqual(self.storage.expand([], {"cities": {}}), [])
+
+
+@unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+class TestFileStorageLazyDates(TmpFileStorageTestCase):
+    """Test the dates of reloaded objects are parsed on first access"""
+    def test_lazy_dates(self):
+        """Test reload() leaves the dates as strings until read"""
+        state = State(name="A")
+        state.created_at = datetime(2017, 3, 25, 2, 17, 6, 12)
+        self.storage.new(state)
+        self.storage.save()
+        FileStorage._FileStorage__synced = (None, None)
+        with mock.patch.object(State, "__init__") as init:
+            self.storage.reload()
+        init.assert_not_called()
+        reloaded = self.storage.get(State, state.id)
+        self.assertIsInstance(reloaded.__dict__["created_at"], str)
+        self.assertEqual(reloaded.to_dict(False)["created_at"],
+                         reloaded.__dict__["created_at"])
+        self.assertEqual(reloaded.created_at, state.created_at)
+        self.assertIsInstance(reloaded.__dict__["created_at"], datetime)
+        self.assertEqual(reloaded.to_dict(), state.to_dict())
+        self.assertGreaterEqual(self.storage.version(State)[1],
+                                state.updated_at)
+
+
+@unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+class TestFileStorageLazy(TmpFileStorageTestCase):
+    """Test the lazy mode"""
+    lazy = True
+
+    def setUp(self):
+        """Saves states and cities, then reloads them lazily"""
+        super().setUp()
+        self.states = [State(name=str(i)) for i in range(3)]
+        self.cities = [City(name=str(i), state_id=self.states[0].id)
+                       for i in range(2)]
+        self.storage.new_many(self.states + self.cities)
+        self.storage.save()
+        self.cold_reload()
+
+    def cold_reload(self):
+        """Reloads the file as a new process would"""
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__synced = (None, None)
+        self.storage.reload()
+
+    def built(self):
+        """Returns the keys of the objects built"""
+        return set(FileStorage._FileStorage__objects)
+
+    def test_get(self):
+        """Test reload() builds no object and get() builds one"""
+        self.assertEqual(self.built(), set())
+        self.assertEqual(self.storage.count(), 5)
+        self.assertEqual(self.storage.count(State), 3)
+        self.assertEqual(self.storage.count_all()["City"], 2)
+        state = self.storage.get(State, self.states[1].id)
+        self.assertEqual(state.to_dict(), self.states[1].to_dict())
+        self.assertIs(self.storage.get(State, self.states[1].id), state)
+        self.assertIsNone(self.storage.get(State, "missing"))
+        self.assertEqual(self.built(), {"State." + self.states[1].id})
+
+    def test_all(self):
+        """Test all(cls) builds the objects of cls only"""
+        self.storage.get(City, self.cities[0].id)
+        cities = self.storage.all(City)
+        self.assertEqual(set(cities), {"City." + c.id for c in self.cities})
+        self.assertEqual(self.built(), set(cities))
+        self.assertEqual(len(self.storage.all()), 5)
+        self.assertIsNone(FileStorage._FileStorage__records[1])
+
+    def test_version(self):
+        """Test the validators do not build the objects, nor change once
+        the indexes are built"""
+        tag = self.storage.version(State)
+        self.assertEqual(self.built(), set())
+        self.assertGreaterEqual(tag[1], max(s.updated_at
+                                            for s in self.states))
+        self.assertEqual(len(self.storage.related(City, "state_id",
+                                                  self.states[0].id)), 2)
+        self.assertEqual(self.built(), {"City." + c.id for c in self.cities})
+        self.assertEqual(self.storage.version(State), tag)
+        self.assertEqual(len(list(self.storage.iter_page(State))), 3)
+        self.assertEqual(len(self.built()), 5)
+        self.assertEqual(self.storage.version(State), tag)
+
+    def test_write(self):
+        """Test a change builds the objects of its class only, and the
+        records of the others are written as they are"""
+        self.storage.delete(self.storage.get(State, self.states[0].id))
+        self.storage.new(State(name="new"))
+        self.assertEqual(self.storage.count(), 5)
+        self.assertEqual(self.storage.count(City), 2)
+        self.storage.save()
+        self.assertEqual({k.partition(".")[0] for k in self.built()},
+                         {"State"})
+        self.assertEqual(self.storage.get(City, self.cities[1].id).to_dict(),
+                         self.cities[1].to_dict())
+        self.cold_reload()
+        self.assertEqual(self.storage.count(State), 3)
+        self.assertEqual(self.storage.count(City), 2)
+        self.assertIsNone(self.storage.get(State, self.states[0].id))
+
+    def test_unsaved(self):
+        """Test the changes not saved yet are kept by a reload"""
+        self.storage.new(State(name="new"))
+        FileStorage._FileStorage__synced = (None, None)
+        self.storage.reload()
+        self.assertEqual(self.storage.count(State), 4)
+        self.assertEqual(len(self.storage.all(State)), 4)
+
+    def test_journal(self):
+        """Test the journal records are applied over the pending ones"""
+        with mock.patch.object(FileStorage, "_FileStorage__journal", True):
+            self.storage.delete(self.storage.get(State, self.states[0].id))
+            self.cold_reload()
+            self.assertEqual(self.storage.count(State), 2)
+            self.assertIsNone(self.storage.get(State, self.states[0].id))
+            self.assertEqual(len(self.storage.all(State)), 2)
+
+    def test_other_format(self):
+        """Test a file not written by dump_items() is loaded at once"""
+        with open(FileStorage._FileStorage__file_path, "w") as fd:
+            json.dump({"State.1": {"__class__": "State", "id": "1"}}, fd,
+                      indent=4)
+        self.cold_reload()
+        self.assertEqual(self.built(), {"State.1"})
+
+    def test_changed_in_place(self):
+        """Test a snapshot rewritten in place is not read as the former"""
+        with open(FileStorage._FileStorage__file_path, "r+") as fd:
+            fd.write("{garbage")
+        self.assertRaises(ValueError, self.storage.get, State,
+                          self.states[0].id)
+
+    def test_invalid_record(self):
+        """Test an invalid record is only found once built"""
+        with open(FileStorage._FileStorage__file_path, "w") as fd:
+            fd.write('{"State.1":{"__class__":"State","id":"1"x}}')
+        self.cold_reload()
+        self.assertEqual(self.storage.count(State), 1)
+        self.assertRaises(ValueError, self.storage.get, State, "1")
+
+
+@unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+class TestFileStorageStreaming(TmpFileStorageTestCase):
+    """Test the incremental reading and writing of the file"""
+    def test_round_trip(self):
+        """Test objects split across chunks are read back"""
+        states = [State(name="É" * i) for i in range(20)]
+        self.storage.new_many(states)
+        with mock.patch.object(serializer, "chunk_size", 16):
+            self.storage.save()
+            FileStorage._FileStorage__synced = (None, None)
+            self.storage.reload()
+        self.assertEqual(sorted(self.storage.all(State)),
+                         sorted("State." + s.id for s in states))
+        with open(FileStorage._FileStorage__file_path) as fd:
+            self.assertEqual(len(fd.readlines()), 20)
+
+    def test_former_layout(self):
+        """Test a file written by json.dump is still read"""
+        state = State(name="A")
+        with open(FileStorage._FileStorage__file_path, "w") as fd:
+            json.dump({"State." + state.id: state.to_dict()}, fd, indent=4)
+        for orjson in (serializer.orjson, None):
+            with mock.patch.object(serializer, "orjson", orjson):
+                FileStorage._FileStorage__synced = (None, None)
+                self.storage.reload()
+            self.assertEqual(self.storage.get(State, state.id).to_dict(),
+                             state.to_dict())
+
+    def test_invalid(self):
+        """Test a truncated file is logged and keeps the objects"""
+        path = FileStorage._FileStorage__file_path
+        state = State(name="A")
+        self.storage.new(state)
+        self.storage.save()
+        truncated = '{"State.1": {"__class__": "State", "id": "1"},\n'
+        with open(path, "w") as fd:
+            fd.write(truncated)
+        FileStorage._FileStorage__synced = (None, None)
+        with self.assertLogs(file_storage.logger, "ERROR"):
+            self.storage.reload()
+        self.assertEqual(list(self.storage.all()), ["State." + state.id])
+        with self.assertLogs(file_storage.logger, "ERROR"):
+            self.storage.close()
+        self.storage.save()
+        with open(path + ".damaged") as fd:
+            self.assertEqual(fd.read(), truncated)
+        FileStorage._FileStorage__objects = {}
+        self.storage.reload()
+        self.assertEqual(list(self.storage.all()), ["State." + state.id])
+
+    def test_invalid_at_start(self):
+        """Test starting on a damaged file keeps it once saving"""
+        path = FileStorage._FileStorage__file_path
+        with open(path, "w") as fd:
+            fd.write("{garbage")
+        FileStorage._FileStorage__synced = (None, None)
+        with self.assertLogs(file_storage.logger, "ERROR"):
+            storage = FileStorage()
+        self.assertEqual(storage.count(), 0)
+        storage.new(State(name="A"))
+        storage.save()
+        with open(path + ".damaged") as fd:
+            self.assertEqual(fd.read(), "{garbage")
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(storage.count(State), 1)
+
+
+@unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+class TestFileStorageAtomicSave(TmpFileStorageTestCase):
+    """Test the file is replaced atomically"""
+    def test_replaced(self):
+        """Test save() renames a new file over the former one"""
+        path = FileStorage._FileStorage__file_path
+        self.storage.save()
+        inode = os.stat(path).st_ino
+        self.storage.new(State(name="A"))
+        self.storage.save()
+        self.assertNotEqual(os.stat(path).st_ino, inode)
+        self.assertEqual(os.listdir(self.tmp.name), ["file.json"])
+
+    def test_durability(self):
+        """Test the fsync calls of each durability level"""
+        for level, calls in (("none", 0), ("file", 1), ("dir", 2)):
+            with mock.patch.object(FileStorage, "_FileStorage__durability",
+                                   level), \
+                    mock.patch.object(file_storage.os, "fsync") as fsync:
+                self.storage.save()
+            self.assertEqual(fsync.call_count, calls, level)
+
+    def test_failed_write(self):
+        """Test a failed write leaves the former file untouched"""
+        path = FileStorage._FileStorage__file_path
+        state = State(name="A")
+        self.storage.new(state)
+        self.storage.save()
+        with open(path, "rb") as fd:
+            former = fd.read()
+        self.storage.new(State(name="B"))
+        with mock.patch.object(serializer, "dump_items",
+                               side_effect=OSError("disk full")):
+            self.assertRaises(OSError, self.storage.save)
+        with open(path, "rb") as fd:
+            self.assertEqual(fd.read(), former)
+        self.assertEqual(os.listdir(self.tmp.name), ["file.json"])
+        self.storage.save()
+        FileStorage._FileStorage__objects = {}
+        self.storage.reload()
+        self.assertEqual(self.storage.count(State), 2)
+
+    def test_keep_previous(self):
+        """Test the previous snapshot is read if the file is corrupt"""
+        path = FileStorage._FileStorage__file_path
+        state = State(name="A")
+        with mock.patch.object(FileStorage, "_FileStorage__keep_previous",
+                               True):
+            self.storage.new(state)
+            self.storage.save()
+            self.storage.new(State(name="B"))
+            self.storage.save()
+        self.assertTrue(os.path.exists(path + ".prev"))
+        with open(path, "w") as fd:
+            fd.write("{")
+        FileStorage._FileStorage__synced = (None, None)
+        self.storage.reload()
+        self.assertEqual(list(self.storage.all()), ["State." + state.id])
+
+    def test_unreadable(self):
+        """Test a file that cannot be read is not taken for a missing one"""
+        path = FileStorage._FileStorage__file_path
+        state = State(name="A")
+        self.storage.new(state)
+        self.storage.save()
+
+        def failing_open(file, *args, **kwargs):
+            """Fails to open the snapshot"""
+            if file == path:
+                raise PermissionError(13, "Permission denied", file)
+            return open(file, *args, **kwargs)
+        FileStorage._FileStorage__synced = (None, None)
+        with mock.patch.object(file_storage, "open", failing_open,
+                               create=True):
+            with self.assertLogs(file_storage.logger, "ERROR"):
+                self.storage.reload()
+        self.assertEqual(list(self.storage.all()), ["State." + state.id])
+        self.storage.save()
+        FileStorage._FileStorage__objects = {}
+        self.storage.reload()
+        self.assertEqual(list(self.storage.all()), ["State." + state.id])
+
+    def test_missing(self):
+        """Test a missing file is an empty store"""
+        self.storage.new(State(name="A"))
+        self.storage.save()
+        os.remove(FileStorage._FileStorage__file_path)
+        self.storage.reload()
+        self.assertEqual(self.storage.all(), {})
+
+
+@unittest.skipIf(models.storage_t == 'db' or file_storage.fcntl is None,
+                 "not testing file storage")
+class TestFileStorageShared(TmpFileStorageTestCase):
+    """Test the multi-process mode"""
+    journal = True
+
+    def setUp(self):
+        """Start in multi-process mode"""
+        for attr, value in (("shared", True), ("lock", (None, None)),
+                            ("tail", (None, 0, None))):
+            patcher = mock.patch.object(FileStorage, "_FileStorage__" + attr,
+                                        value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        super().setUp()
+        self.addCleanup(lambda: os.close(FileStorage._FileStorage__lock[1]))
+
+    @staticmethod
+    def fork(func):
+        """Runs func in a forked process, as another worker would"""
+        pid = os.fork()
+        if pid == 0:
+            status = 1
+            try:
+                func()
+                status = 0
+            finally:
+                os._exit(status)
+        return pid
+
+    def in_child(self, func):
+        """Runs func in a forked process and waits for it"""
+        self.assertEqual(os.waitpid(self.fork(func), 0)[1], 0)
+
+    def test_incremental(self):
+        """Test the writes of another process are applied"""
+        state = State(name="A")
+        self.storage.new(state)
+        self.storage.save()
+        stats = self.storage.reload_stats()
+
+        def write():
+            """Adds a city and renames the state"""
+            self.storage.new(City(name="C", state_id=state.id))
+            self.storage.get(State, state.id).name = "B"
+            self.storage.new(self.storage.get(State, state.id))
+            self.storage.save()
+        self.in_child(write)
+        self.storage.reload()
+        self.assertEqual(self.storage.reload_stats()["performed"],
+                         stats["performed"])
+        self.assertEqual(self.storage.reload_stats()["incremental"],
+                         stats.get("incremental", 0) + 1)
+        self.assertEqual(self.storage.get(State, state.id).name, "B")
+        self.assertEqual(len(self.storage.get(State, state.id).cities), 1)
+
+    def test_read_your_writes(self):
+        """Test unsaved changes are not overwritten by other processes"""
+        state = State(name="A")
+        self.storage.new(state)
+        self.storage.save()
+        state.name = "mine"
+        self.storage.new(state)
+
+        def write():
+            """Renames the state"""
+            state.name = "theirs"
+            self.storage.new(state)
+            self.storage.save()
+        self.in_child(write)
+        self.storage.reload()
+        self.assertEqual(self.storage.get(State, state.id).name, "mine")
+        self.storage.save()
+        FileStorage._FileStorage__objects = {}
+        self.storage.reload()
+        self.assertEqual(self.storage.get(State, state.id).name, "mine")
+
+    def test_concurrent_writers(self):
+        """Test no write is lost when processes save concurrently"""
+        def write():
+            """Adds states one save at a time"""
+            for i in range(25):
+                self.storage.new(State(name=str(i)))
+                self.storage.save()
+        pids = [self.fork(write) for i in range(2)]
+        write()
+        for pid in pids:
+            self.assertEqual(os.waitpid(pid, 0)[1], 0)
+        self.storage.reload()
+        self.assertEqual(self.storage.count(State), 75)
+        FileStorage._FileStorage__objects = {}
+        self.storage.reload()
+        self.assertEqual(self.storage.count(State), 75)
+
+    def test_close_during_save(self):
+        """Test closing does not wait for a save of another thread"""
+        writing = threading.Event()
+        done = threading.Event()
+
+        def slow_sync(fd):
+            """Holds the write until close() returned"""
+            writing.set()
+            done.wait(5)
+            fd.flush()
+        self.storage.save()
+        self.storage.new(State(name="new"))
+        with mock.patch.object(FileStorage, "_FileStorage__sync",
+                               staticmethod(slow_sync)):
+            saver = threading.Thread(target=self.storage.save)
+            saver.start()
+            self.assertTrue(writing.wait(5))
+            start = time.perf_counter()
+            self.storage.close()
+            self.assertLess(time.perf_counter() - start, 1)
+            done.set()
+            saver.join()
+        self.assertEqual(self.storage.count(State), 1)
+
+    def test_compaction(self):
+        """Test a snapshot rewritten by another process is reloaded"""
+        state = State(name="A")
+        self.storage.new(state)
+        self.storage.save()
+
+        def write():
+            """Deletes the state and compacts the journal"""
+            FileStorage._FileStorage__journal_max = 0
+            self.storage.delete(self.storage.get(State, state.id))
+        self.in_child(write)
+        self.storage.reload()
+        self.assertIsNone(self.storage.get(State, state.id))
+        self.assertEqual(os.path.getsize(
+            FileStorage._FileStorage__journal_path), 0)
+
+
+@unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+class TestFileStorageThreads(TmpFileStorageTestCase):
+    """Test FileStorage used by several threads at once"""
+    def setUp(self):
+        """Saves states and cities every thread can rely on"""
+        super().setUp()
+        self.states = [State(name=str(i)) for i in range(20)]
+        self.storage.new_many(self.states)
+        self.storage.new_many(City(name=str(i), state_id=state.id)
+                              for i in range(5) for state in self.states)
+        self.storage.save()
+
+    def test_readers_during_save(self):
+        """Test reading does not wait for a save writing the file"""
+        writing = threading.Event()
+        done = threading.Event()
+
+        def slow_sync(fd):
+            """Holds the write until the reads are done"""
+            writing.set()
+            done.wait(5)
+            fd.flush()
+        self.storage.new(State(name="new"))
+        with mock.patch.object(FileStorage, "_FileStorage__sync",
+                               staticmethod(slow_sync)):
+            saver = threading.Thread(target=self.storage.save)
+            saver.start()
+            self.assertTrue(writing.wait(5))
+            start = time.perf_counter()
+            self.assertEqual(self.storage.count(State), 21)
+            self.assertEqual(len(self.storage.all(State)), 21)
+            self.assertEqual(len(self.states[0].cities), 5)
+            self.assertEqual(len(list(self.storage.iter_page(State))), 21)
+            self.storage.new(State(name="during"))
+            self.assertLess(time.perf_counter() - start, 1)
+            done.set()
+            saver.join()
+        self.storage.save()
+        FileStorage._FileStorage__objects = {}
+        self.storage.reload()
+        self.assertEqual(self.storage.count(State), 22)
+
+    def test_close_during_save(self):
+        """Test closing, as every request does, does not wait for a save"""
+        writing = threading.Event()
+        done = threading.Event()
+
+        def slow_sync(fd):
+            """Holds the write until close() returned"""
+            writing.set()
+            done.wait(5)
+            fd.flush()
+        self.storage.reload()
+        stats = self.storage.reload_stats()
+        self.storage.new(State(name="new"))
+        with mock.patch.object(FileStorage, "_FileStorage__sync",
+                               staticmethod(slow_sync)):
+            saver = threading.Thread(target=self.storage.save)
+            saver.start()
+            self.assertTrue(writing.wait(5))
+            start = time.perf_counter()
+            self.storage.close()
+            self.assertLess(time.perf_counter() - start, 1)
+            done.set()
+            saver.join()
+        self.assertEqual(self.storage.reload_stats()["performed"],
+                         stats["performed"])
+        self.storage.close()
+        self.assertEqual(self.storage.reload_stats()["performed"],
+                         stats["performed"])
+        self.assertEqual(self.storage.count(State), 21)
+
+    def test_stress(self):
+        """Test concurrent reads, writes and reloads"""
+        stop = threading.Event()
+        errors = []
+        base = set(self.storage.all())
+
+        def hammer(func):
+            """Calls func until stop is set, recording any failure"""
+            def run():
+                """Body of the thread"""
+                try:
+                    while not stop.is_set():
+                        func()
+                except BaseException as e:
+                    errors.append(e)
+                    stop.set()
+            return threading.Thread(target=run)
+
+        def read():
+            """Reads the objects through every kind of lookup"""
+            objs = self.storage.all()
+            self.assertLessEqual(base, set(objs))
+            for key, obj in objs.items():
+                self.assertEqual(key, obj.__class__.__name__ + "." + obj.id)
+            self.assertGreaterEqual(len(self.storage.all(State)), 20)
+            for state in self.states:
+                self.assertIs(self.storage.get(State, state.id).__class__,
+                              State)
+                self.assertGreaterEqual(len(state.cities), 5)
+            self.assertGreaterEqual(
+                len(list(self.storage.iter_page(State))), 20)
+            self.storage.version(State)
+
+        def write():
+            """Adds a state and a city, then deletes the state"""
+            state = State(name="tmp")
+            state.save()
+            City(name="tmp", state_id=state.id).save()
+            self.storage.delete(state)
+
+        def reload():
+            """Reloads everything, as after a change of another process"""
+            FileStorage._FileStorage__synced = (None, None)
+            self.storage.reload()
+            time.sleep(0.01)
+
+        threads = [hammer(read) for i in range(4)] + \
+            [hammer(write) for i in range(2)] + [hammer(reload)]
+        for thread in threads:
+            thread.start()
+        time.sleep(1)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.storage.save()
+        objs = dict(self.storage.all())
+        FileStorage._FileStorage__objects = {}
+        self.storage.reload()
+        self.assertEqual(set(self.storage.all()), set(objs))
+
+
+@unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+class TestFileStorageThreadsJournal(TestFileStorageThreads):
+    """Test FileStorage used by several threads at once, in journal mode"""
+    journal = True
+
+
+@unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+class TestFileStorageThreadsLazy(TestFileStorageThreads):
+    """Test FileStorage used by several threads at once, in lazy mode"""
+    lazy = True
@@ -0,0 +1,340 @@
+#!/usr/bin/python3
+"""
+Contains the TestSQLiteStorageDocs and TestSQLiteStorage classes
+"""
+
+import inspect
+import models
+from models.city import City
+from models.engine import sqlite_storage
+from models.state import State
+import os
+import pep8
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError
+import tempfile
+import unittest
+from unittest import mock
+SQLiteStorage = sqlite_storage.SQLiteStorage
+on_sqlite = isinstance(models.storage, SQLiteStorage)
+
+
+class TestSQLiteStorageDocs(unittest.TestCase):
+    """Tests to check the documentation and style of SQLiteStorage class"""
+    def test_pep8_conformance_sqlite_storage(self):
+        """Test that models/engine/sqlite_storage.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['models/engine/sqlite_storage.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_sqlite_storage_module_docstring(self):
+        """Test for the sqlite_storage.py module docstring"""
+        self.assertIsNot(sqlite_storage.__doc__, None,
+                         "sqlite_storage.py needs a docstring")
+
+    def test_sqlite_storage_class_docstring(self):
+        """Test for the SQLiteStorage class docstring"""
+        self.assertIsNot(SQLiteStorage.__doc__, None,
+                         "SQLiteStorage class needs a docstring")
+
+    def test_sqlite_func_docstrings(self):
+        """Test for the presence of docstrings in SQLiteStorage methods"""
+        for name, func in inspect.getmembers(SQLiteStorage,
+                                             inspect.isfunction):
+            self.assertIsNot(func.__doc__, None,
+                             "{:s} method needs a docstring".format(name))
+
+
+@unittest.skipIf(not on_sqlite, "not testing sqlite storage")
+class TestSQLiteStorage(unittest.TestCase):
+    """Test the SQLiteStorage class"""
+    def test_storage_type(self):
+        """Test that HBNB_TYPE_STORAGE=sqlite uses the SQLAlchemy models"""
+        self.assertEqual(models.storage_t, "db")
+        self.assertEqual(State.__tablename__, "states")
+
+    def test_pragmas(self):
+        """Test that the database runs in WAL mode"""
+        engine = models.storage._DBStorage__engine
+        with engine.connect() as conn:
+            mode = conn.exec_driver_sql("PRAGMA journal_mode").scalar()
+            sync = conn.exec_driver_sql("PRAGMA synchronous").scalar()
+        self.assertEqual(mode, "wal")
+        self.assertEqual(sync, 1)
+
+    def test_save_and_get(self):
+        """Test that saved objects can be read back"""
+        state = State(name="California")
+        state.save()
+        self.assertIs(models.storage.get("State", state.id), state)
+        state.delete()
+        self.assertIsNone(models.storage.get("State", state.id))
+
+    def test_batch_rollback(self):
+        """Test that a failing batch leaves nothing behind"""
+        count = models.storage.count("State")
+        with self.assertRaises(ValueError):
+            with models.storage.batch():
+                State(name="California").save()
+                State(name="Nevada").save()
+                raise ValueError
+        self.assertEqual(models.storage.count("State"), count)
+
+
+@unittest.skipIf(not on_sqlite, "not testing sqlite storage")
+class TestConnectionPool(unittest.TestCase):
+    """Test the connection pool settings and statistics"""
+    def setUp(self):
+        """Creates a storage with a small pool on a temporary database"""
+        self.tmp = tempfile.TemporaryDirectory()
+        env = {"HBNB_SQLITE_PATH": os.path.join(self.tmp.name, "t.db"),
+               "HBNB_DB_POOL_SIZE": "2", "HBNB_DB_MAX_OVERFLOW": "1",
+               "HBNB_DB_POOL_TIMEOUT": "0.1"}
+        with mock.patch.dict(os.environ, env):
+            self.storage = SQLiteStorage()
+        self.engine = self.storage._DBStorage__engine
+
+    def tearDown(self):
+        """Closes the pool"""
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def test_warm_pool(self):
+        """Test that the pool is filled at startup"""
+        stats = self.storage.pool_stats()
+        self.assertEqual(stats["size"], 2)
+        self.assertEqual(stats["checked_in"], 2)
+        self.assertEqual(stats["checked_out"], 0)
+
+    def test_occupancy_and_timeout(self):
+        """Test that checkouts are counted and the overflow is bounded"""
+        before = self.storage.pool_stats()["checkouts"]
+        held = [self.engine.raw_connection() for i in range(3)]
+        stats = self.storage.pool_stats()
+        self.assertEqual(stats["checked_out"], 3)
+        self.assertEqual(stats["overflow"], 1)
+        self.assertEqual(stats["checkouts"], before + 3)
+        with self.assertRaises(TimeoutError):
+            self.engine.raw_connection()
+        self.assertGreaterEqual(self.storage.pool_stats()["wait_max_ms"],
+                                100)
+        for connection in held:
+            connection.close()
+
+
+@unittest.skipIf(not on_sqlite, "not testing sqlite storage")
+class TestCountAll(unittest.TestCase):
+    """Test count_all on SQLite"""
+    def test_count_all(self):
+        """Test that count_all matches count for every class"""
+        State(name="California").save()
+        counts = models.storage.count_all()
+        for name in ("Amenity", "City", "Place", "Review", "State", "User"):
+            self.assertEqual(counts[name], models.storage.count(name))
+
+    def test_count_all_approximate(self):
+        """Test that approximate counts come from ANALYZE statistics"""
+        State(name="California").save()
+        models.storage.save()
+        session = models.storage._DBStorage__session
+        session.connection().exec_driver_sql("ANALYZE")
+        counts = models.storage.count_all(approximate=True)
+        self.assertEqual(counts["State"], models.storage.count("State"))
+
+
+@unittest.skipIf(not on_sqlite, "not testing sqlite storage")
+class TestSearchPlaces(unittest.TestCase):
+    """Test search_places on SQLite"""
+    def test_search_places(self):
+        """Test the states, cities and amenities filters"""
+        from models.amenity import Amenity
+        from models.city import City
+        from models.place import Place
+        from models.user import User
+        user = User(email="a@b.c", password="pwd")
+        wifi = Amenity(name="Wifi")
+        pool = Amenity(name="Pool")
+        states = [State(name="A"), State(name="B")]
+        cities = [City(name="C", state_id=state.id) for state in states]
+        places = [Place(name="P", city_id=city.id, user_id=user.id)
+                  for city in cities]
+        for obj in [user, wifi, pool] + states + cities + places:
+            models.storage.new(obj)
+        places[0].amenities.extend([wifi, pool])
+        places[1].amenities.append(wifi)
+        models.storage.save()
+        search = models.storage.search_places
+        self.assertEqual(search(states=[states[0].id]), [places[0]])
+        self.assertCountEqual(search(states=[states[0].id],
+                                     cities=[cities[1].id]), places)
+        self.assertCountEqual(search(amenities=[wifi.id]), places)
+        self.assertEqual(search(amenities=[wifi.id, pool.id]), [places[0]])
+        self.assertEqual(search(cities=[cities[1].id],
+                                amenities=[pool.id]), [])
+
+    def test_search_places_geo(self):
+        """Test the radius and bounding box filters"""
+        from models.city import City
+        from models.place import Place
+        from models.user import User
+        user = User(email="a@b.c", password="pwd")
+        state = State(name="A")
+        city = City(name="C", state_id=state.id)
+        paris = Place(name="Paris", city_id=city.id, user_id=user.id,
+                      latitude=48.8566, longitude=2.3522)
+        london = Place(name="London", city_id=city.id, user_id=user.id,
+                       latitude=51.5074, longitude=-0.1278)
+        fiji = Place(name="Fiji", city_id=city.id, user_id=user.id,
+                     latitude=-17.7134, longitude=179.9)
+        for obj in (user, state, city, paris, london, fiji):
+            models.storage.new(obj)
+        models.storage.save()
+        search = models.storage.search_places
+        self.assertEqual(search(cities=[city.id], center=(51.0, 0.0),
+                                radius=400), [london, paris])
+        self.assertEqual(search(cities=[city.id],
+                                bbox=(179, -18, -179, -17)), [fiji])
+
+
+@unittest.skipIf(not on_sqlite, "not testing sqlite storage")
+class TestIterPage(unittest.TestCase):
+    """Test the keyset pagination on SQLite"""
+    def test_iter_page(self):
+        """Test walking the pages of a state's cities"""
+        from models.city import City
+        state = State(name="A")
+        cities = [City(name="C", state_id=state.id,
+                       created_at="2017-03-25T0{}:00:00.0".format(i))
+                  for i in range(5)]
+        models.storage.new(state)
+        for city in reversed(cities):
+            models.storage.new(city)
+        models.storage.save()
+        seen = []
+        after = None
+        while True:
+            page = list(models.storage.iter_page(
+                City, after, 2, {"state_id": state.id}))
+            if not page:
+                break
+            self.assertLessEqual(len(page), 2)
+            seen.extend(page)
+            after = (page[-1].created_at, page[-1].id)
+        self.assertEqual(seen, cities)
+
+
+@unittest.skipIf(not on_sqlite, "not testing sqlite storage")
+class TestVersion(unittest.TestCase):
+    """Test the validators of DBStorage.version on SQLite"""
+    def test_version(self):
+        """Test the tag follows saves and deletions"""
+        tags = [models.storage.version(State)[0]]
+        state = State(name="A")
+        models.storage.new(state)
+        models.storage.save()
+        tags.append(models.storage.version("State")[0])
+        self.assertGreaterEqual(models.storage.version("State")[1],
+                                state.updated_at.replace(microsecond=0))
+        state.save()
+        tags.append(models.storage.version("State")[0])
+        models.storage.delete(state)
+        tags.append(models.storage.version("State")[0])
+        self.assertEqual(len(set(tags)), 4)
+
+    def test_same_second(self):
+        """Test the tag changes with every write, even within a second"""
+        state = State(name="A")
+        state.save()
+        self.addCleanup(models.storage.delete, state)
+        tags = set()
+        for name in "BCD":
+            state.name = name
+            models.storage.save()
+            tags.add(models.storage.version("State")[0])
+        self.assertEqual(len(tags), 3)
+
+    def test_rolled_back(self):
+        """Test a rolled back batch leaves the tag alone"""
+        tag = models.storage.version("State")[0]
+        with self.assertRaises(ValueError):
+            with models.storage.batch():
+                State(name="A").save()
+                raise ValueError
+        self.assertEqual(models.storage.version("State")[0], tag)
+
+    def test_other_classes(self):
+        """Test a write only changes the tag of its class"""
+        tag = models.storage.version("City")[0]
+        state = State(name="A")
+        state.save()
+        models.storage.delete(state)
+        self.assertEqual(models.storage.version("City")[0], tag)
+
+
+@unittest.skipIf(not on_sqlite, "not testing sqlite storage")
+class TestLoadOnly(unittest.TestCase):
+    """Test the sparse fieldsets on SQLite"""
+    def test_iter_page_fields(self):
+        """Test only the requested columns are loaded"""
+        state = State(name="A")
+        models.storage.new(state)
+        models.storage.save()
+        models.storage.close()
+        page = list(models.storage.iter_page(State, fields=["name"]))
+        loaded = [obj for obj in page if obj.id == state.id][0]
+        self.assertEqual(loaded.to_json(["name"]), {"name": "A"})
+        self.assertNotIn("updated_at", loaded.__dict__)
+        self.assertIn("created_at", loaded.__dict__)
+        models.storage.close()
+
+
+@unittest.skipIf(not on_sqlite, "not testing sqlite storage")
+class TestMany(unittest.TestCase):
+    """Test new_many and delete_many on SQLite"""
+    def test_new_and_delete_many(self):
+        """Test the objects are added and deleted"""
+        count = models.storage.count("State")
+        states = [State(name=str(i)) for i in range(3)]
+        with models.storage.batch():
+            models.storage.new_many(states)
+            models.storage.save()
+        self.assertEqual(models.storage.count("State"), count + 3)
+        models.storage.delete_many(states[1:])
+        self.assertEqual(models.storage.count("State"), count + 1)
+        models.storage.close()
+        self.assertIsNotNone(models.storage.get("State", states[0].id))
+        self.assertIsNone(models.storage.get("State", states[1].id))
+
+
+@unittest.skipIf(not on_sqlite, "not testing sqlite storage")
+class TestExpand(unittest.TestCase):
+    """Test the loading of relationships on SQLite"""
+    def test_expand(self):
+        """Test nested relationships are loaded with a query each"""
+        states = [State(name=str(i)) for i in range(3)]
+        cities = [City(name="C", state_id=state.id) for state in states]
+        with models.storage.batch():
+            models.storage.new_many(states + cities)
+            models.storage.save()
+        models.storage.close()
+        loaded = [models.storage.get("State", state.id) for state in states]
+        statements = []
+        engine = models.storage._DBStorage__engine
+
+        def count(*args):
+            """Counts the statements"""
+            statements.append(args)
+        event.listen(engine, "before_cursor_execute", count)
+        try:
+            expanded = models.storage.expand(loaded[::-1],
+                                             {"cities": {"places": {}}})
+            self.assertEqual([s.id for s in expanded],
+                             [s.id for s in states[::-1]])
+            self.assertEqual([c.id for c in expanded[0].cities],
+                             [cities[2].id])
+            self.assertEqual(expanded[0].cities[0].places, [])
+            self.assertEqual(len(statements), 3)
+        finally:
+            event.remove(engine, "before_cursor_execute", count)
+        models.storage.close()